@@ -5,7 +5,10 @@ from .interface.instr import McStas_instr
 from .interface.instr import McXtrace_instr
 
 from .interface.functions import load_data
+from .interface.functions import iter_data
+from .interface.functions import save_data
 from .interface.functions import load_metadata
+from .interface.functions import load_totals
 from .interface.functions import load_monitor
 from .interface.functions import name_plot_options
 from .interface.functions import name_search
@@ -17,6 +20,16 @@ from .interface.plotter import make_sub_plot
 
 from .interface.reader import McStas_file
 
+from .data.scan import ScanResult
+from .data.dtypes import set_default_dtypes
+from .data.sparse import set_default_sparse
+from .data.memory import set_memory_budget
+from .data.memory import memory_footprint
+from .data.transfer import share_results
+from .data.transfer import restore_results
+from .data.mcpl import iter_mcpl
+from .data.mcpl import load_mcpl
+
 from .tools.cryostat_builder import Cryostat
 from .tools.instrument_checker import has_component, has_parameter, all_parameters_set
 
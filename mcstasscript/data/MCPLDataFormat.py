@@ -1,5 +1,7 @@
 from libpyvinyl.BaseFormat import BaseFormat
 from mcstasscript.helper.managed_mcrun import load_results
+from mcstasscript.data.mcpl import read_mcpl_header
+from mcstasscript.data.mcpl import load_mcpl
 
 
 class MCPLDataFormat(BaseFormat):
@@ -11,7 +13,7 @@ class MCPLDataFormat(BaseFormat):
         key = "mcpl"
         desciption = "MCPL file"
         file_extension = ".mcpl"
-        read_kwargs = [""]
+        read_kwargs = ["sidecar"]
         write_kwargs = [""]
         return self._create_format_register(
             key, desciption, file_extension, read_kwargs, write_kwargs
@@ -25,10 +27,16 @@ class MCPLDataFormat(BaseFormat):
         return []
 
     @classmethod
-    def read(cls, filename: str) -> dict:
+    def read(cls, filename: str, sidecar=False) -> dict:
         """Read the data from the file with the `filename` to a dictionary. The dictionary will
-        be used by its corresponding data class."""
-        raise NotImplemented("Read method for MCPL is not implemented nor required")
+        be used by its corresponding data class.
+
+        The dictionary holds the MCPLHeader and the particles as a structured
+        array, see mcstasscript.data.mcpl.iter_mcpl for the fields. With
+        sidecar a .npy copy is written next to the file and memory-mapped."""
+        header = read_mcpl_header(filename)
+        particles = load_mcpl(filename, sidecar=sidecar)
+        return {"header": header, "particles": particles}
 
     @classmethod
     def write(cls, object, filename: str, key: str = None):
@@ -1,5 +1,9 @@
+import os
+
 from libpyvinyl.BaseFormat import BaseFormat
 from mcstasscript.helper.managed_mcrun import load_results
+from mcstasscript.data.archive import read_results
+from mcstasscript.data.archive import write_results
 
 
 class McStasFormat(BaseFormat):
@@ -11,8 +15,8 @@ class McStasFormat(BaseFormat):
         key = "sim"
         desciption = "sim format for McStasData"
         file_extension = ".sim"
-        read_kwargs = [""]
-        write_kwargs = [""]
+        read_kwargs = ["lazy_events"]
+        write_kwargs = ["compression"]
         return self._create_format_register(
             key, desciption, file_extension, read_kwargs, write_kwargs
         )
@@ -25,27 +29,28 @@ class McStasFormat(BaseFormat):
         return []
 
     @classmethod
-    def read(cls, filename: str) -> dict:
+    def read(cls, filename: str, lazy_events=False) -> dict:
         """Read the data from the file with the `filename` to a dictionary. The dictionary will
-        be used by its corresponding data class."""
+        be used by its corresponding data class.
+
+        filename can be a McStas output folder or a results archive
+        written by this format."""
+
+        if os.path.isdir(filename):
+            data = load_results(filename, lazy_events=lazy_events)
+        else:
+            data = read_results(filename, lazy_events=lazy_events)
 
-        data = load_results(filename)
         data_dict = {"data": data}
         return data_dict
 
     @classmethod
-    def write(cls, object, filename: str, key: str = None):
-        """Don't have a way to write McStasData"""
-        pass
-
-    """
-    #def write(cls, object: NumberData, filename: str, key: str = None):
-        #Save the data with the `filename`.
+    def write(cls, object, filename: str, key: str = None,
+              compression="gzip"):
+        """Save the McStasData list in a HDF5 results archive with the `filename`."""
         data_dict = object.get_data()
-        arr = np.array([data_dict["number"]])
-        np.savetxt(filename, arr, fmt="%.3f")
+        write_results(data_dict["data"], filename, compression=compression)
         if key is None:
             original_key = object.key
-            key = original_key + "_to_TXTFormat"
+            key = original_key + "_to_McStasFormat"
         return object.from_file(filename, cls, key)
-    """
@@ -0,0 +1,283 @@
+import json
+
+import h5py
+import numpy as np
+
+from mcstasscript.data.data import McStasMetaData
+from mcstasscript.data.data import McStasDataBinned
+from mcstasscript.data.data import McStasDataEvent
+from mcstasscript.data.data import McStasDataList
+from mcstasscript.helper.managed_mcrun import read_nexus_dataset
+
+ARCHIVE_FORMAT = "McStasScript results"
+ARCHIVE_VERSION = 1
+
+# Number of bytes in each chunk of compressed datasets
+CHUNK_BYTES = 2**20
+
+
+def write_results(results, filename, compression="gzip"):
+    """
+    Writes list of McStasData objects to a HDF5 archive
+
+    Metadata and plot options are stored as attributes on a group for each
+    dataset, and the arrays as datasets in that group. Event data is
+    written chunk by chunk, so events kept on disk are never fully loaded.
+
+    Parameters
+    ----------
+
+    results : list of McStasData objects
+        Data to write, the order is kept when reading
+
+    filename : str
+        Path of the archive, an existing file is overwritten
+
+    compression : str or None, default "gzip"
+        Compression filter for the arrays, "gzip", "lzf" or None. Arrays
+        written without compression are memory-mapped when read.
+    """
+    with h5py.File(filename, "w") as f:
+        f.attrs["format"] = ARCHIVE_FORMAT
+        f.attrs["version"] = ARCHIVE_VERSION
+        f.attrs["count"] = len(results)
+
+        for index, data in enumerate(results):
+            group = f.create_group(str(index))
+            write_data(group, data, compression=compression)
+
+
+def write_data(group, data, compression="gzip"):
+    """
+    Writes single McStasData object to a h5py group
+
+    Parameters
+    ----------
+
+    group : h5py group
+        Empty group to write to
+
+    data : McStasDataBinned or McStasDataEvent
+        Data to write
+
+    compression : str or None, default "gzip"
+        Compression filter for the arrays
+    """
+    group.attrs["data_type"] = data.data_type
+    group.attrs["name"] = json.dumps(data.name)
+    group.attrs["data_location"] = json.dumps(data.get_data_location())
+
+    group.attrs["info"], group.attrs["metadata"] = metadata_to_json(
+        data.metadata)
+    group.attrs["plot_options"] = to_json(vars(data.plot_options))
+
+    if data.data_type == "Events":
+        group.attrs["chunk_size"] = data.chunk_size
+        write_events(group, data, compression=compression)
+        return
+
+    for name in ["Intensity", "Error", "Ncount"]:
+        write_array(group, name, np.asarray(getattr(data, name)),
+                    compression=compression)
+
+    if hasattr(data, "xaxis"):
+        write_array(group, "xaxis", np.asarray(data.xaxis),
+                    compression=compression)
+
+
+def write_array(group, name, array, compression="gzip"):
+    """
+    Writes numpy array as a dataset in group, small arrays uncompressed
+    """
+    if compression is None or array.ndim == 0 or array.size < 2:
+        group.create_dataset(name, data=array)
+    else:
+        group.create_dataset(name, data=array, compression=compression)
+
+
+def write_events(group, data, compression="gzip"):
+    """
+    Writes event rows of McStasDataEvent to group block by block
+
+    Selections are written with only the selected events and any weight
+    scale applied. The events keep their floating point dtype.
+    """
+    n_events = len(data)
+    n_columns = len(data.variables)
+
+    dtype = data.Events.dtype
+    if dtype.kind != "f":
+        dtype = np.dtype(np.float64)
+
+    kwargs = {}
+    if compression is not None:
+        rows = CHUNK_BYTES // (dtype.itemsize * max(n_columns, 1))
+        kwargs["chunks"] = (max(1, min(n_events, rows)), max(n_columns, 1))
+        kwargs["compression"] = compression
+
+    dataset = group.create_dataset("events", shape=(n_events, n_columns),
+                                   dtype=dtype, **kwargs)
+
+    start = 0
+    for block in data.iter_chunks(data.chunk_size):
+        stop = start + len(block)
+        dataset[start:stop] = block
+        start = stop
+
+
+def read_results(filename, lazy_events=False):
+    """
+    Reads list of McStasData objects from a HDF5 archive
+
+    Arrays stored without compression are memory-mapped, binned arrays
+    copy on write so they can be modified without changing the file.
+
+    Parameters
+    ----------
+
+    filename : str
+        Path of archive written with write_results
+
+    lazy_events : bool, default False
+        If True event data is kept on disk, memory-mapped if stored
+        without compression and read in chunks from the file otherwise
+    """
+    f = h5py.File(filename, "r")
+    keep_open = False
+    try:
+        if f.attrs.get("format") != ARCHIVE_FORMAT:
+            raise ValueError("File " + str(filename) + " is not a "
+                             + "McStasScript results archive.")
+
+        if f.attrs["version"] > ARCHIVE_VERSION:
+            raise ValueError("Results archive version "
+                             + str(f.attrs["version"]) + " not supported, "
+                             + "update McStasScript to read it.")
+
+        results = McStasDataList()
+        for index in range(f.attrs["count"]):
+            data = read_data(f[str(index)], filename,
+                             lazy_events=lazy_events)
+            if (data.data_type == "Events"
+                    and isinstance(data.Events, h5py.Dataset)):
+                keep_open = True
+            results.append(data)
+    finally:
+        if not keep_open:
+            # Compressed lazy events need the file to stay open
+            f.close()
+
+    return results
+
+
+def read_data(group, filename, lazy_events=False):
+    """
+    Reads single McStasData object from h5py group
+
+    Parameters
+    ----------
+
+    group : h5py group
+        Group written by write_data
+
+    filename : str
+        Path of the file containing group, used for memory-mapping
+
+    lazy_events : bool, default False
+        If True event data is kept on disk
+    """
+    metadata = metadata_from_json(group.attrs["info"],
+                                  group.attrs["metadata"])
+
+    if group.attrs["data_type"] == "Events":
+        if lazy_events:
+            events = memory_map(group["events"], filename, mode="r")
+            if events is None:
+                events = group["events"]
+        else:
+            events = read_nexus_dataset(group["events"], order="F")
+
+        data = McStasDataEvent(metadata, events,
+                               chunk_size=group.attrs["chunk_size"])
+    else:
+        arrays = {}
+        for name in ["Intensity", "Error", "Ncount", "xaxis"]:
+            if name not in group:
+                continue
+            arrays[name] = memory_map(group[name], filename, mode="c")
+            if arrays[name] is None:
+                arrays[name] = read_nexus_dataset(group[name])
+
+        kwargs = {}
+        if "xaxis" in arrays:
+            kwargs["xaxis"] = arrays["xaxis"]
+
+        data = McStasDataBinned(metadata, arrays["Intensity"],
+                                arrays["Error"], arrays["Ncount"], **kwargs)
+
+    data.name = json.loads(group.attrs["name"])
+    data.set_data_location(json.loads(group.attrs["data_location"]))
+    for key, value in json.loads(group.attrs["plot_options"]).items():
+        setattr(data.plot_options, key, value)
+
+    return data
+
+
+def memory_map(dataset, filename, mode="r"):
+    """
+    Returns numpy memmap of contiguous dataset, None if not possible
+
+    Datasets that are chunked, compressed or not yet allocated in the
+    file can not be memory-mapped.
+    """
+    if dataset.chunks is not None or dataset.shape == ():
+        return None
+
+    if dataset.size == 0 or dataset.dtype.hasobject:
+        return None
+
+    offset = dataset.id.get_offset()
+    if offset is None:
+        return None
+
+    return np.memmap(filename, dtype=dataset.dtype, mode=mode,
+                     offset=offset, shape=dataset.shape)
+
+
+def metadata_to_json(metadata):
+    """
+    Returns info dict and other attributes of McStasMetaData as JSON
+    """
+    attributes = dict(vars(metadata))
+    info = attributes.pop("info")
+
+    return to_json(info), to_json(attributes)
+
+
+def metadata_from_json(info, attributes):
+    """
+    Creates McStasMetaData from JSON written with metadata_to_json
+    """
+    metadata = McStasMetaData()
+    metadata.info = json.loads(info)
+    for key, value in json.loads(attributes).items():
+        setattr(metadata, key, value)
+
+    return metadata
+
+
+def to_json(dictionary):
+    """
+    Converts dictionary to JSON, numpy values are converted to Python
+    """
+    def convert(value):
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, bytes):
+            return value.decode("utf-8", errors="replace")
+        raise TypeError("Can not store value of type "
+                        + str(type(value)) + " in results archive.")
+
+    return json.dumps(dictionary, default=convert)
@@ -0,0 +1,355 @@
+import json
+import os
+
+import numpy as np
+
+from mcstasscript.data.archive import metadata_to_json
+
+# Columns of tables made from binned data, besides the bin centers
+BINNED_COLUMNS = ("Intensity", "Error", "Ncount")
+
+
+def _import_pyarrow():
+    """
+    Returns pyarrow module, which is an optional dependency
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Export to Arrow and Parquet requires the optional "
+                          + "module pyarrow, install it with "
+                          + "pip install McStasScript[arrow]")
+
+    return pyarrow
+
+
+def _import_parquet():
+    _import_pyarrow()
+    import pyarrow.parquet
+
+    return pyarrow.parquet
+
+
+def _schema_metadata(data):
+    """
+    Returns McStas metadata of a dataset as Arrow schema metadata
+    """
+    info, attributes = metadata_to_json(data.metadata)
+    return {b"name": json.dumps(data.name).encode(),
+            b"data_type": data.data_type.encode(),
+            b"info": info.encode(),
+            b"metadata": attributes.encode()}
+
+
+def _array(pa, array):
+    """
+    Returns Arrow array wrapping a numpy array, copied only if it is not
+    contiguous or has no Arrow equivalent
+    """
+    return pa.array(np.ascontiguousarray(array))
+
+
+def event_schema(data):
+    """
+    Returns Arrow schema of the events, one column per variable
+
+    Parameters
+    ----------
+    data : McStasDataEvent
+        Event data
+    """
+    pa = _import_pyarrow()
+
+    dtype = pa.from_numpy_dtype(np.dtype(data.Events.dtype))
+    fields = [pa.field(variable, dtype) for variable in data.variables]
+    return pa.schema(fields, metadata=_schema_metadata(data))
+
+
+def iter_event_batches(data, chunk_size=None):
+    """
+    Yields Arrow record batches with the events, one column per variable
+
+    Events in memory are stored column by column, so the batches wrap the
+    columns without copying, only the weights are copied when a weight
+    scale is pending. Events on disk are read chunk_size rows at a time
+    and copied once per chunk.
+
+    Parameters
+    ----------
+    data : McStasDataEvent
+        Event data, can be a selection
+
+    chunk_size : int, optional
+        Number of events in each batch, default is a single batch for
+        events in memory and the chunk_size of the data otherwise
+    """
+    pa = _import_pyarrow()
+    schema = event_schema(data)
+
+    if not data.in_memory:
+        for block in data.iter_chunks(chunk_size):
+            block = np.asfortranarray(block)
+            yield pa.RecordBatch.from_arrays(
+                [_array(pa, block[:, index])
+                 for index in range(block.shape[1])], schema=schema)
+        return
+
+    events = data.Events
+    n_events = len(events)
+    if chunk_size is None:
+        chunk_size = max(n_events, 1)
+    chunk_size = max(int(chunk_size), 1)
+
+    weight_index = None
+    if data._weight_scale != 1.0:
+        weight_index = data.find_variable_index("p")
+
+    for start in range(0, n_events, chunk_size):
+        columns = []
+        for index in range(events.shape[1]):
+            column = events[start:start + chunk_size, index]
+            if index == weight_index:
+                column = column * data._weight_scale
+            columns.append(_array(pa, column))
+
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def events_to_table(data, chunk_size=None):
+    """
+    Returns Arrow table with the events, see iter_event_batches
+
+    Parameters
+    ----------
+    data : McStasDataEvent
+        Event data
+
+    chunk_size : int, optional
+        Number of events in each record batch of the table
+    """
+    pa = _import_pyarrow()
+
+    batches = list(iter_event_batches(data, chunk_size=chunk_size))
+    return pa.Table.from_batches(batches, schema=event_schema(data))
+
+
+def _bin_coordinates(data):
+    """
+    Returns dict with bin center columns of binned data in array order
+    """
+    if data.data_type == "Binned 1D":
+        return {"x": np.asarray(data.xaxis, dtype=np.float64)}
+
+    if data.data_type == "Binned 2D":
+        limits = data.metadata.limits
+        n_x, n_y = data.metadata.dimension
+        x_step = (limits[1] - limits[0]) / n_x
+        y_step = (limits[3] - limits[2]) / n_y
+        x = limits[0] + (np.arange(n_x) + 0.5) * x_step
+        y = limits[2] + (np.arange(n_y) + 0.5) * y_step
+        # Intensity has y as first dimension
+        return {"x": np.tile(x, n_y), "y": np.repeat(y, n_x)}
+
+    return {}
+
+
+def binned_to_table(data):
+    """
+    Returns Arrow table of binned data with one row per bin
+
+    Columns are the bin centers, x for 1D data and x and y for 2D data,
+    followed by Intensity, Error and Ncount. The data arrays are wrapped
+    without copying.
+
+    Parameters
+    ----------
+    data : McStasDataBinned
+        Binned data
+    """
+    pa = _import_pyarrow()
+
+    columns = dict(_bin_coordinates(data))
+    for field in BINNED_COLUMNS:
+        columns[field] = np.ravel(getattr(data, field))
+
+    arrays = [_array(pa, column) for column in columns.values()]
+    schema = pa.schema([pa.field(name, array.type) for name, array
+                        in zip(columns, arrays)],
+                       metadata=_schema_metadata(data))
+
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def results_schema(extra_columns=None):
+    """
+    Returns Arrow schema used for lists of binned results
+
+    Parameters
+    ----------
+    extra_columns : dict, optional
+        Name and Arrow type of columns placed first, such as scan
+        parameters
+    """
+    pa = _import_pyarrow()
+
+    fields = [pa.field(name, column_type)
+              for name, column_type in (extra_columns or {}).items()]
+    fields.append(pa.field("monitor", pa.string()))
+    fields += [pa.field(name, pa.float64()) for name in ("x", "y")]
+    fields += [pa.field(name, pa.float64()) for name in BINNED_COLUMNS]
+
+    return pa.schema(fields)
+
+
+def _results_batch(pa, data, schema, extra_values=None):
+    """
+    Returns record batch of binned data in the results schema
+    """
+    coordinates = _bin_coordinates(data)
+    intensity = np.ravel(data.Intensity)
+    n_bins = len(intensity)
+
+    columns = {}
+    for name, value in (extra_values or {}).items():
+        columns[name] = pa.array(np.full(n_bins, value))
+    columns["monitor"] = pa.array([data.name] * n_bins, type=pa.string())
+    for name in ("x", "y"):
+        columns[name] = _array(pa, coordinates.get(name,
+                                                   np.full(n_bins, np.nan)))
+    for field in BINNED_COLUMNS:
+        # Float64 arrays are wrapped, other dtypes converted
+        columns[field] = _array(pa, np.ravel(getattr(data, field)).astype(
+            np.float64, copy=False))
+
+    arrays = [columns[field.name].cast(field.type) for field in schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def results_to_table(results):
+    """
+    Returns Arrow table with all binned monitors of a result list
+
+    Each monitor is a record batch with one row per bin, with the monitor
+    name, bin centers x and y (NaN where not used) and Intensity, Error
+    and Ncount. Float64 arrays are wrapped without copying. Event data
+    in the list is skipped, see events_to_table.
+
+    Parameters
+    ----------
+    results : list of McStasData
+        Results as returned by load_results
+    """
+    pa = _import_pyarrow()
+    schema = results_schema()
+
+    batches = [_results_batch(pa, data, schema) for data in results
+               if data.data_type != "Events"]
+    return pa.Table.from_batches(batches, schema=schema)
+
+
+def to_arrow(data, chunk_size=None):
+    """
+    Returns Arrow table of event data, binned data or a list of results
+
+    Parameters
+    ----------
+    data : McStasDataEvent, McStasDataBinned or list of McStasData
+        Data to export
+
+    chunk_size : int, optional
+        Number of events in each record batch for event data
+    """
+    if isinstance(data, (list, tuple)):
+        return results_to_table(data)
+
+    if data.data_type == "Events":
+        return events_to_table(data, chunk_size=chunk_size)
+
+    return binned_to_table(data)
+
+
+def write_parquet(data, filename, chunk_size=None, **kwargs):
+    """
+    Writes event data, binned data or a list of results to a Parquet file
+
+    Events are written batch by batch, so events on disk are never fully
+    read into memory.
+
+    Parameters
+    ----------
+    data : McStasDataEvent, McStasDataBinned or list of McStasData
+        Data to write
+
+    filename : str
+        Path of the Parquet file
+
+    chunk_size : int, optional
+        Number of events in each row group for event data
+
+    kwargs : keyword arguments
+        Passed to pyarrow.parquet.ParquetWriter, for example compression
+    """
+    pq = _import_parquet()
+
+    if isinstance(data, (list, tuple)) or data.data_type != "Events":
+        table = to_arrow(data)
+        with pq.ParquetWriter(filename, table.schema, **kwargs) as writer:
+            writer.write_table(table)
+        return
+
+    if chunk_size is None:
+        chunk_size = data.chunk_size
+
+    with pq.ParquetWriter(filename, event_schema(data), **kwargs) as writer:
+        for batch in iter_event_batches(data, chunk_size=chunk_size):
+            writer.write_batch(batch)
+
+
+def write_scan_parquet(scan, root, **kwargs):
+    """
+    Writes a ScanResult as Parquet dataset partitioned on monitor and scan
+    parameters
+
+    Each monitor cube is written with one row per scan point and bin,
+    with the scan parameters as columns, in Hive style folders such as
+    root/monitor=PSD/wavelength=2. Missing scan points are left out.
+    Files already in root are kept, so root should be a new folder.
+
+    Parameters
+    ----------
+    scan : ScanResult
+        Scan to write
+
+    root : str
+        Folder of the dataset
+
+    kwargs : keyword arguments
+        Passed to pyarrow.parquet.write_to_dataset
+    """
+    pa = _import_pyarrow()
+    pq = _import_parquet()
+
+    parameters = list(scan.axes)
+    extra_columns = {name: pa.from_numpy_dtype(np.asarray(values).dtype)
+                     for name, values in scan.axes.items()}
+    schema = results_schema(extra_columns)
+
+    os.makedirs(root, exist_ok=True)
+    for cube in scan:
+        batches = []
+        for index in np.ndindex(*scan.shape):
+            point = dict(zip(parameters, index))
+            if np.all(np.isnan(cube.Intensity[index])):
+                continue
+
+            data = cube.point(**point)
+            values = {name: scan.axes[name][position]
+                      for name, position in point.items()}
+            batches.append(_results_batch(pa, data, schema, values))
+
+        if len(batches) == 0:
+            continue
+
+        table = pa.Table.from_batches(batches, schema=schema)
+        pq.write_to_dataset(table, root,
+                            partition_cols=["monitor"] + parameters, **kwargs)
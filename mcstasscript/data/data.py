@@ -3,6 +3,26 @@ import numpy as np
 import copy
 import re
 
+from mcstasscript.data.histogram import Histogram
+from mcstasscript.data.dtypes import accumulation_array
+from mcstasscript.data.sparse import SparseBins
+from mcstasscript.data.rebin import BinnedRebinning
+from mcstasscript.data.memory import payload_store
+from mcstasscript.data.memory import data_footprint
+
+# Incremented when the name or filename of an existing dataset changes,
+# lets McStasDataList know its index is out of date without checking
+_dataset_keys_version = 0
+
+
+def _dataset_keys_changed(obj, key, value):
+    """
+    Counts changes to an attribute used as key by McStasDataList
+    """
+    global _dataset_keys_version
+    if key in obj.__dict__ and obj.__dict__[key] != value:
+        _dataset_keys_version += 1
+
 
 class McStasMetaData:
     """
@@ -55,6 +75,11 @@ class McStasMetaData:
         Overwrites current ylabel
     """
 
+    def __setattr__(self, key, value):
+        if key == "filename":
+            _dataset_keys_changed(self, key, value)
+        super().__setattr__(key, value)
+
     def __init__(self):
         """Creating a new instance, no parameters"""
         self.info = {}
@@ -473,6 +498,11 @@ class McStasData:
         sets plot options, keywords passed to McStasPlotOptions method
     """
 
+    def __setattr__(self, key, value):
+        if key in ("name", "metadata"):
+            _dataset_keys_changed(self, key, value)
+        super().__setattr__(key, value)
+
     def __init__(self, metadata):
         """
         Initialize a new McStas dataset, 4 positional arguments, pass
@@ -516,6 +546,28 @@ class McStasData:
     def get_data_location(self):
         return self.original_data_location
 
+    def _store_payload(self, attribute, array):
+        """
+        Stores data array, tracked when a memory budget is set
+        """
+        setattr(self, attribute, array)
+        if payload_store.active:
+            payload_store.register(self, attribute, array)
+
+    def _load_payload(self, attribute):
+        """
+        Returns data array, reading it back if it was spilled to disk
+        """
+        return payload_store.load(self, attribute)
+
+    def memory_footprint(self):
+        """
+        Returns dict with bytes in memory and spilled to disk
+
+        See set_memory_budget for spilling of data to disk.
+        """
+        return data_footprint(self)
+
     def __str__(self):
         """
         Returns string with quick summary of data
@@ -545,7 +597,197 @@ class McStasData:
         return "\n" + self.__str__()
 
 
-class McStasDataBinned(McStasData):
+class BinnedArithmetic:
+    """
+    Arithmetic operators for data with Intensity, Error and Ncount arrays
+
+    Operands can be other binned data, numbers or numpy arrays, which are
+    broadcast with the usual NumPy rules and treated as exact. Errors are
+    propagated assuming uncorrelated operands. Ncount is summed for
+    addition and subtraction of binned data and otherwise kept from the
+    left operand. The in-place operators modify the existing arrays.
+
+    Subclasses need Intensity, Error and Ncount and _with_arrays, which
+    creates a new object from the arrays. They can override _expand to
+    align plain arrays with their data, _prepare_in_place to make the
+    arrays writable and _arrays_changed to update derived quantities
+    after in-place changes.
+    """
+
+    # Let numpy defer to the reflected operators of this class
+    __array_ufunc__ = None
+
+    # Operations with an object of higher priority are left to that object
+    _arithmetic_priority = 0
+
+    def _arrays_changed(self):
+        pass
+
+    def _prepare_in_place(self):
+        pass
+
+    def _expand(self, array):
+        return array
+
+    def _operand(self, other):
+        """
+        Returns intensity, error and ncount of other, None if not binned
+
+        Returns NotImplemented if the operation should be left to other.
+        """
+        if isinstance(other, BinnedArithmetic):
+            if other._arithmetic_priority > self._arithmetic_priority:
+                return NotImplemented
+            return other.Intensity, other.Error, other.Ncount
+
+        if isinstance(other, (int, float, np.number, np.ndarray, list)):
+            return self._expand(np.asarray(other)), None, None
+
+        return NotImplemented
+
+    def _apply(self, other, operation, reflected=False, in_place=False):
+        operand = self._operand(other)
+        if operand is NotImplemented:
+            return NotImplemented
+
+        if in_place:
+            self._prepare_in_place()
+
+        fields = ("Intensity", "Error", "Ncount")
+        arrays = tuple(getattr(self, field) for field in fields)
+
+        # Compact dtypes are computed in float64
+        accumulated = tuple(accumulation_array(array) for array in arrays)
+        operand = tuple(None if array is None else accumulation_array(array)
+                        for array in operand)
+        if reflected:
+            result = operation(operand, accumulated)
+        else:
+            result = operation(accumulated, operand)
+
+        if not in_place:
+            return self._with_arrays(*result)
+
+        for field, array, new in zip(fields, arrays, result):
+            # In-place results keep the dtype of the stored arrays
+            np.copyto(array, new, casting="unsafe")
+            # Stored again in case the array was spilled to disk meanwhile
+            setattr(self, field, array)
+        self._arrays_changed()
+        return self
+
+    @staticmethod
+    def _add(first, second):
+        intensity_1, error_1, ncount_1 = first
+        intensity_2, error_2, ncount_2 = second
+
+        intensity = intensity_1 + intensity_2
+        error = combine_errors(error_1, error_2)
+        ncount = combine_ncount(ncount_1, ncount_2, add=True)
+        return intensity, error, ncount
+
+    @staticmethod
+    def _subtract(first, second):
+        intensity_1, error_1, ncount_1 = first
+        intensity_2, error_2, ncount_2 = second
+
+        intensity = intensity_1 - intensity_2
+        error = combine_errors(error_1, error_2)
+        ncount = combine_ncount(ncount_1, ncount_2, add=True)
+        return intensity, error, ncount
+
+    @staticmethod
+    def _multiply(first, second):
+        intensity_1, error_1, ncount_1 = first
+        intensity_2, error_2, ncount_2 = second
+
+        intensity = intensity_1 * intensity_2
+        error = combine_errors(None if error_1 is None
+                               else error_1 * intensity_2,
+                               None if error_2 is None
+                               else intensity_1 * error_2)
+        ncount = combine_ncount(ncount_1, ncount_2)
+        return intensity, error, ncount
+
+    @staticmethod
+    def _divide(first, second):
+        intensity_1, error_1, ncount_1 = first
+        intensity_2, error_2, ncount_2 = second
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            intensity = intensity_1 / intensity_2
+            error = combine_errors(None if error_1 is None
+                                   else error_1 / intensity_2,
+                                   None if error_2 is None
+                                   else intensity * error_2 / intensity_2)
+        ncount = combine_ncount(ncount_1, ncount_2)
+        return intensity, error, ncount
+
+    def __add__(self, other):
+        return self._apply(other, self._add)
+
+    def __radd__(self, other):
+        return self._apply(other, self._add, reflected=True)
+
+    def __iadd__(self, other):
+        return self._apply(other, self._add, in_place=True)
+
+    def __sub__(self, other):
+        return self._apply(other, self._subtract)
+
+    def __rsub__(self, other):
+        return self._apply(other, self._subtract, reflected=True)
+
+    def __isub__(self, other):
+        return self._apply(other, self._subtract, in_place=True)
+
+    def __mul__(self, other):
+        return self._apply(other, self._multiply)
+
+    def __rmul__(self, other):
+        return self._apply(other, self._multiply, reflected=True)
+
+    def __imul__(self, other):
+        return self._apply(other, self._multiply, in_place=True)
+
+    def __truediv__(self, other):
+        return self._apply(other, self._divide)
+
+    def __rtruediv__(self, other):
+        return self._apply(other, self._divide, reflected=True)
+
+    def __itruediv__(self, other):
+        return self._apply(other, self._divide, in_place=True)
+
+    def __neg__(self):
+        return self._with_arrays(-self.Intensity, self.Error, self.Ncount)
+
+
+def combine_errors(error_1, error_2):
+    """
+    Adds two error contributions in quadrature, None means no error
+    """
+    if error_1 is None:
+        return np.abs(error_2)
+    if error_2 is None:
+        return np.abs(error_1)
+
+    return np.sqrt(np.square(error_1) + np.square(error_2))
+
+
+def combine_ncount(ncount_1, ncount_2, add=False):
+    """
+    Returns Ncount of a result, summed when adding binned data
+    """
+    if ncount_1 is None:
+        return ncount_2
+    if ncount_2 is None or not add:
+        return ncount_1
+
+    return ncount_1 + ncount_2
+
+
+class McStasDataBinned(BinnedArithmetic, BinnedRebinning, McStasData):
     """
     Class for holding full McStas dataset with data, metadata and
     plotting preferences
@@ -573,6 +815,10 @@ class McStasDataBinned(McStasData):
     plot_options : McStasPlotOptions instance
         Holds the plotting preferences for the dataset
 
+    is_sparse : bool
+        True if only the non-empty bins are stored, Intensity, Error and
+        Ncount are then read only dense arrays created on access
+
     Methods
     -------
     set_xlabel : string
@@ -589,8 +835,26 @@ class McStasDataBinned(McStasData):
 
     set_options : keyword arguments
         sets plot options, keywords passed to McStasPlotOptions method
+
+    to_sparse : float
+        stores only non-empty bins if the fill fraction is below limit
+
+    to_dense
+        stores full arrays again
+
+    rebin : int, array or tuple
+        combines bins by a factor or onto new bin edges
+
+    integrate_roi : tuple or list of tuples
+        sums intensity, error and ncount in regions of interest
+
+    +, -, *, / : McStasDataBinned, number or numpy array
+        arithmetic with error propagation, see BinnedArithmetic
     """
 
+    # Non-empty bins when stored sparse, see to_sparse
+    _sparse = None
+
     def __init__(self, metadata, intensity, error, ncount, **kwargs):
         """
         Initialize a new McStas dataset, 4 positional arguments, pass
@@ -646,6 +910,131 @@ class McStasDataBinned(McStasData):
         else:
             self.data_type = "Binned"
 
+    def _get_array(self, field):
+        if self._sparse is not None:
+            return self._sparse.dense(field)
+
+        return self._load_payload("_" + field)
+
+    def _set_array(self, field, array):
+        if self._sparse is not None:
+            # Other fields are kept as dense arrays
+            self.to_dense()
+
+        self._store_payload("_" + field, array)
+
+    def __setstate__(self, state):
+        """
+        Restores pickled data, also data pickled by earlier versions
+
+        The arrays were plain Intensity, Error and Ncount attributes in
+        earlier versions, they are moved to the payload store.
+        """
+        legacy = {field: state.pop(field)
+                  for field in ("Intensity", "Error", "Ncount")
+                  if field in state}
+
+        self.__dict__.update(state)
+        for field, array in legacy.items():
+            self._store_payload("_" + field, array)
+
+    Intensity = property(lambda self: self._get_array("Intensity"),
+                         lambda self, array: self._set_array("Intensity", array))
+
+    Error = property(lambda self: self._get_array("Error"),
+                     lambda self, array: self._set_array("Error", array))
+
+    Ncount = property(lambda self: self._get_array("Ncount"),
+                      lambda self, array: self._set_array("Ncount", array))
+
+    @property
+    def is_sparse(self):
+        return self._sparse is not None
+
+    def to_sparse(self, limit=None):
+        """
+        Stores only the non-empty bins, returns self
+
+        Reading Intensity, Error or Ncount then creates read only dense
+        arrays, assigning to them stores the data dense again.
+
+        Parameters
+        ----------
+        limit : float, optional
+            Data is only stored sparse if the fraction of non-empty bins
+            is at most limit, default is to always store sparse
+        """
+        if self._sparse is not None:
+            return self
+
+        sparse = SparseBins.from_dense(self._load_payload("_Intensity"),
+                                       self._load_payload("_Error"),
+                                       self._load_payload("_Ncount"))
+        if limit is not None and sparse.fill_fraction > limit:
+            return self
+
+        self._sparse = sparse
+        for field in ["Intensity", "Error", "Ncount"]:
+            self._store_payload("_" + field, None)
+
+        return self
+
+    def to_dense(self):
+        """
+        Stores the full arrays again, returns self
+        """
+        if self._sparse is None:
+            return self
+
+        sparse = self._sparse
+        self._sparse = None
+        for field in ["Intensity", "Error", "Ncount"]:
+            array = sparse.dense(field)
+            array.flags.writeable = True
+            self._store_payload("_" + field, array)
+
+        return self
+
+    def _prepare_in_place(self):
+        """
+        In-place arithmetic needs writable dense arrays
+        """
+        self.to_dense()
+
+    def _with_arrays(self, intensity, error, ncount):
+        """
+        Returns copy with new arrays, metadata and plot options are copied
+
+        The copy is stored sparse if this data is.
+        """
+        new = copy.copy(self)
+        new.metadata = copy.deepcopy(self.metadata)
+        new.plot_options = copy.deepcopy(self.plot_options)
+        new._sparse = None
+        new.Intensity = np.asarray(intensity)
+        new.Error = np.asarray(error)
+        new.Ncount = np.asarray(ncount)
+        new._arrays_changed()
+
+        if self.is_sparse:
+            new.to_sparse()
+
+        return new
+
+    def _arrays_changed(self):
+        """
+        Updates the totals in the metadata from the arrays
+        """
+        if self._sparse is not None:
+            (self.metadata.total_I, self.metadata.total_E,
+             self.metadata.total_N) = self._sparse.totals()
+            return
+
+        error = accumulation_array(self.Error)
+        self.metadata.total_I = float(np.sum(self.Intensity, dtype=np.float64))
+        self.metadata.total_E = float(np.sqrt(np.sum(np.square(error))))
+        self.metadata.total_N = float(np.sum(self.Ncount, dtype=np.float64))
+
 
 class McStasDataEvent(McStasData):
     """
@@ -653,6 +1042,10 @@ class McStasDataEvent(McStasData):
     plotting preferences. Usually data the first one million events
     is plotted.
 
+    The events can be held in memory as a numpy array, or be backed by a
+    memory-mapped file or h5py dataset. In the latter case the events are
+    only read in chunks of chunk_size rows when needed.
+
     Attributes
     ----------
     metadata : McStasMetaData instance
@@ -661,8 +1054,13 @@ class McStasDataEvent(McStasData):
     name : str
         Name of component, extracted from metadata
 
-    Events : numpy array
-        Event data
+    Events : numpy array, numpy memmap or h5py dataset
+        Event data, arrays in memory are stored column by column, so
+        C-ordered arrays are copied when assigned and later changes to
+        the original array are not seen by the dataset
+
+    chunk_size : int
+        Number of events read at a time from data not in memory
 
     plot_options : McStasPlotOptions instance
         Holds the plotting preferences for the dataset
@@ -683,6 +1081,15 @@ class McStasDataEvent(McStasData):
 
     set_options : keyword arguments
         sets plot options, keywords passed to McStasPlotOptions method
+
+    iter_chunks : int
+        yields the events in blocks of rows
+
+    sample : int
+        returns weight-aware random subsample for previews
+
+    clear_cache
+        removes cached derived columns such as speed and wavelength
     """
 
     def __init__(self, metadata, events, **kwargs):
@@ -694,38 +1101,45 @@ class McStasDataEvent(McStasData):
         metadata : McStasMetaData instance
             Holds the metadata for the dataset
 
-        events : numpy array
-            event data
+        events : numpy array, numpy memmap or h5py dataset
+            event data, arrays in memory that are not in Fortran order
+            are copied
+
+        kwargs : keyword arguments
+            chunk_size can be given to control the number of events read
+            at a time when the data is not in memory, cache_columns can be
+            set False to avoid keeping derived columns in memory
         """
 
         super().__init__(metadata)
 
         # three basic arrays from positional arguments
-        if not isinstance(events, np.ndarray):
+        if not (hasattr(events, "shape") and hasattr(events, "dtype")
+                and len(events.shape) == 2):
             raise ValueError("events should be numpy array!")
 
+        # Derived columns computed from events in memory, keyed on axis
+        self._column_cache = {}
+        # Minimum and maximum of columns, keyed on axis and flag_info
+        self._range_cache = {}
+        self.cache_columns = kwargs.get("cache_columns", True)
+
         self.Events = events
         self.data_type = "Events"
 
+        self.chunk_size = int(kwargs.get("chunk_size", 1000000))
+        if self.chunk_size < 1:
+            raise ValueError("chunk_size should be a positive integer, was "
+                             + str(self.chunk_size))
+
+        # Weight scale applied on read for data that can not be modified
+        self._weight_scale = 1.0
+
         self.variables = self.metadata.info["variables"].strip()
         self.variables = self.variables.split()
 
         # Calculate I, E and N
-        if "p" in self.variables:
-            p_array = self.get_data_column("p")
-            total_I = p_array.sum()
-            total_E = np.sqrt((p_array ** 2).sum())
-            total_N = len(p_array)
-
-            self.metadata.total_I = total_I
-            self.metadata.total_E = total_E
-            self.metadata.total_N = total_N
-
-        else:
-
-            self.metadata.total_I = None
-            self.metadata.total_E = None
-            self.metadata.total_N = None
+        self.totals()
 
         self.labels = {"t": "t [s]",
                        "x": "x [m]",
@@ -740,6 +1154,199 @@ class McStasDataEvent(McStasData):
                        "dx": "divergence x [deg]",
                        "dy": "divergence y [deg]"}
 
+    def __setstate__(self, state):
+        """
+        Restores pickled data, also data pickled by earlier versions
+
+        Earlier versions stored the events as a plain Events attribute
+        and had no chunked reading or column cache, these are set up as
+        for new data.
+        """
+        events = state.pop("Events", None)
+
+        self.__dict__.update(state)
+        defaults = {"_column_cache": {}, "_range_cache": {},
+                    "cache_columns": True, "chunk_size": 1000000,
+                    "_weight_scale": 1.0}
+        for attribute, value in defaults.items():
+            if attribute not in self.__dict__:
+                setattr(self, attribute, value)
+
+        if events is not None:
+            self.Events = events
+
+    @property
+    def Events(self):
+        return self._load_payload("_events")
+
+    @Events.setter
+    def Events(self, events):
+        """
+        Stores event array with each column contiguous in memory
+
+        Events are always accessed one variable at a time, so arrays in
+        memory are converted to Fortran order. This copies arrays not
+        already in Fortran order, so changes made through the given array
+        afterwards do not reach the dataset. Fortran-ordered arrays,
+        memory-mapped files and h5py datasets are used without copying.
+        The event loaders read files directly into Fortran order, so
+        loaded events are not copied.
+        """
+        if (isinstance(events, np.ndarray)
+                and not isinstance(events, np.memmap)):
+            events = np.asfortranarray(events)
+
+        self._store_payload("_events", events)
+        self.clear_cache()
+
+    def __len__(self):
+        return self.Events.shape[0]
+
+    def totals(self):
+        """
+        Calculates total intensity, error and number of events
+
+        The totals are stored in the metadata and returned as a tuple,
+        all are None if the events have no weight column.
+        """
+        if "p" not in self.variables:
+            self.metadata.total_I = None
+            self.metadata.total_E = None
+            self.metadata.total_N = None
+            return None, None, None
+
+        total_I = 0.0
+        total_E_squared = 0.0
+        total_N = 0
+        for p_array in self.iter_columns("p"):
+            total_I += p_array.sum(dtype=np.float64)
+            total_E_squared += np.sum(p_array.astype(np.float64) ** 2)
+            total_N += len(p_array)
+        total_E = np.sqrt(total_E_squared)
+
+        self.metadata.total_I = total_I
+        self.metadata.total_E = total_E
+        self.metadata.total_N = total_N
+
+        return total_I, total_E, total_N
+
+    @property
+    def in_memory(self):
+        """
+        True if the events are held in a regular numpy array in memory
+        """
+        return (isinstance(self.Events, np.ndarray)
+                and not isinstance(self.Events, np.memmap))
+
+    def iter_chunks(self, n=None):
+        """
+        Yields the event rows in blocks of at most n rows
+
+        Data in memory is returned as a single block unless n is given,
+        data on disk is read chunk_size rows at a time. Blocks are views
+        where possible and should not be modified.
+
+        Parameters:
+
+        n : int
+            Number of rows in each block
+        """
+        n_events = len(self)
+        if n is None:
+            n = n_events if self.in_memory else self.chunk_size
+        n = max(int(n), 1)
+
+        for start in range(0, n_events, n):
+            yield self._read_block(start, start + n)
+
+    def _read_block(self, start, stop):
+        """
+        Returns event rows from start to stop with weight scale applied
+        """
+        block = np.asarray(self.Events[start:stop])
+        if self._weight_scale != 1.0:
+            block = np.array(block)
+            block[:, self.find_variable_index("p")] *= self._weight_scale
+
+        return block
+
+    def _columns_in_range(self, axes, start, stop, flag_info=None):
+        """
+        Returns list of columns for given axes for event rows start to stop
+
+        Data in memory is sliced from the full columns, so cached derived
+        columns are reused. Other data is read once for all axes.
+        """
+        if not self.in_memory:
+            block = self._read_block(start, stop)
+            return [self._column_from_block(block, axis, flag_info)
+                    for axis in axes]
+
+        columns = []
+        for axis in axes:
+            if axis.lower() in self._derived_axes:
+                column = self.get_data_column(axis)[start:stop]
+            else:
+                column = self._column_from_block(self.Events[start:stop],
+                                                 axis, flag_info)
+                if (self._weight_scale != 1.0
+                        and self._is_weight_axis(axis, flag_info)):
+                    column = column * self._weight_scale
+            columns.append(column)
+
+        return columns
+
+    def _is_weight_axis(self, axis, flag_info=None):
+        """
+        Returns True if given axis name refers to the weight column p
+        """
+        if axis.lower() in self._derived_axes:
+            return False
+
+        return (self.find_variable_index(axis, flag_info)
+                == self.find_variable_index("p"))
+
+    def iter_columns(self, axis, flag_info=None, n=None):
+        """
+        Yields the data column for given axis name in blocks of at most n
+
+        Parameters:
+
+        axis : str
+            Name of parameter
+
+        flag_info : list
+            list of names for user variables in event data set
+
+        n : int
+            Number of rows in each block
+        """
+        for columns in self._iter_axes([axis], flag_info, n):
+            yield columns[0]
+
+    def clear_cache(self):
+        """
+        Removes cached derived columns and column ranges, they are
+        recalculated when needed
+        """
+        self._column_cache = {}
+        self._range_cache = {}
+
+    def _iter_axes(self, axes, flag_info=None, n=None):
+        """
+        Yields tuples with the columns of the given axes block by block
+
+        Each block is only read once, data in memory uses the column cache.
+        """
+        if self.in_memory and n is None:
+            yield tuple(self.get_data_column(axis, flag_info=flag_info)
+                        for axis in axes)
+            return
+
+        for block in self.iter_chunks(n):
+            yield tuple(self._column_from_block(block, axis, flag_info)
+                        for axis in axes)
+
     def find_variable_index(self, axis, flag_info=None):
         """
         Returns variable index for given axis name
@@ -764,12 +1371,120 @@ class McStasDataEvent(McStasData):
         """
         Scales all event weights with given factor
 
+        Events that can not be modified in place, for example when read
+        from disk, are scaled when they are read.
+
         Parameters:
 
         factor : float
             Factor with which all weights are scaled
         """
-        self.Events[:, self.find_variable_index("p")] *= factor
+        if self.in_memory and self.Events.flags.writeable:
+            self.Events[:, self.find_variable_index("p")] *= factor
+        else:
+            self._weight_scale *= factor
+
+        self.clear_cache()
+
+    def select(self, mask=None, flag_info=None, **ranges):
+        """
+        Returns selection of the events without copying the event data
+
+        The selection refers to the same event buffer and the conditions
+        are only evaluated chunk by chunk when the selected events are
+        used, for example by make_1d, make_2d or totals. Selections can be
+        refined further by calling select on them again.
+
+        Parameters:
+
+        mask : boolean numpy array
+            Events to keep, one element per event
+
+        flag_info : list
+            list of names for user variables in event data set
+
+        ranges : keyword arguments
+            axis name with (min, max) tuple, both limits included, None
+            can be used for open limits, for example l=(2.0, 4.0)
+        """
+        return McStasDataEventSelection(self, mask=mask,
+                                        flag_info=flag_info, **ranges)
+
+    def sample(self, n, seed=None):
+        """
+        Returns weight-aware random subsample of at most n events
+
+        Events are drawn with probability proportional to their weight
+        using stratified sampling, so each of the n strata of the total
+        intensity contributes exactly one event. All sampled events get
+        the weight total_I / n, histograms of the sample are then
+        unbiased estimates of histograms of all events. Events without a
+        weight column are sampled uniformly. The events are read in a
+        single pass of chunk_size rows, and the data itself is returned
+        when it has at most n events.
+
+        Parameters:
+
+        n : int
+            Number of events in the sample
+
+        seed : int or numpy Generator
+            Seed for the random numbers
+        """
+        n = int(n)
+        if n < 1:
+            raise ValueError("Sample size should be a positive integer, was "
+                             + str(n))
+
+        if len(self) <= n:
+            return self
+
+        weight_index = None
+        if "p" in self.variables:
+            weight_index = self.find_variable_index("p")
+            if self.metadata.total_I is None:
+                self.totals()
+            total = float(self.metadata.total_I)
+        if weight_index is None or not total > 0:
+            weight_index = None
+            total = float(len(self))
+
+        rng = np.random.default_rng(seed)
+        positions = (np.arange(n) + rng.random(n)) * (total / n)
+
+        blocks = []
+        offset = 0.0
+        start = 0
+        last_block = None
+        for block in self.iter_chunks(self.chunk_size):
+            if len(block) == 0:
+                continue
+            last_block = block
+
+            if weight_index is None:
+                weights = np.ones(len(block))
+            else:
+                weights = block[:, weight_index].astype(np.float64)
+            cumulative = offset + np.cumsum(weights)
+
+            stop = int(np.searchsorted(positions, cumulative[-1], side="left"))
+            rows = np.searchsorted(cumulative, positions[start:stop],
+                                   side="right")
+            blocks.append(block[np.minimum(rows, len(block) - 1)])
+
+            start = stop
+            offset = cumulative[-1]
+
+        if start < n and last_block is not None:
+            # Rounding in the cumulative sum can leave the last positions
+            blocks.append(np.repeat(last_block[-1:], n - start, axis=0))
+
+        events = np.concatenate(blocks)
+        if weight_index is not None:
+            events[:, weight_index] = total / n
+
+        return McStasDataEvent(copy.deepcopy(self.metadata), events,
+                               chunk_size=self.chunk_size)
 
     def get_label(self, axis, flag_info=None):
         """
@@ -808,44 +1523,130 @@ class McStasDataEvent(McStasData):
         flag_info : list
             list of names for user variables in event data set
         """
+        if self.in_memory:
+            key = axis.lower()
+            if key not in self._derived_axes:
+                column = self._column_from_block(self.Events, axis, flag_info)
+                if (self._weight_scale != 1.0
+                        and self._is_weight_axis(axis, flag_info)):
+                    column = column * self._weight_scale
+                return column
+
+            if key in self._column_cache:
+                return self._column_cache[key]
+
+            if key in ("l", "e"):
+                # Wavelength and energy share the cached speed column
+                column = self._convert_speed(self.get_data_column("speed"),
+                                             key)
+            else:
+                column = self._column_from_block(self.Events, axis)
+
+            if self.cache_columns:
+                # Cached columns are shared between callers
+                column.flags.writeable = False
+                self._column_cache[key] = column
+
+            return column
+
+        columns = list(self.iter_columns(axis, flag_info=flag_info))
+        if len(columns) == 0:
+            return np.zeros(0, dtype=self.Events.dtype)
+
+        return np.concatenate(columns)
 
+    # Axes calculated from the velocity columns
+    _derived_axes = ("speed", "l", "e", "dx", "dy")
+
+    @staticmethod
+    def _convert_speed(speed, axis):
+        """
+        Converts speed column to wavelength (l) or energy (e)
+        """
         m_n_const = 1.674927e-27
         h_const = 6.626068e-34
 
-        if axis.lower() == "speed":
-            # Convert velocity to speed (must be before l and e)
-            vx = self.Events[:, self.find_variable_index("vx")]
-            vy = self.Events[:, self.find_variable_index("vy")]
-            vz = self.Events[:, self.find_variable_index("vz")]
-            return np.sqrt(vx ** 2 + vy ** 2 + vz ** 2)
-
-        elif axis.lower() == "l":
+        if axis == "l":
             # Convert speed to lambda
-            speed = self.get_data_column("speed")
             lambda_meter = h_const / (m_n_const*speed)
             return lambda_meter*1E10
 
-        elif axis.lower() == "e":
-            # Convert speed to energy
-            speed = self.get_data_column("speed")
-            energy_joule = 0.5 * m_n_const * speed ** 2
-            return energy_joule/1.60217663E-19*1E3
+        # Convert speed to energy
+        energy_joule = 0.5 * m_n_const * speed ** 2
+        return energy_joule/1.60217663E-19*1E3
+
+    def _column_from_block(self, block, axis, flag_info=None):
+        """
+        Returns data column for given axis name from a block of events
+        """
+
+        if axis.lower() == "speed":
+            # Convert velocity to speed (must be before l and e)
+            vx = block[:, self.find_variable_index("vx")]
+            vy = block[:, self.find_variable_index("vy")]
+            vz = block[:, self.find_variable_index("vz")]
+            return np.sqrt(vx ** 2 + vy ** 2 + vz ** 2)
+
+        elif axis.lower() in ("l", "e"):
+            speed = self._column_from_block(block, "speed")
+            return self._convert_speed(speed, axis.lower())
 
         elif axis.lower() == "dx":
             # Convert velocity to divergence x
-            vx = self.Events[:, self.find_variable_index("vx")]
-            vz = self.Events[:, self.find_variable_index("vz")]
+            vx = block[:, self.find_variable_index("vx")]
+            vz = block[:, self.find_variable_index("vz")]
             return np.arctan(vx/vz) * 180 / np.pi
 
         elif axis.lower() == "dy":
             # Convert velocity to divergence y
-            vy = self.Events[:, self.find_variable_index("vy")]
-            vz = self.Events[:, self.find_variable_index("vz")]
+            vy = block[:, self.find_variable_index("vy")]
+            vz = block[:, self.find_variable_index("vz")]
             return np.arctan(vy/vz) * 180 / np.pi
 
         else:
             index = self.find_variable_index(axis, flag_info=flag_info)
-            return self.Events[:, index]
+            return block[:, index]
+
+    def get_data_range(self, axis, flag_info=None):
+        """
+        Returns minimum and maximum of data column for given axis name
+
+        The range is kept with the cached columns, so repeated calls do
+        not pass over the events again.
+
+        Parameters:
+
+        axis : str
+            Name of parameter
+
+        flag_info : list
+            list of names for user variables in event data set
+        """
+        key = (axis.lower(), tuple(flag_info or ()))
+        if key in self._range_cache:
+            return self._range_cache[key]
+
+        minimum = None
+        maximum = None
+        for column in self.iter_columns(axis, flag_info=flag_info):
+            if len(column) == 0:
+                continue
+            column_min = np.min(column)
+            column_max = np.max(column)
+            if minimum is None:
+                minimum, maximum = column_min, column_max
+            else:
+                minimum = min(minimum, column_min)
+                maximum = max(maximum, column_max)
+
+        if minimum is None:
+            # Same default range as numpy histogram for empty data
+            minimum, maximum = 0.0, 1.0
+
+        if self.cache_columns:
+            self._range_cache[key] = (minimum, maximum)
+
+        return minimum, maximum
 
     def make_1d(self, axis1, n_bins=50, flag_info=None):
         """
@@ -862,14 +1663,18 @@ class McStasDataEvent(McStasData):
         flag_info : list
             list of names for user variables in event data set
         """
-        data = self.get_data_column(axis1, flag_info)
         label = self.get_label(axis1, flag_info)
+        data_range = self.get_data_range(axis1, flag_info)
+        histogram = Histogram(n_bins, data_range)
 
-        weights = self.get_data_column("p", flag_info)
-        intensity, edges = np.histogram(data, bins=n_bins, weights=weights)
-        error_squared, edges = np.histogram(data, bins=n_bins, weights=weights**2)
+        for data, weights in self._iter_axes([axis1, "p"], flag_info):
+            histogram.add(data, weights=weights)
+
+        intensity = histogram.intensity
+        error_squared = histogram.error_squared
         error = np.sqrt(error_squared)
-        ncount, edges = np.histogram(data, bins=n_bins)
+        ncount = histogram.ncount
+        edges = histogram.edges[0]
 
         centers = edges[0:-1] + 0.5*(edges[1] - edges[0])
 
@@ -914,19 +1719,25 @@ class McStasDataEvent(McStasData):
             list of names for user variables in event data set
         """
 
-        data1 = self.get_data_column(axis1, flag_info)
         label1 = self.get_label(axis1, flag_info)
-        data2 = self.get_data_column(axis2, flag_info)
         label2 = self.get_label(axis2, flag_info)
 
         if isinstance(n_bins, list):
-            n_bins.reverse()
+            n_bins = list(reversed(n_bins))
+
+        data_range = [self.get_data_range(axis2, flag_info),
+                      self.get_data_range(axis1, flag_info)]
+        histogram = Histogram(n_bins, data_range)
 
-        weights = self.get_data_column("p", flag_info)
-        intensity, edges2, edges1 = np.histogram2d(data2, data1, bins=n_bins, weights=weights)
-        error_squared, edges2, edges1 = np.histogram2d(data2, data1, bins=n_bins, weights=weights**2)
+        axes = [axis1, axis2, "p"]
+        for data1, data2, weights in self._iter_axes(axes, flag_info):
+            histogram.add(data2, data1, weights=weights)
+
+        intensity = histogram.intensity
+        error_squared = histogram.error_squared
         error = np.sqrt(error_squared)
-        ncount, edges2, edges1 = np.histogram2d(data2, data1, bins=n_bins)
+        ncount = histogram.ncount
+        edges2, edges1 = histogram.edges
 
         centers1 = edges1[0:-1] + 0.5*(edges1[1] - edges1[0])
         centers2 = edges2[0:-1] + 0.5*(edges2[1] - edges2[0])
@@ -959,7 +1770,7 @@ class McStasDataEvent(McStasData):
 
         string = "McStasDataEvent: "
         string += self.name + " with "
-        string += str(len(self.Events)) + " events."
+        string += str(len(self)) + " events."
         if "variables" in self.metadata.info:
             string += " Variables: "
             string += self.metadata.info["variables"].strip()
@@ -969,6 +1780,405 @@ class McStasDataEvent(McStasData):
     def __repr__(self):
         return "\n" + self.__str__()
 
+
+class McStasDataEventSelection(McStasDataEvent):
+    """
+    Selection of events from a McStasDataEvent without a copy of the events
+
+    Holds a reference to the full event data and a list of conditions,
+    ranges along named axes and boolean masks. Events are read chunk by
+    chunk from the full data and the conditions applied to each chunk, so
+    at most chunk_size events are copied at a time. Selections are
+    created with the select method of McStasDataEvent.
+
+    Attributes
+    ----------
+    source : McStasDataEvent
+        Event data the selection is made from
+
+    ranges : list
+        (axis, min, max, flag_info) for each range condition
+
+    masks : list
+        Boolean arrays with one element per event in source
+    """
+
+    def __init__(self, source, mask=None, flag_info=None, **ranges):
+        """
+        Creates selection from source events, use McStasDataEvent.select
+
+        Parameters
+        ----------
+        source : McStasDataEvent
+            Event data to select from, can be a selection
+
+        mask : boolean numpy array
+            Events to keep, one element per event in source
+
+        flag_info : list
+            list of names for user variables in event data set
+
+        ranges : keyword arguments
+            axis name with (min, max) tuple, None for open limits
+        """
+        McStasData.__init__(self, copy.deepcopy(source.metadata))
+        self.data_type = "Events"
+        self.original_data_location = source.original_data_location
+        self.plot_options = copy.deepcopy(source.plot_options)
+
+        self.variables = source.variables
+        self.labels = source.labels
+        self.chunk_size = source.chunk_size
+        self.cache_columns = False
+        self._column_cache = {}
+        self._range_cache = {}
+
+        if isinstance(source, McStasDataEventSelection):
+            self.source = source.source
+            self.ranges = list(source.ranges)
+            self.masks = list(source.masks)
+            if mask is not None and len(mask) != len(self.source):
+                # Mask given for the events in the selection
+                mask = self._expand_mask(source, mask)
+            # Weight scale of the source data is applied when it is read
+            self._weight_scale = source._weight_scale
+        else:
+            self.source = source
+            self.ranges = []
+            self.masks = []
+            self._weight_scale = 1.0
+
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+            if mask.shape != (len(self.source),):
+                raise ValueError("Selection mask should have one element "
+                                 + "per event, got shape "
+                                 + str(mask.shape) + " for "
+                                 + str(len(self.source)) + " events.")
+            self.masks.append(mask)
+
+        for axis, limits in ranges.items():
+            if len(limits) != 2:
+                raise ValueError("Range for " + str(axis) + " should be "
+                                 + "given as (min, max), got "
+                                 + str(limits))
+            # Check axis exists before any events are read
+            if axis.lower() not in self._derived_axes:
+                self.find_variable_index(axis, flag_info)
+            self.ranges.append((axis, limits[0], limits[1], flag_info))
+
+        self._n_selected = None
+        self.metadata.total_I = None
+        self.metadata.total_E = None
+        self.metadata.total_N = None
+
+    @staticmethod
+    def _expand_mask(selection, mask):
+        """
+        Converts mask over the events of a selection to mask over source
+        """
+        mask = np.asarray(mask, dtype=bool)
+        if mask.shape != (len(selection),):
+            raise ValueError("Selection mask should have one element "
+                             + "per event, got shape " + str(mask.shape)
+                             + " for " + str(len(selection)) + " events.")
+
+        full_mask = selection.selection_mask()
+        full_mask[full_mask] = mask
+        return full_mask
+
+    @property
+    def Events(self):
+        """
+        Copy of the selected events, use iter_chunks to avoid the copy
+        """
+        blocks = list(self.iter_chunks())
+        if len(blocks) == 0:
+            return np.zeros((0, len(self.variables)))
+
+        return np.concatenate(blocks)
+
+    @Events.setter
+    def Events(self, events):
+        raise RuntimeError("Events of a selection can not be set, modify "
+                           + "the source data instead.")
+
+    @property
+    def in_memory(self):
+        return False
+
+    def __len__(self):
+        if self._n_selected is None:
+            self._n_selected = sum(int(np.count_nonzero(keep)) for _, keep, _
+                                   in self._iter_selected([]))
+
+        return self._n_selected
+
+    def selection_mask(self):
+        """
+        Returns boolean array with one element per event in source
+        """
+        blocks = [keep for _, keep, _ in self._iter_selected([])]
+        if len(blocks) == 0:
+            return np.zeros(0, dtype=bool)
+
+        return np.concatenate(blocks)
+
+    def _iter_selected(self, axes, flag_info=None, n=None):
+        """
+        Yields start index, mask and list of columns for chunks of source
+        """
+        if n is None:
+            n = self.chunk_size
+        n = max(int(n), 1)
+
+        range_axes = [(axis, axis_flags) for axis, _, _, axis_flags
+                      in self.ranges]
+        n_events = len(self.source)
+        for start in range(0, n_events, n):
+            stop = min(start + n, n_events)
+
+            keep = np.ones(stop - start, dtype=bool)
+            for mask in self.masks:
+                keep &= mask[start:stop]
+
+            for (axis, lower, upper, axis_flags) in self.ranges:
+                column = self.source._columns_in_range([axis], start, stop,
+                                                       axis_flags)[0]
+                if lower is not None:
+                    keep &= column >= lower
+                if upper is not None:
+                    keep &= column <= upper
+
+            columns = []
+            if len(axes) > 0:
+                columns = self.source._columns_in_range(axes, start, stop,
+                                                        flag_info)
+
+            yield start, keep, columns
+
+    def _iter_axes(self, axes, flag_info=None, n=None):
+        weight_index = None
+        if self._weight_scale != 1.0:
+            for index, axis in enumerate(axes):
+                if self._is_weight_axis(axis, flag_info):
+                    weight_index = index
+
+        for _, keep, columns in self._iter_selected(axes, flag_info, n):
+            columns = [column[keep] for column in columns]
+            if weight_index is not None:
+                columns[weight_index] *= self._weight_scale
+            yield tuple(columns)
+
+    def iter_chunks(self, n=None):
+        """
+        Yields the selected event rows, one block per chunk of the source
+
+        Parameters:
+
+        n : int
+            Number of source rows considered for each block
+        """
+        if n is None:
+            n = self.chunk_size
+        n = max(int(n), 1)
+
+        for start, keep, _ in self._iter_selected([], n=n):
+            block = self.source._read_block(start, start + n)[keep]
+            if self._weight_scale != 1.0:
+                block[:, self.find_variable_index("p")] *= self._weight_scale
+            yield block
+
+    def scale_weights(self, factor):
+        """
+        Scales weights of the selected events when they are read
+
+        The source events are not modified.
+
+        Parameters:
+
+        factor : float
+            Factor with which all weights are scaled
+        """
+        self._weight_scale *= factor
+
+    def totals(self):
+        totals = super().totals()
+        if totals[2] is not None:
+            self._n_selected = totals[2]
+
+        return totals
+
+    def __str__(self):
+        """
+        Returns string with quick summary of data
+        """
+
+        string = "McStasDataEventSelection: "
+        string += self.name + " with "
+        string += str(len(self)) + " of " + str(len(self.source))
+        string += " events."
+        if len(self.ranges) > 0:
+            string += " Ranges: "
+            string += ", ".join(str(axis) + "=" + str((lower, upper))
+                                for axis, lower, upper, _ in self.ranges)
+
+        return string
+
+class McStasDataList(list):
+    """
+    List of McStasData objects with lookup by component name or filename
+
+    Behaves as a normal list, but keeps dictionaries from component name
+    and filename to the datasets, so lookups do not search the list. The
+    dictionaries are rebuilt when first needed after the list changes,
+    or after the name, metadata or filename of any dataset was changed,
+    so renamed datasets are also found.
+
+    Methods
+    -------
+    find(name)
+        Returns list of datasets with name, or with filename if no
+        dataset has the name
+
+    names()
+        Returns list of component names in list order
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._name_index = None
+        self._filename_index = None
+        self._index_version = None
+
+    def _changed(self):
+        self._name_index = None
+        self._filename_index = None
+        self._index_version = None
+
+    @staticmethod
+    def _index_keys(data):
+        return data.name, getattr(data.metadata, "filename", None)
+
+    def _build_index(self):
+        self._index_version = _dataset_keys_version
+        self._name_index = {}
+        self._filename_index = {}
+        for data in self:
+            name, filename = self._index_keys(data)
+            self._name_index.setdefault(name, []).append(data)
+            if filename is not None:
+                self._filename_index.setdefault(filename, []).append(data)
+
+    def _lookup(self, name):
+        """
+        Returns matches by name, or by filename if no name matches
+        """
+        if (self._name_index is None
+                or self._index_version != _dataset_keys_version):
+            # List changed or datasets were renamed since the index was built
+            self._build_index()
+
+        matches = self._name_index.get(name, [])
+        if len(matches) > 0:
+            return list(matches)
+
+        return list(self._filename_index.get(name, []))
+
+    def find(self, name):
+        """
+        Returns list of datasets with component name, or with filename if
+        no dataset has the component name, in list order
+
+        Parameters
+        ----------
+        name : str
+            Component name or filename of the dataset
+        """
+        return self._lookup(name)
+
+    def names(self):
+        """
+        Returns list of component names in list order
+        """
+        return [data.name for data in self]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            matches = self.find(key)
+            if len(matches) == 0:
+                raise KeyError("No dataset with name: \"" + key
+                               + "\" found.")
+            if len(matches) == 1:
+                return matches[0]
+            return matches
+
+        item = super().__getitem__(key)
+        if isinstance(key, slice):
+            return McStasDataList(item)
+        return item
+
+    def __contains__(self, item):
+        if isinstance(item, str):
+            return len(self.find(item)) > 0
+
+        return super().__contains__(item)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self._changed()
+        return result
+
+    def __imul__(self, other):
+        result = super().__imul__(other)
+        self._changed()
+        return result
+
+    def append(self, item):
+        super().append(item)
+        self._changed()
+
+    def extend(self, items):
+        super().extend(items)
+        self._changed()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._changed()
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+    def pop(self, *args):
+        item = super().pop(*args)
+        self._changed()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+    def copy(self):
+        return McStasDataList(self)
+
+
 def parse_coordinates(line, keyword):
     # Extract the coordinates from the line
     match = re.search(r'\(([^)]+)\)', line)
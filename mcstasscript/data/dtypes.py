@@ -0,0 +1,159 @@
+import numpy as np
+
+# Arrays of loaded data that can be stored with another dtype
+DTYPE_FIELDS = ("Intensity", "Error", "Ncount", "Events")
+
+# Ncount stored as the smallest unsigned or signed integer holding it
+INTEGER = "integer"
+
+DTYPE_PRESETS = {
+    "float64": {"Intensity": np.float64, "Error": np.float64,
+                "Ncount": np.float64, "Events": np.float64},
+    "compact": {"Intensity": np.float32, "Error": np.float32,
+                "Ncount": INTEGER, "Events": np.float32},
+}
+
+_default_dtypes = "float64"
+
+
+def set_default_dtypes(dtypes):
+    """
+    Sets dtypes used by loaders when none are given
+
+    Parameters
+    ----------
+    dtypes : str or dict
+        "float64" (initial default), "compact" for float32 intensities,
+        errors and events with integer Ncount, or dict with dtype per
+        field (Intensity, Error, Ncount, Events), missing fields are
+        float64
+    """
+    global _default_dtypes
+
+    resolve_dtypes(dtypes)
+    _default_dtypes = dtypes
+
+
+def get_default_dtypes():
+    """
+    Returns dtypes used by loaders when none are given
+    """
+    return _default_dtypes
+
+
+def resolve_dtypes(dtypes=None):
+    """
+    Returns dict with dtype for each field, checking the given dtypes
+
+    Parameters
+    ----------
+    dtypes : str, dict or None
+        Preset name, dict with dtype per field or None for the default
+    """
+    if dtypes is None:
+        dtypes = _default_dtypes
+
+    if isinstance(dtypes, str):
+        if dtypes not in DTYPE_PRESETS:
+            raise ValueError("Unknown dtypes preset \"" + dtypes + "\", "
+                             + "available: " + ", ".join(DTYPE_PRESETS))
+        return dict(DTYPE_PRESETS[dtypes])
+
+    if not isinstance(dtypes, dict):
+        raise TypeError("dtypes should be a preset name or a dict, got "
+                        + str(type(dtypes)))
+
+    resolved = dict(DTYPE_PRESETS["float64"])
+    for field, dtype in dtypes.items():
+        if field not in DTYPE_FIELDS:
+            raise ValueError("Unknown dtypes field \"" + str(field) + "\", "
+                             + "available: " + ", ".join(DTYPE_FIELDS))
+
+        if dtype == INTEGER and field == "Ncount":
+            resolved[field] = INTEGER
+            continue
+
+        dtype = np.dtype(dtype)
+        if dtype.kind != "f" and not (field == "Ncount"
+                                      and dtype.kind in "iu"):
+            raise ValueError("dtype of " + field + " should be floating "
+                             + "point, got " + str(dtype))
+        resolved[field] = dtype.type
+
+    return resolved
+
+
+def convert_array(array, dtype):
+    """
+    Returns array with given dtype, without copy if it already has it
+
+    With "integer" the smallest of uint32 and int64 holding the values is
+    used, arrays that are not whole numbers are kept as float64.
+    """
+    array = np.asarray(array)
+    if dtype == INTEGER:
+        if array.dtype.kind in "iu":
+            return array
+
+        if array.size == 0:
+            return array.astype(np.uint32)
+
+        if not np.all(np.isfinite(array)) or np.any(array != np.rint(array)):
+            return array.astype(np.float64, copy=False)
+
+        if array.min() >= 0 and array.max() <= np.iinfo(np.uint32).max:
+            return array.astype(np.uint32)
+        return array.astype(np.int64)
+
+    return array.astype(dtype, copy=False)
+
+
+def apply_dtypes(data, dtypes=None):
+    """
+    Converts the arrays of a McStasData object to the given dtypes
+
+    Events kept on disk are left as they are stored. Totals in the
+    metadata are not changed. Returns the given object.
+
+    Parameters
+    ----------
+    data : McStasDataBinned or McStasDataEvent
+        Data to convert in place
+
+    dtypes : str, dict or None
+        Dtypes to use, see resolve_dtypes
+    """
+    dtypes = resolve_dtypes(dtypes)
+
+    if data.data_type == "Events":
+        events = data.Events
+        if (isinstance(events, np.ndarray)
+                and not isinstance(events, np.memmap)
+                and events.dtype != dtypes["Events"]):
+            data.Events = events.astype(dtypes["Events"], order="F")
+        return data
+
+    if getattr(data, "is_sparse", False):
+        # Only the stored bins are converted
+        data._sparse.astype(dtypes)
+        return data
+
+    for field in ["Intensity", "Error", "Ncount"]:
+        setattr(data, field, convert_array(getattr(data, field),
+                                           dtypes[field]))
+
+    return data
+
+
+def accumulation_array(array):
+    """
+    Returns array as float64 if it is floating point of lower precision
+
+    Used before sums and arithmetic, so compact data is accumulated with
+    the same precision as float64 data. Integer arrays are unchanged.
+    """
+    array = np.asarray(array)
+    if array.dtype.kind == "f" and array.dtype.itemsize < 8:
+        return array.astype(np.float64)
+
+    return array
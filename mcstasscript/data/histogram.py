@@ -0,0 +1,281 @@
+import numpy as np
+
+
+class Histogram:
+    """
+    Weighted histogram with equally sized bins along one or two axes
+
+    The bin index of each event is found once and the intensity, squared
+    error and ray count are accumulated together with np.bincount. Data
+    can be added in chunks, all sums are accumulated in float64.
+
+    Attributes
+    ----------
+    bins : list of int
+        Number of bins along each axis
+
+    limits : list of tuples
+        Lower and upper limit of each axis
+
+    edges : list of numpy arrays
+        Bin edges along each axis
+
+    intensity : numpy array
+        Sum of weights in each bin
+
+    error_squared : numpy array
+        Sum of squared weights in each bin
+
+    ncount : numpy array
+        Number of events in each bin
+
+    Methods
+    -------
+    add(*data, weights=None)
+        Adds events to the histogram
+    """
+
+    def __init__(self, bins, limits):
+        """
+        Prepares empty histogram with given bins and limits
+
+        Parameters
+        ----------
+        bins : int or list of int
+            Number of bins, one number per axis or a single for all axes
+
+        limits : tuple or list of tuples
+            (min, max) for a single axis or a list with one per axis
+        """
+        if np.ndim(limits) == 1:
+            limits = [limits]
+
+        n_axes = len(limits)
+        if isinstance(bins, (list, tuple, np.ndarray)):
+            bins = list(bins)
+        else:
+            bins = [bins] * n_axes
+
+        if len(bins) != n_axes:
+            raise ValueError("Histogram needs one number of bins per axis, "
+                             + "got " + str(len(bins)) + " for "
+                             + str(n_axes) + " axes.")
+
+        self.bins = []
+        self.limits = []
+        self.edges = []
+        for n_bins, (lower, upper) in zip(bins, limits):
+            n_bins = int(n_bins)
+            if n_bins < 1:
+                raise ValueError("Number of bins should be positive, was "
+                                 + str(n_bins))
+
+            lower = float(lower)
+            upper = float(upper)
+            if not (np.isfinite(lower) and np.isfinite(upper)):
+                raise ValueError("Histogram limits must be finite, got "
+                                 + str((lower, upper)))
+            if lower > upper:
+                raise ValueError("Lower histogram limit above upper limit.")
+            if lower == upper:
+                # Same convention as numpy histogram
+                lower -= 0.5
+                upper += 0.5
+
+            self.bins.append(n_bins)
+            self.limits.append((lower, upper))
+            self.edges.append(np.linspace(lower, upper, n_bins + 1))
+
+        n_total = int(np.prod(self.bins))
+        self._intensity = np.zeros(n_total)
+        self._error_squared = np.zeros(n_total)
+        self._ncount = np.zeros(n_total, dtype=np.int64)
+
+    def _bin_index(self, data, axis):
+        """
+        Returns bin index along axis for data within the limits
+
+        The upper limit is included in the last bin as in numpy histogram.
+        Values within round off of an inner bin edge may end up in the
+        neighbouring bin, which numpy corrects with an extra pass.
+        """
+        n_bins = self.bins[axis]
+        lower, upper = self.limits[axis]
+
+        scaled = data - lower
+        scaled *= n_bins / (upper - lower)
+        index = scaled.astype(np.intp)
+        np.minimum(index, n_bins - 1, out=index)
+
+        return index
+
+    def add(self, *data, weights=None):
+        """
+        Adds events to the histogram
+
+        Parameters
+        ----------
+        data : numpy arrays
+            One array of event values per axis
+
+        weights : numpy array
+            Weight of each event, if None all events have weight 1
+        """
+        if len(data) != len(self.bins):
+            raise ValueError("Histogram has " + str(len(self.bins))
+                             + " axes, but was given data for "
+                             + str(len(data)) + ".")
+
+        data = [np.asarray(axis_data, dtype=np.float64) for axis_data in data]
+
+        # Events outside the limits are discarded as in numpy histogram
+        keep = None
+        for axis_data, (lower, upper) in zip(data, self.limits):
+            axis_keep = (axis_data >= lower) & (axis_data <= upper)
+            keep = axis_keep if keep is None else keep & axis_keep
+
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+
+        if not keep.all():
+            data = [axis_data[keep] for axis_data in data]
+            if weights is not None:
+                weights = weights[keep]
+
+        if len(data[0]) == 0:
+            return
+
+        flat_index = 0
+        for axis, axis_data in enumerate(data):
+            flat_index = flat_index * self.bins[axis] + self._bin_index(axis_data, axis)
+
+        n_total = len(self._ncount)
+        ncount = np.bincount(flat_index, minlength=n_total)
+        self._ncount += ncount
+
+        if weights is None:
+            self._intensity += ncount
+            self._error_squared += ncount
+            return
+
+        self._intensity += np.bincount(flat_index, weights=weights,
+                                       minlength=n_total)
+        self._error_squared += np.bincount(flat_index, weights=weights*weights,
+                                           minlength=n_total)
+
+    @property
+    def shape(self):
+        return tuple(self.bins)
+
+    @property
+    def intensity(self):
+        return self._intensity.reshape(self.shape)
+
+    @property
+    def error_squared(self):
+        return self._error_squared.reshape(self.shape)
+
+    @property
+    def error(self):
+        return np.sqrt(self.error_squared)
+
+    @property
+    def ncount(self):
+        return self._ncount.reshape(self.shape)
+
+    @property
+    def centers(self):
+        return [0.5*(edges[1:] + edges[:-1]) for edges in self.edges]
+
+
+def _find_limits(data):
+    data = np.asarray(data)
+    if len(data) == 0:
+        # Same default range as numpy histogram
+        return 0.0, 1.0
+
+    return np.min(data), np.max(data)
+
+
+def _iter_chunks(length, chunk_size):
+    if chunk_size is None:
+        chunk_size = max(length, 1)
+
+    for start in range(0, length, int(chunk_size)):
+        yield slice(start, start + int(chunk_size))
+
+
+def histogram_1d(data, weights=None, bins=50, limits=None, chunk_size=None):
+    """
+    Histograms weighted events along one axis in a single pass
+
+    Returns intensity, error, ncount and bin edges, where intensity is the
+    sum of weights and error the square root of the sum of squared weights.
+
+    Parameters
+    ----------
+    data : numpy array
+        Event values
+
+    weights : numpy array
+        Event weights, if None all events have weight 1
+
+    bins : int
+        Number of bins
+
+    limits : tuple
+        (min, max) of histogram, default is the range of the data
+
+    chunk_size : int
+        If given, events are processed this many at a time
+    """
+    if limits is None:
+        limits = _find_limits(data)
+
+    histogram = Histogram(bins, limits)
+    for chunk in _iter_chunks(len(data), chunk_size):
+        chunk_weights = None if weights is None else weights[chunk]
+        histogram.add(data[chunk], weights=chunk_weights)
+
+    return (histogram.intensity, histogram.error, histogram.ncount,
+            histogram.edges[0])
+
+
+def histogram_2d(data1, data2, weights=None, bins=100, limits=None,
+                 chunk_size=None):
+    """
+    Histograms weighted events along two axes in a single pass
+
+    Returns intensity, error, ncount and the bin edges of both axes. The
+    histogram arrays have data1 along the first dimension.
+
+    Parameters
+    ----------
+    data1 : numpy array
+        Event values for first axis
+
+    data2 : numpy array
+        Event values for second axis
+
+    weights : numpy array
+        Event weights, if None all events have weight 1
+
+    bins : int or list of two int
+        Number of bins
+
+    limits : list of two tuples
+        (min, max) for each axis, default is the range of the data
+
+    chunk_size : int
+        If given, events are processed this many at a time
+    """
+    if limits is None:
+        limits = [_find_limits(data1), _find_limits(data2)]
+
+    histogram = Histogram(bins, limits)
+    for chunk in _iter_chunks(len(data1), chunk_size):
+        chunk_weights = None if weights is None else weights[chunk]
+        histogram.add(data1[chunk], data2[chunk], weights=chunk_weights)
+
+    return (histogram.intensity, histogram.error, histogram.ncount,
+            histogram.edges[0], histogram.edges[1])
@@ -0,0 +1,494 @@
+import gzip
+import os
+
+import numpy as np
+
+# Units of the particle fields, as stored in MCPL files
+MCPL_UNITS = {"x": "cm", "y": "cm", "z": "cm", "ux": "", "uy": "", "uz": "",
+              "ekin": "MeV", "wavelength": "AA", "t": "ms", "weight": "",
+              "pdgcode": "", "userflags": "", "polx": "", "poly": "",
+              "polz": ""}
+
+# Wavelength [AA] of a neutron with energy 1 meV and a photon of 1 keV
+NEUTRON_WAVELENGTH_MEV = 9.044568002855648
+PHOTON_WAVELENGTH_KEV = 12.398419843320026
+
+# Particle Data Group codes of neutrons and photons
+PDG_NEUTRON = 2112
+PDG_PHOTON = 22
+
+MCPL_VERSIONS = (2, 3)
+
+
+class MCPLHeader:
+    """
+    Header of a MCPL file
+
+    Attributes
+    ----------
+    version : int
+        MCPL format version, 2 or 3
+
+    endianness : str
+        "<" for little endian and ">" for big endian files
+
+    n_particles : int
+        Number of particles in the file
+
+    source_name : str
+        Name of the program that wrote the file
+
+    comments : list of str
+        Comments in the header
+
+    blobs : dict
+        Binary data stored in the header by key
+
+    userflags : bool
+        True if the particles have user flags
+
+    polarisation : bool
+        True if the particles have polarisation vectors
+
+    single_precision : bool
+        True if floating point numbers are stored with single precision
+
+    universal_pdgcode : int
+        PDG code of all particles, 0 if stored for each particle
+
+    universal_weight : float
+        Weight of all particles, 0 if stored for each particle
+
+    particle_size : int
+        Number of bytes per particle
+
+    header_size : int
+        Number of bytes before the first particle
+    """
+
+    def __init__(self, file_object):
+        """
+        Reads header from a binary file object placed at the file start
+
+        Parameters
+        ----------
+        file_object : file object
+            File opened in binary mode, left at the first particle
+        """
+        start = _read_exact(file_object, 8, "header")
+        if start[:4] != b"MCPL":
+            raise ValueError("File is not a MCPL file.")
+
+        self.version = int(start[4:7])
+        if self.version not in MCPL_VERSIONS:
+            raise ValueError("MCPL format version " + str(self.version)
+                             + " is not supported, supported versions: "
+                             + str(MCPL_VERSIONS))
+
+        if start[7:8] not in (b"L", b"B"):
+            raise ValueError("Unexpected endianness in MCPL header: "
+                             + str(start[7:8]))
+        self.endianness = "<" if start[7:8] == b"L" else ">"
+
+        header_dtype = np.dtype([("n_particles", "u8"), ("flags", "u4", 5),
+                                 ("universal_pdgcode", "i4"),
+                                 ("particle_size", "u4"),
+                                 ("universal_weight", "u4")])
+        header_dtype = header_dtype.newbyteorder(self.endianness)
+        fixed = np.frombuffer(_read_exact(file_object, header_dtype.itemsize,
+                                          "header"), dtype=header_dtype)[0]
+
+        self.n_particles = int(fixed["n_particles"])
+        n_comments, n_blobs, userflags, polarisation, single = fixed["flags"]
+        self.userflags = bool(userflags)
+        self.polarisation = bool(polarisation)
+        self.single_precision = bool(single)
+        self.universal_pdgcode = int(fixed["universal_pdgcode"])
+        self.particle_size = int(fixed["particle_size"])
+
+        self.universal_weight = 0.0
+        if fixed["universal_weight"]:
+            weight = _read_exact(file_object, 8, "header")
+            self.universal_weight = float(
+                np.frombuffer(weight, dtype=self.endianness + "f8")[0])
+
+        self.source_name = self._read_string(file_object).decode(
+            "utf-8", "replace")
+        self.comments = [self._read_string(file_object).decode(
+            "utf-8", "replace") for _ in range(int(n_comments))]
+        keys = [self._read_string(file_object).decode("utf-8", "replace")
+                for _ in range(int(n_blobs))]
+        self.blobs = {key: self._read_string(file_object) for key in keys}
+
+        self.header_size = (8 + header_dtype.itemsize
+                            + (8 if fixed["universal_weight"] else 0)
+                            + 4 + len(self.source_name.encode())
+                            + sum(4 + len(comment.encode())
+                                  for comment in self.comments)
+                            + sum(8 + len(key.encode()) + len(blob)
+                                  for key, blob in self.blobs.items()))
+
+        if self.record_dtype.itemsize != self.particle_size:
+            raise ValueError("MCPL header gives " + str(self.particle_size)
+                             + " bytes per particle, expected "
+                             + str(self.record_dtype.itemsize) + ".")
+
+    def _read_string(self, file_object):
+        length = _read_exact(file_object, 4, "header")
+        length = int(np.frombuffer(length, dtype=self.endianness + "u4")[0])
+        return _read_exact(file_object, length, "header")
+
+    @property
+    def record_dtype(self):
+        """
+        Structured dtype of the particles as stored in the file
+        """
+        fp = self.endianness + ("f4" if self.single_precision else "f8")
+        fields = []
+        if self.polarisation:
+            fields += [("polx", fp), ("poly", fp), ("polz", fp)]
+        # Direction and kinetic energy are packed in three numbers
+        fields += [("x", fp), ("y", fp), ("z", fp), ("packed_1", fp),
+                   ("packed_2", fp), ("packed_3", fp), ("t", fp)]
+        if not self.universal_weight:
+            fields.append(("weight", fp))
+        if not self.universal_pdgcode:
+            fields.append(("pdgcode", self.endianness + "i4"))
+        if self.userflags:
+            fields.append(("userflags", self.endianness + "u4"))
+
+        return np.dtype(fields)
+
+    @property
+    def particle_dtype(self):
+        """
+        Structured dtype of the particle arrays returned by the reader
+
+        Floating point fields have the precision of the file.
+        """
+        fp = np.float32 if self.single_precision else np.float64
+        fields = [("x", fp), ("y", fp), ("z", fp), ("ux", fp), ("uy", fp),
+                  ("uz", fp), ("ekin", fp), ("wavelength", fp), ("t", fp),
+                  ("weight", fp), ("pdgcode", np.int32)]
+        if self.userflags:
+            fields.append(("userflags", np.uint32))
+        if self.polarisation:
+            fields += [("polx", fp), ("poly", fp), ("polz", fp)]
+
+        return np.dtype(fields)
+
+    def __repr__(self):
+        string = "MCPLHeader(version " + str(self.version) + ", "
+        string += str(self.n_particles) + " particles"
+        string += ", source: " + self.source_name + ")"
+        return string
+
+
+def _read_exact(file_object, n_bytes, part):
+    """
+    Reads n_bytes from file, raises ValueError if the file ends before
+    """
+    data = file_object.read(n_bytes)
+    if len(data) != n_bytes:
+        raise ValueError("MCPL file ended unexpectedly while reading "
+                         + part + ".")
+
+    return data
+
+
+def open_mcpl(filename):
+    """
+    Returns binary file object for a MCPL file, .gz files are decompressed
+    while read
+
+    Parameters
+    ----------
+    filename : str
+        Path of .mcpl or .mcpl.gz file
+    """
+    with open(filename, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+
+    if compressed:
+        return gzip.open(filename, "rb")
+
+    return open(filename, "rb")
+
+
+def read_mcpl_header(filename):
+    """
+    Returns MCPLHeader of a MCPL file
+
+    Parameters
+    ----------
+    filename : str
+        Path of .mcpl or .mcpl.gz file
+    """
+    with open_mcpl(filename) as f:
+        return MCPLHeader(f)
+
+
+def unpack_direction(packed_1, packed_2, packed_3, version=3):
+    """
+    Returns direction unit vector and kinetic energy of packed particles
+
+    Version 3 files use adaptive projection packing, where the component
+    with the largest magnitude is left out and recovered from the others,
+    with its sign stored as the sign of the energy. If it is x or y, the
+    first or second number holds 1/uz instead. Version 2 files use
+    octahedral packing.
+
+    Parameters
+    ----------
+    packed_1, packed_2, packed_3 : numpy arrays
+        Packed numbers as stored in the file
+
+    version : int
+        MCPL format version
+    """
+    in_1 = packed_1.astype(np.float64)
+    in_2 = packed_2.astype(np.float64)
+    negative = np.signbit(packed_3)
+    ekin = np.abs(packed_3)
+
+    if version == 2:
+        uz = 1.0 - np.abs(in_1) - np.abs(in_2)
+        folded = uz < 0.0
+        ux = np.where(folded, (1.0 - np.abs(in_2)) * np.where(in_1 >= 0, 1, -1),
+                      in_1)
+        uy = np.where(folded, (1.0 - np.abs(in_1)) * np.where(in_2 >= 0, 1, -1),
+                      in_2)
+        norm = np.sqrt(ux**2 + uy**2 + uz**2)
+        ux /= norm
+        uy /= norm
+        uz /= norm
+        # Sign of energy marks particles with a direction of zero
+        uz[negative] = 0.0
+        return ux, uy, uz, ekin
+
+    sign = np.where(negative, -1.0, 1.0)
+    x_largest = np.abs(in_1) > 1.0
+    y_largest = ~x_largest & (np.abs(in_2) > 1.0)
+
+    with np.errstate(divide="ignore"):
+        inverse_1 = 1.0 / in_1
+        inverse_2 = 1.0 / in_2
+
+    ux = in_1.copy()
+    uy = in_2.copy()
+    uz = np.where(x_largest, inverse_1, np.where(y_largest, inverse_2, 0.0))
+
+    ux[x_largest] = 0.0
+    uy[y_largest] = 0.0
+    left_out = sign * np.sqrt(np.clip(1.0 - (ux**2 + uy**2 + uz**2), 0, 1))
+
+    ux = np.where(x_largest, left_out, ux)
+    uy = np.where(y_largest, left_out, uy)
+    uz = np.where(x_largest | y_largest, uz, left_out)
+
+    return ux, uy, uz, ekin
+
+
+def particle_wavelength(ekin, pdgcode):
+    """
+    Returns wavelength [AA] of neutrons and photons, NaN for others
+
+    Parameters
+    ----------
+    ekin : numpy array
+        Kinetic energy [MeV]
+
+    pdgcode : numpy array or int
+        PDG code of each particle
+    """
+    ekin = np.asarray(ekin, dtype=np.float64)
+    pdgcode = np.broadcast_to(pdgcode, ekin.shape)
+
+    with np.errstate(divide="ignore"):
+        neutron = NEUTRON_WAVELENGTH_MEV / np.sqrt(ekin * 1E9)
+        photon = PHOTON_WAVELENGTH_KEV / (ekin * 1E3)
+
+    return np.where(pdgcode == PDG_NEUTRON, neutron,
+                    np.where(pdgcode == PDG_PHOTON, photon, np.nan))
+
+
+def unpack_particles(records, header, out=None):
+    """
+    Returns particle array from records as stored in the file
+
+    Parameters
+    ----------
+    records : numpy array
+        Particles with the record_dtype of the header
+
+    header : MCPLHeader
+        Header of the file
+
+    out : numpy array, optional
+        Array with the particle_dtype of the header to fill
+    """
+    if out is None:
+        out = np.empty(len(records), dtype=header.particle_dtype)
+
+    ux, uy, uz, ekin = unpack_direction(records["packed_1"],
+                                        records["packed_2"],
+                                        records["packed_3"], header.version)
+    for field in ("x", "y", "z", "t"):
+        out[field] = records[field]
+    out["ux"] = ux
+    out["uy"] = uy
+    out["uz"] = uz
+    out["ekin"] = ekin
+
+    if header.universal_weight:
+        out["weight"] = header.universal_weight
+    else:
+        out["weight"] = records["weight"]
+
+    if header.universal_pdgcode:
+        out["pdgcode"] = header.universal_pdgcode
+    else:
+        out["pdgcode"] = records["pdgcode"]
+
+    out["wavelength"] = particle_wavelength(ekin, out["pdgcode"])
+
+    if header.userflags:
+        out["userflags"] = records["userflags"]
+    if header.polarisation:
+        for field in ("polx", "poly", "polz"):
+            out[field] = records[field]
+
+    return out
+
+
+def iter_mcpl(filename, chunk_size=1000000):
+    """
+    Yields the particles of a MCPL file in chunks of structured arrays
+
+    Only one chunk is held in memory at a time, .mcpl.gz files are
+    decompressed while read. The fields are x, y, z [cm], ux, uy, uz,
+    ekin [MeV], wavelength [AA] (NaN except for neutrons and photons),
+    t [ms], weight and pdgcode, followed by userflags and polx, poly, polz
+    when the file has them, see MCPL_UNITS.
+
+    Parameters
+    ----------
+    filename : str
+        Path of .mcpl or .mcpl.gz file
+
+    chunk_size : int
+        Number of particles in each chunk
+    """
+    chunk_size = int(chunk_size)
+    if chunk_size < 1:
+        raise ValueError("chunk_size should be a positive integer, was "
+                         + str(chunk_size))
+
+    with open_mcpl(filename) as f:
+        header = MCPLHeader(f)
+        record_dtype = header.record_dtype
+
+        remaining = header.n_particles
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            data = _read_exact(f, n * header.particle_size, "particles")
+            records = np.frombuffer(data, dtype=record_dtype)
+            yield unpack_particles(records, header)
+            remaining -= n
+
+
+def read_mcpl(filename, chunk_size=1000000):
+    """
+    Returns all particles of a MCPL file as one structured array
+
+    The file is read in chunks into a preallocated array, see iter_mcpl
+    for the fields.
+
+    Parameters
+    ----------
+    filename : str
+        Path of .mcpl or .mcpl.gz file
+
+    chunk_size : int
+        Number of particles read at a time
+    """
+    header = read_mcpl_header(filename)
+    particles = np.empty(header.n_particles, dtype=header.particle_dtype)
+    _fill_particles(filename, particles, chunk_size)
+
+    return particles
+
+
+def _fill_particles(filename, particles, chunk_size):
+    start = 0
+    for chunk in iter_mcpl(filename, chunk_size=chunk_size):
+        particles[start:start + len(chunk)] = chunk
+        start += len(chunk)
+
+
+def mcpl_cache_name(filename):
+    """
+    Returns name of the .npy copy of a MCPL file
+    """
+    return filename + ".npy"
+
+
+def write_mcpl_npy(filename, chunk_size=1000000):
+    """
+    Writes the particles of a MCPL file to a .npy file next to it
+
+    The particles are written chunk by chunk, so the file is never fully
+    in memory. Returns the particles memory-mapped from the new file.
+
+    Parameters
+    ----------
+    filename : str
+        Path of .mcpl or .mcpl.gz file
+
+    chunk_size : int
+        Number of particles read at a time
+    """
+    header = read_mcpl_header(filename)
+    cache_name = mcpl_cache_name(filename)
+
+    particles = np.lib.format.open_memmap(cache_name, mode="w+",
+                                          dtype=header.particle_dtype,
+                                          shape=(header.n_particles,))
+    try:
+        _fill_particles(filename, particles, chunk_size)
+        particles.flush()
+    except Exception:
+        del particles
+        os.remove(cache_name)
+        raise
+    del particles
+
+    return np.load(cache_name, mmap_mode="r")
+
+
+def load_mcpl(filename, sidecar=False, chunk_size=1000000):
+    """
+    Returns particles of a MCPL file, memory-mapped from a .npy copy if
+    one is up to date
+
+    Parameters
+    ----------
+    filename : str
+        Path of .mcpl or .mcpl.gz file
+
+    sidecar : bool, default False
+        If True a .npy copy is written when missing or older than the
+        file, so later loads are memory-mapped without reading the file
+
+    chunk_size : int
+        Number of particles read at a time
+    """
+    cache_name = mcpl_cache_name(filename)
+    if (os.path.isfile(cache_name)
+            and os.path.getmtime(cache_name) >= os.path.getmtime(filename)):
+        return np.load(cache_name, mmap_mode="r")
+
+    if sidecar:
+        return write_mcpl_npy(filename, chunk_size=chunk_size)
+
+    return read_mcpl(filename, chunk_size=chunk_size)
@@ -0,0 +1,419 @@
+import collections
+import os
+import re
+import shutil
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+
+# Units accepted in memory budgets given as strings
+BYTE_UNITS = {"": 1, "B": 1, "KB": 10**3, "MB": 10**6, "GB": 10**9,
+              "TB": 10**12, "KIB": 2**10, "MIB": 2**20, "GIB": 2**30,
+              "TIB": 2**40}
+
+
+def parse_bytes(size):
+    """
+    Returns number of bytes given as int or string such as "2GB"
+
+    Parameters
+    ----------
+    size : int, float or str
+        Number of bytes, strings can have the units B, KB, MB, GB, TB or
+        KiB, MiB, GiB, TiB
+    """
+    if isinstance(size, str):
+        match = re.fullmatch(r"\s*([0-9.]+)\s*([a-zA-Z]*)\s*", size)
+        if match is None or match.group(2).upper() not in BYTE_UNITS:
+            raise ValueError("Could not read memory size \"" + size
+                             + "\", use a number of bytes or units such "
+                             + "as MB and GB.")
+        size = float(match.group(1)) * BYTE_UNITS[match.group(2).upper()]
+
+    size = int(size)
+    if size < 0:
+        raise ValueError("Memory size should be positive, got "
+                         + str(size) + ".")
+
+    return size
+
+
+class SpilledArray:
+    """
+    Array written to a cache file to free memory, see PayloadStore
+
+    The cache file is removed when the last data object using it is gone.
+    Copies of data objects share the file, pickling stores the array.
+    """
+
+    def __init__(self, array, folder):
+        handle, self.filename = tempfile.mkstemp(suffix=".npy", dir=folder)
+        os.close(handle)
+
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.nbytes = array.nbytes
+
+        cache = np.lib.format.open_memmap(self.filename, mode="w+",
+                                          dtype=array.dtype,
+                                          shape=array.shape)
+        cache[...] = array
+        cache.flush()
+        del cache
+
+        self._finalizer = weakref.finalize(self, _remove_file, self.filename)
+
+    def load(self):
+        """
+        Returns the array read back into memory
+        """
+        return np.load(self.filename)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return np.asarray, (self.load(),)
+
+    def __repr__(self):
+        return ("SpilledArray(shape=" + str(self.shape) + ", dtype="
+                + str(self.dtype) + ", file=" + self.filename + ")")
+
+
+def _remove_file(filename):
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+def _is_resident(array):
+    """
+    True for arrays in memory that can be spilled
+    """
+    return (isinstance(array, np.ndarray)
+            and not isinstance(array, np.memmap))
+
+
+class PayloadStore:
+    """
+    Keeps the arrays of McStasData objects within a memory budget
+
+    Arrays are registered when assigned to a data object and touched when
+    read. When the registered arrays in memory exceed the budget, the
+    least recently used are written to memory-mapped cache files and
+    replaced with a SpilledArray on the data object. Reading a spilled
+    array loads it back into memory, which can spill arrays of other
+    data objects, never other arrays of the same object.
+
+    References to arrays held outside the data objects keep them in
+    memory, and changes made through such references after the array
+    was spilled are not seen by the data object.
+    """
+
+    def __init__(self):
+        self.budget = None
+        self.cache_dir = None
+        self._folder = None
+        self._lock = threading.RLock()
+        # (id of data object, attribute) to [weakref, attribute, nbytes]
+        self._arrays = collections.OrderedDict()
+        self._resident = 0
+
+    def configure(self, budget, cache_dir=None):
+        """
+        Sets budget in bytes, None disables the budget
+
+        Parameters
+        ----------
+        budget : int, str or None
+            Largest number of bytes kept in memory
+
+        cache_dir : str, optional
+            Folder for cache files, default is a temporary folder
+        """
+        with self._lock:
+            self.budget = None if budget is None else parse_bytes(budget)
+            if cache_dir != self.cache_dir:
+                self.cache_dir = cache_dir
+                self._folder = None
+
+            if self.budget is None:
+                self._arrays.clear()
+                self._resident = 0
+            else:
+                self._enforce()
+
+    @property
+    def active(self):
+        return self.budget is not None
+
+    def _cache_folder(self):
+        if self._folder is not None:
+            return self._folder
+
+        if self.cache_dir is None:
+            self._folder = tempfile.mkdtemp(prefix="mcstasscript_cache_")
+            weakref.finalize(self, shutil.rmtree, self._folder, True)
+        else:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._folder = self.cache_dir
+
+        return self._folder
+
+    def _forget(self, key, reference):
+        with self._lock:
+            entry = self._arrays.get(key)
+            if entry is not None and entry[0] is reference:
+                del self._arrays[key]
+                self._resident -= entry[2]
+
+    def register(self, data, attribute, array):
+        """
+        Registers array assigned to attribute of data
+
+        Parameters
+        ----------
+        data : McStasData
+            Object holding the array
+
+        attribute : str
+            Name of the attribute holding the array
+
+        array : numpy array or None
+            Array being assigned
+        """
+        key = (id(data), attribute)
+        with self._lock:
+            if not _is_resident(array):
+                entry = self._arrays.pop(key, None)
+                if entry is not None:
+                    self._resident -= entry[2]
+                return
+
+            entry = self._arrays.pop(key, None)
+            if entry is not None:
+                self._resident -= entry[2]
+            if entry is None or entry[0]() is not data:
+                reference = weakref.ref(
+                    data, lambda ref, key=key: self._forget(key, ref))
+                entry = [reference, attribute, 0]
+
+            entry[2] = array.nbytes
+            self._arrays[key] = entry
+            self._resident += entry[2]
+            self._enforce(keep=id(data))
+
+    def load(self, data, attribute):
+        """
+        Returns array stored in attribute of data, loading spilled arrays
+
+        Parameters
+        ----------
+        data : McStasData
+            Object holding the array
+
+        attribute : str
+            Name of the attribute holding the array
+        """
+        array = getattr(data, attribute)
+        if not self.active:
+            if isinstance(array, SpilledArray):
+                # Budget was removed after the array was spilled
+                array = array.load()
+                setattr(data, attribute, array)
+            return array
+
+        key = (id(data), attribute)
+        with self._lock:
+            array = getattr(data, attribute)
+            if isinstance(array, SpilledArray):
+                array = array.load()
+                setattr(data, attribute, array)
+                self.register(data, attribute, array)
+            elif key in self._arrays:
+                self._arrays.move_to_end(key)
+
+        return array
+
+    def resident_bytes(self):
+        """
+        Returns number of bytes of registered arrays in memory
+        """
+        return self._resident
+
+    def _enforce(self, keep=None):
+        """
+        Spills least recently used arrays until within the budget
+
+        Arrays of the data object with id keep are not spilled.
+        """
+        if self.budget is None:
+            return
+
+        for key in list(self._arrays):
+            if self._resident <= self.budget:
+                break
+            if key[0] == keep:
+                continue
+
+            reference, attribute, nbytes = self._arrays.pop(key)
+            self._resident -= nbytes
+            data = reference()
+            if data is None:
+                continue
+
+            array = getattr(data, attribute, None)
+            if _is_resident(array):
+                setattr(data, attribute,
+                        SpilledArray(array, self._cache_folder()))
+
+    def usage(self):
+        """
+        Returns dict with budget and bytes of registered arrays in memory
+        """
+        with self._lock:
+            return {"budget": self.budget,
+                    "resident": self.resident_bytes(),
+                    "arrays": len(self._arrays)}
+
+
+# Store used by all McStasData objects
+payload_store = PayloadStore()
+
+
+def set_memory_budget(budget, cache_dir=None):
+    """
+    Sets largest memory used by arrays of loaded McStasData objects
+
+    Intensity, Error, Ncount and Events arrays assigned after the budget
+    is set are tracked. When they use more memory than the budget, the
+    least recently used are written to memory-mapped cache files and read
+    back when accessed again. The arrays of the data object being used
+    are kept in memory, so a single object larger than the budget can
+    still be used. Sparse data and events kept on disk are not tracked.
+
+    Parameters
+    ----------
+    budget : int, str or None
+        Number of bytes, or string such as "4GB", None (initial default)
+        disables the budget and spilling
+
+    cache_dir : str, optional
+        Folder for cache files, default is a temporary folder removed at
+        exit
+    """
+    payload_store.configure(budget, cache_dir=cache_dir)
+
+
+def get_memory_budget():
+    """
+    Returns memory budget in bytes, None if not set
+    """
+    return payload_store.budget
+
+
+def memory_usage():
+    """
+    Returns dict with budget, bytes in memory and number of tracked arrays
+    """
+    return payload_store.usage()
+
+
+def _array_bytes(array):
+    """
+    Returns bytes in memory and in spill files of an array
+    """
+    if isinstance(array, SpilledArray):
+        return 0, array.nbytes
+    if _is_resident(array):
+        return array.nbytes, 0
+
+    return 0, 0
+
+
+def data_footprint(data):
+    """
+    Returns dict with bytes in memory and spilled of a McStasData object
+
+    The memory includes the arrays, sparse bins and cached derived event
+    columns. Events kept on disk are not counted.
+
+    Parameters
+    ----------
+    data : McStasData
+        Data to measure
+    """
+    resident = 0
+    spilled = 0
+
+    arrays = [getattr(data, "_" + field, None)
+              for field in ("Intensity", "Error", "Ncount", "events")]
+    sparse = getattr(data, "_sparse", None)
+    if sparse is not None:
+        arrays += [sparse.indices] + list(sparse.values.values())
+    arrays += list(getattr(data, "_column_cache", {}).values())
+    if getattr(data, "xaxis", None) is not None:
+        arrays.append(data.xaxis)
+
+    for array in arrays:
+        array_resident, array_spilled = _array_bytes(array)
+        resident += array_resident
+        spilled += array_spilled
+
+    return {"resident": resident, "spilled": spilled}
+
+
+def _iter_data(data):
+    """
+    Yields McStasData objects in data, lists and dicts can be nested
+    """
+    if isinstance(data, dict):
+        data = list(data.values())
+
+    if isinstance(data, (list, tuple)):
+        for item in data:
+            yield from _iter_data(item)
+    elif data is not None:
+        yield data
+
+
+def memory_footprint(data, by="monitor"):
+    """
+    Returns memory used by McStasData objects per monitor or per run
+
+    Returns dict with a dict of bytes in memory ("resident") and bytes
+    spilled to cache files ("spilled") for each monitor name or run.
+    Runs are identified by their data folder.
+
+    Parameters
+    ----------
+    data : McStasData, list or dict
+        Data to measure, for example the results of one or several runs
+
+    by : str, default "monitor"
+        "monitor" sums over monitors with the same name, "run" over
+        monitors from the same data folder
+    """
+    if by not in ("monitor", "run"):
+        raise ValueError("by should be \"monitor\" or \"run\", got "
+                         + str(by) + ".")
+
+    footprint = {}
+    for item in _iter_data(data):
+        if by == "monitor":
+            key = item.name
+        else:
+            key = item.get_data_location()
+
+        sizes = data_footprint(item)
+        total = footprint.setdefault(key, {"resident": 0, "spilled": 0})
+        total["resident"] += sizes["resident"]
+        total["spilled"] += sizes["spilled"]
+
+    return footprint
@@ -64,7 +64,14 @@ class pyvinylMCPLData(BaseData):
         file_format_kwargs=None,
     ):
         expected_data = {}
-        super().__init__(key, expected_data, None, filename, MCPLDataFormat, None)
+        expected_data["header"] = None
+        expected_data["particles"] = None
+
+        if file_format_kwargs is None:
+            file_format_kwargs = {}
+
+        super().__init__(key, expected_data, None, filename, MCPLDataFormat,
+                         file_format_kwargs)
 
     def supported_formats(self):
         format_dict = {}
@@ -72,5 +79,5 @@ class pyvinylMCPLData(BaseData):
         return format_dict
 
     @classmethod
-    def from_file(cls, filename: str, key="mcpl"):
-        return cls(key, filename=filename)
+    def from_file(cls, filename: str, key="mcpl", **kwargs):
+        return cls(key, filename=filename, file_format_kwargs=kwargs)
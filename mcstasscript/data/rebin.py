@@ -0,0 +1,409 @@
+import copy
+
+import numpy as np
+
+from mcstasscript.data.dtypes import accumulation_array
+
+
+def sum_ranges(array, bounds, axis=-1):
+    """
+    Sums array along axis over the index ranges given by bounds
+
+    Range i covers indices bounds[i] to bounds[i + 1] and empty ranges
+    sum to zero. All ranges are summed with one call to np.add.reduceat.
+
+    Parameters
+    ----------
+    array : numpy array
+        Array to sum
+
+    bounds : array of int
+        Increasing indices between 0 and the length of axis, one more
+        than the number of ranges
+
+    axis : int
+        Axis to sum along
+    """
+    array = np.moveaxis(np.asarray(array), axis, 0)
+    bounds = np.asarray(bounds, dtype=np.intp)
+    starts = bounds[:-1]
+    stops = bounds[1:]
+
+    shape = (len(starts),) + array.shape[1:]
+    if len(starts) == 0 or array.shape[0] == 0:
+        return np.moveaxis(np.zeros(shape, dtype=array.dtype), 0, axis)
+
+    # Ranges starting at the end of the array are empty and left out
+    length = array.shape[0]
+    n_inside = int(np.count_nonzero(starts < length))
+    indices = starts[:n_inside]
+
+    # reduceat sums up to the next index, so the end of the last range is
+    # added as an extra index when it is not the end of the array
+    cut_end = n_inside > 0 and stops[n_inside - 1] < length
+    if cut_end:
+        indices = np.append(indices, stops[n_inside - 1])
+
+    summed = np.zeros(shape, dtype=array.dtype)
+    if n_inside > 0:
+        reduced = np.add.reduceat(array, indices, axis=0)
+        summed[:n_inside] = reduced[:n_inside]
+
+    # reduceat gives the element at the index for empty ranges
+    summed[starts >= stops] = 0
+
+    return np.moveaxis(summed, 0, axis)
+
+
+def bin_centers(edges):
+    edges = np.asarray(edges, dtype=np.float64)
+    return 0.5*(edges[1:] + edges[:-1])
+
+
+def rebin_bounds(edges, bins):
+    """
+    Returns index bounds of the new bins and their edges
+
+    Parameters
+    ----------
+    edges : numpy array
+        Current bin edges
+
+    bins : int or array
+        Number of neighbouring bins to combine, or new bin edges. With
+        new edges each bin goes to the new bin holding its center, bins
+        outside the new edges are left out.
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    n_bins = len(edges) - 1
+
+    if np.ndim(bins) == 0:
+        factor = int(bins)
+        if factor != bins or factor < 1:
+            raise ValueError("Rebin factor should be a positive integer, "
+                             + "got " + str(bins))
+        if n_bins % factor != 0:
+            raise ValueError("Rebin factor " + str(factor) + " does not "
+                             + "divide the " + str(n_bins) + " bins.")
+
+        bounds = np.arange(0, n_bins + 1, factor)
+        return bounds, edges[bounds]
+
+    new_edges = np.asarray(bins, dtype=np.float64)
+    if new_edges.ndim != 1 or len(new_edges) < 2:
+        raise ValueError("New bin edges should be a 1d array with at least "
+                         + "two values.")
+    if np.any(np.diff(new_edges) <= 0):
+        raise ValueError("New bin edges should be increasing.")
+
+    bounds = np.searchsorted(bin_centers(edges), new_edges, side="left")
+    return bounds, new_edges
+
+
+def monitor_edges(data):
+    """
+    Returns bin edges of each monitor dimension in array order
+
+    For 2D monitors the arrays have y as first and x as second dimension,
+    so y edges are returned first.
+
+    Parameters
+    ----------
+    data : McStasDataBinned or MonitorCube
+        Binned 1D or 2D data
+    """
+    dimension = data.metadata.dimension
+    limits = data.metadata.limits
+
+    if isinstance(dimension, int):
+        if dimension == 0:
+            raise ValueError("Rebinning needs 1D or 2D data, "
+                             + str(data.name) + " is 0D.")
+
+        if limits is not None and len(limits) == 2:
+            return [np.linspace(limits[0], limits[1], dimension + 1)]
+
+        # Edges halfway between the bin centers
+        centers = np.asarray(data.xaxis, dtype=np.float64)
+        if len(centers) < 2:
+            raise ValueError("Bin edges of " + str(data.name) + " not known.")
+        middle = bin_centers(centers)
+        return [np.concatenate(([2*centers[0] - middle[0]], middle,
+                                [2*centers[-1] - middle[-1]]))]
+
+    if len(dimension) != 2 or limits is None or len(limits) != 4:
+        raise ValueError("Rebinning needs 1D or 2D data with limits, "
+                         + "got dimension " + str(dimension) + " for "
+                         + str(data.name) + ".")
+
+    x_edges = np.linspace(limits[0], limits[1], dimension[0] + 1)
+    y_edges = np.linspace(limits[2], limits[3], dimension[1] + 1)
+    return [y_edges, x_edges]
+
+
+def rebin_arrays(intensity, error, ncount, bounds):
+    """
+    Sums binned arrays over new bins along the last dimensions
+
+    Intensities and ncount are summed and errors added in quadrature.
+    Leading dimensions, such as scan dimensions, are kept.
+
+    Parameters
+    ----------
+    intensity, error, ncount : numpy arrays
+        Arrays with the monitor dimensions last
+
+    bounds : list
+        Index bounds for each monitor dimension in array order, None
+        keeps a dimension as it is
+    """
+    intensity = accumulation_array(intensity)
+    variance = np.square(accumulation_array(error))
+    ncount = np.asarray(ncount)
+
+    axis = -len(bounds)
+    for dimension_bounds in bounds:
+        if dimension_bounds is not None:
+            intensity = sum_ranges(intensity, dimension_bounds, axis)
+            variance = sum_ranges(variance, dimension_bounds, axis)
+            ncount = sum_ranges(ncount, dimension_bounds, axis)
+        axis += 1
+
+    return intensity, np.sqrt(variance), ncount
+
+
+def regrid_1d(axes, intensities, edges):
+    """
+    Sums 1D data sets with different bin centers onto common bins
+
+    Each value goes to the new bin holding its bin center, values outside
+    the edges are left out. All data sets are histogrammed with a single
+    np.bincount.
+
+    Returns array with one row per data set and one column per new bin.
+
+    Parameters
+    ----------
+    axes : list of numpy arrays
+        Bin centers of each data set
+
+    intensities : list of numpy arrays
+        Values of each data set, same lengths as axes
+
+    edges : numpy array
+        Edges of the common bins, the last edge is included in the last bin
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    n_bins = len(edges) - 1
+    n_sets = len(axes)
+
+    lengths = [len(axis) for axis in axes]
+    if n_sets == 0 or sum(lengths) == 0:
+        return np.zeros((n_sets, n_bins))
+
+    rows = np.repeat(np.arange(n_sets), lengths)
+    centers = np.concatenate([np.asarray(axis, dtype=np.float64)
+                              for axis in axes])
+    values = np.concatenate([accumulation_array(intensity).ravel()
+                             for intensity in intensities])
+
+    columns = np.searchsorted(edges, centers, side="right") - 1
+    columns[centers == edges[-1]] = n_bins - 1
+    inside = (columns >= 0) & (columns < n_bins)
+
+    flat = rows[inside]*n_bins + columns[inside]
+    summed = np.bincount(flat, weights=values[inside],
+                         minlength=n_sets*n_bins)
+
+    return summed.reshape(n_sets, n_bins)
+
+
+def _is_single_region(regions):
+    return all(value is None or np.ndim(value) == 0 for value in regions)
+
+
+def _region_bounds(centers, low, high):
+    """
+    Returns index range of bin centers between low and high, inclusive
+    """
+    start = 0 if low is None else np.searchsorted(centers, low, side="left")
+    stop = (len(centers) if high is None
+            else np.searchsorted(centers, high, side="right"))
+    return slice(int(start), int(max(start, stop)))
+
+
+class BinnedRebinning:
+    """
+    Rebinning and region of interest integration for binned 1D and 2D data
+
+    The monitor dimensions are the last dimensions of the Intensity,
+    Error and Ncount arrays, leading dimensions such as the scan
+    dimensions of a MonitorCube are handled in the same vectorised
+    operation. Bin edges are found from the metadata limits.
+
+    Subclasses need metadata, xaxis, name and _with_arrays.
+    """
+
+    def _monitor_bins(self, bins):
+        """
+        Returns list with bins given for each monitor dimension, array order
+        """
+        if isinstance(self.metadata.dimension, int):
+            return [bins]
+
+        if isinstance(bins, (int, np.integer)):
+            return [bins, bins]
+
+        if len(bins) != 2:
+            raise ValueError("2D data needs bins for x and y, or a single "
+                             + "factor, got " + str(bins))
+
+        x_bins, y_bins = bins
+        return [y_bins, x_bins]
+
+    def rebin(self, bins):
+        """
+        Returns new data with combined bins, errors added in quadrature
+
+        An integer factor combines that many neighbouring bins and should
+        divide the number of bins. New bin edges instead place each old bin
+        in the new bin holding its center, bins outside are left out. For
+        2D data a single factor applies to both axes, or a tuple (x_bins,
+        y_bins) can be given where each is a factor, edges or None to keep
+        that axis.
+
+        Plotting of 2D data assumes bins of equal width, so 2D edges should
+        be evenly spaced.
+
+        Parameters
+        ----------
+        bins : int, array or tuple
+            Rebin factor or new bin edges
+        """
+        edges = monitor_edges(self)
+        all_bounds = []
+        new_edges = []
+        for dimension_edges, dimension_bins in zip(edges,
+                                                   self._monitor_bins(bins)):
+            if dimension_bins is None:
+                all_bounds.append(None)
+                new_edges.append(dimension_edges)
+                continue
+
+            bounds, rebinned_edges = rebin_bounds(dimension_edges,
+                                                  dimension_bins)
+            all_bounds.append(bounds)
+            new_edges.append(rebinned_edges)
+
+        arrays = rebin_arrays(self.Intensity, self.Error, self.Ncount,
+                              all_bounds)
+        new = self._with_arrays(*arrays)
+
+        metadata = copy.deepcopy(new.metadata)
+        if len(new_edges) == 1:
+            x_edges = new_edges[0]
+            metadata.dimension = len(x_edges) - 1
+            metadata.limits = [float(x_edges[0]), float(x_edges[-1])]
+            new.xaxis = bin_centers(x_edges)
+        else:
+            y_edges, x_edges = new_edges
+            metadata.dimension = [len(x_edges) - 1, len(y_edges) - 1]
+            metadata.limits = [float(x_edges[0]), float(x_edges[-1]),
+                               float(y_edges[0]), float(y_edges[-1])]
+        new.metadata = metadata
+
+        return new
+
+    def integrate_roi(self, regions):
+        """
+        Returns intensity, error and ncount summed in regions of interest
+
+        A region is (xmin, xmax) for 1D data and (xmin, xmax, ymin, ymax)
+        for 2D data in axis units, bins with centers within the limits
+        are included and None leaves a side open. For a single region the
+        sums have the shape of the leading dimensions, floats for a single
+        data set, for a list of regions a last dimension with one value
+        per region is added.
+
+        Parameters
+        ----------
+        regions : tuple or list of tuples
+            Region limits
+        """
+        edges = monitor_edges(self)
+        centers = [bin_centers(dimension_edges) for dimension_edges in edges]
+
+        single = _is_single_region(regions)
+        if single:
+            regions = [regions]
+
+        intensity = accumulation_array(self.Intensity)
+        variance = np.square(accumulation_array(self.Error))
+        ncount = self.Ncount
+
+        monitor_axes = tuple(range(-len(edges), 0))
+        sums = ([], [], [])
+        for region in regions:
+            if len(region) != 2*len(edges):
+                raise ValueError("Regions of " + str(len(edges)) + "D data "
+                                 + "need " + str(2*len(edges)) + " limits, "
+                                 + "got " + str(region))
+
+            if len(edges) == 1:
+                index = (_region_bounds(centers[0], *region),)
+            else:
+                index = (_region_bounds(centers[0], *region[2:]),
+                         _region_bounds(centers[1], *region[:2]))
+
+            full_index = (Ellipsis,) + index
+            for values, array in zip(sums, (intensity, variance, ncount)):
+                values.append(np.sum(array[full_index], axis=monitor_axes))
+
+        results = [np.stack(values, axis=-1) for values in sums]
+        results[1] = np.sqrt(results[1])
+        if single:
+            results = [result[..., 0] for result in results]
+
+        return tuple(float(result) if result.ndim == 0 else result
+                     for result in results)
+
+
+def rebin(data, bins):
+    """
+    Rebins binned data or each entry in a list of binned data
+
+    Parameters
+    ----------
+    data : McStasDataBinned, MonitorCube or list of these
+        Data to rebin
+
+    bins : int, array or tuple
+        Rebin factor or new bin edges, see BinnedRebinning.rebin
+    """
+    if isinstance(data, BinnedRebinning):
+        return data.rebin(bins)
+
+    return [entry.rebin(bins) for entry in data]
+
+
+def integrate_roi(data, regions):
+    """
+    Integrates regions of interest of binned data or a list of binned data
+
+    For a list the sums of each entry are stacked along a first dimension,
+    so the entries should have the same leading dimensions.
+
+    Parameters
+    ----------
+    data : McStasDataBinned, MonitorCube or list of these
+        Data to integrate
+
+    regions : tuple or list of tuples
+        Region limits, see BinnedRebinning.integrate_roi
+    """
+    if isinstance(data, BinnedRebinning):
+        return data.integrate_roi(regions)
+
+    sums = [entry.integrate_roi(regions) for entry in data]
+    return tuple(np.array([entry[index] for entry in sums])
+                 for index in range(3))
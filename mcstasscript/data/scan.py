@@ -0,0 +1,823 @@
+import copy
+import json
+import os
+
+import numpy as np
+
+from mcstasscript.data.data import BinnedArithmetic
+from mcstasscript.data.data import McStasDataBinned
+from mcstasscript.data.dtypes import accumulation_array
+from mcstasscript.data.rebin import BinnedRebinning
+from mcstasscript.data.archive import metadata_to_json
+from mcstasscript.data.archive import metadata_from_json
+from mcstasscript.helper.managed_mcrun import load_metadata
+from mcstasscript.helper.managed_mcrun import load_results
+
+INDEX_FILENAME = "scan.json"
+ARRAY_NAMES = ["Intensity", "Error", "Ncount"]
+
+
+class MonitorCube(BinnedArithmetic, BinnedRebinning):
+    """
+    Binned data for one monitor stacked over all points of a scan
+
+    Intensity, Error and Ncount have the scan dimensions first, followed
+    by the dimensions of the monitor. Missing scan points have NaN
+    intensity and error and zero Ncount. All operations work on the full
+    arrays, slicing gives views, so memory-mapped data is only read when
+    it is used.
+
+    Arithmetic with error propagation is supported with other cubes on
+    the same scan axes, with McStasDataBinned which is applied at every
+    scan point, and with numbers and numpy arrays. Arrays with the scan
+    shape hold one value per scan point, for example a normalisation.
+
+    Attributes
+    ----------
+    name : str
+        Name of the monitor component
+
+    metadata : McStasMetaData instance
+        Metadata of the monitor from the first loaded scan point
+
+    axes : dict
+        Scan parameter name and numpy array of coordinates for each scan
+        dimension, in order of the array dimensions
+
+    Intensity : numpy array
+        Intensity with shape scan_shape + monitor_shape
+
+    Error : numpy array
+        Error with the same shape as Intensity
+
+    Ncount : numpy array
+        Number of rays with the same shape as Intensity
+
+    xaxis : numpy array or None
+        Bin centers for 1d monitors
+
+    Methods
+    -------
+    isel(**indices)
+        Selects scan points by index along named scan axes
+
+    sel(**values)
+        Selects scan points by parameter value along named scan axes
+
+    sum(axis=None)
+        Sums over scan axes with errors added in quadrature
+
+    mean(axis=None)
+        Averages over scan axes
+
+    integrate(axis)
+        Integrates over a scan axis with the trapezoidal rule
+
+    totals()
+        Returns total intensity, error and ncount at each scan point
+
+    point(**indices)
+        Returns McStasDataBinned for a single scan point
+
+    rebin(bins)
+        Combines monitor bins at all scan points
+
+    integrate_roi(regions)
+        Sums regions of interest of the monitor at each scan point
+
+    +, -, *, / : MonitorCube, McStasDataBinned, number or numpy array
+        arithmetic with error propagation, see BinnedArithmetic
+    """
+
+    # Operations with McStasDataBinned return a MonitorCube
+    _arithmetic_priority = 1
+
+    def __init__(self, name, metadata, axes, intensity, error, ncount,
+                 xaxis=None):
+        """
+        Creates monitor cube from stacked arrays
+
+        Parameters
+        ----------
+        name : str
+            Name of the monitor component
+
+        metadata : McStasMetaData instance
+            Metadata of the monitor
+
+        axes : dict
+            Scan parameter name and coordinates for each scan dimension
+
+        intensity : numpy array
+            Intensity with shape scan_shape + monitor_shape
+
+        error : numpy array
+            Error with the same shape as intensity
+
+        ncount : numpy array
+            Ncount with the same shape as intensity
+
+        xaxis : numpy array, optional
+            Bin centers for 1d monitors
+        """
+        self.name = name
+        self.metadata = metadata
+        self.axes = {key: np.asarray(value) for key, value in axes.items()}
+
+        scan_shape = tuple(len(value) for value in self.axes.values())
+        if intensity.shape[:len(scan_shape)] != scan_shape:
+            raise ValueError("Intensity of " + str(name) + " with shape "
+                             + str(intensity.shape) + " does not start "
+                             + "with scan shape " + str(scan_shape))
+
+        if error.shape != intensity.shape or ncount.shape != intensity.shape:
+            raise ValueError("Intensity, Error and Ncount of " + str(name)
+                             + " should have the same shape.")
+
+        self.Intensity = intensity
+        self.Error = error
+        self.Ncount = ncount
+        self.xaxis = xaxis
+
+    @property
+    def scan_shape(self):
+        return tuple(len(value) for value in self.axes.values())
+
+    @property
+    def monitor_shape(self):
+        return self.Intensity.shape[len(self.axes):]
+
+    def _axis_position(self, axis):
+        """
+        Returns array dimension of named scan axis
+        """
+        names = list(self.axes)
+        if axis not in names:
+            raise KeyError("No scan axis named " + str(axis)
+                           + ", available: " + str(names))
+
+        return names.index(axis)
+
+    def _axis_list(self, axis):
+        """
+        Returns list of axis names from None, a name or a list of names
+        """
+        if axis is None:
+            return list(self.axes)
+        if isinstance(axis, str):
+            return [axis]
+
+        return list(axis)
+
+    def _new(self, axes, intensity, error, ncount):
+        return MonitorCube(self.name, self.metadata, axes,
+                           intensity, error, ncount, xaxis=self.xaxis)
+
+    def _with_arrays(self, intensity, error, ncount):
+        return self._new(self.axes, np.asarray(intensity),
+                         np.asarray(error), np.asarray(ncount))
+
+    def _expand(self, array):
+        """
+        Adds monitor dimensions to arrays with one value per scan point
+        """
+        if array.ndim > 0 and array.shape == self.scan_shape:
+            return array.reshape(array.shape + (1,) * len(self.monitor_shape))
+
+        return array
+
+    def _operand(self, other):
+        if isinstance(other, MonitorCube):
+            same_axes = (list(other.axes) == list(self.axes)
+                         and all(np.array_equal(other.axes[key], value)
+                                 for key, value in self.axes.items()))
+            if not same_axes:
+                raise ValueError("Arithmetic between monitor cubes needs "
+                                 + "the same scan axes.")
+
+        return super()._operand(other)
+
+    def isel(self, **indices):
+        """
+        Selects scan points by index along named scan axes
+
+        Each axis is indexed independently. An integer removes the axis,
+        a slice, list or array of indices keeps it. Slices return views of
+        the data.
+
+        Parameters
+        ----------
+        indices : keyword arguments
+            Scan axis name with index, for example wavelength=slice(0, 5)
+        """
+        axes = dict(self.axes)
+        arrays = [self.Intensity, self.Error, self.Ncount]
+
+        # Index from the last dimension so earlier positions stay valid
+        positions = {axis: self._axis_position(axis) for axis in indices}
+        for axis in sorted(indices, key=positions.get, reverse=True):
+            index = indices[axis]
+            if isinstance(index, (list, tuple)):
+                index = np.asarray(index)
+
+            full_index = (slice(None),) * positions[axis] + (index,)
+            arrays = [array[full_index] for array in arrays]
+
+            if np.ndim(index) == 0 and not isinstance(index, slice):
+                del axes[axis]
+            else:
+                axes[axis] = axes[axis][index]
+
+        return self._new(axes, *arrays)
+
+    def sel(self, **values):
+        """
+        Selects scan points by parameter value along named scan axes
+
+        A single value removes the axis, a list of values keeps it.
+
+        Parameters
+        ----------
+        values : keyword arguments
+            Scan axis name with coordinate value or list of values
+        """
+        indices = {}
+        for axis, value in values.items():
+            self._axis_position(axis)
+            coordinates = self.axes[axis]
+
+            if np.ndim(value) == 0:
+                indices[axis] = find_coordinate(coordinates, value, axis)
+            else:
+                indices[axis] = [find_coordinate(coordinates, single, axis)
+                                 for single in value]
+
+        return self.isel(**indices)
+
+    def sum(self, axis=None):
+        """
+        Sums over scan axes, errors are added in quadrature
+
+        Parameters
+        ----------
+        axis : str, list of str or None
+            Scan axes to sum over, None for all scan axes
+        """
+        names = self._axis_list(axis)
+        dims = tuple(self._axis_position(name) for name in names)
+
+        intensity = np.sum(self.Intensity, axis=dims, dtype=np.float64)
+        error = np.sqrt(np.sum(np.square(accumulation_array(self.Error)),
+                               axis=dims))
+        ncount = np.sum(self.Ncount, axis=dims)
+
+        axes = {key: value for key, value in self.axes.items()
+                if key not in names}
+        return self._new(axes, intensity, error, ncount)
+
+    def mean(self, axis=None):
+        """
+        Averages over scan axes, Ncount is summed
+
+        Parameters
+        ----------
+        axis : str, list of str or None
+            Scan axes to average over, None for all scan axes
+        """
+        names = self._axis_list(axis)
+        n_points = int(np.prod([len(self.axes[name]) for name in names]))
+
+        total = self.sum(axis=names)
+        total.Intensity = total.Intensity / n_points
+        total.Error = total.Error / n_points
+
+        return total
+
+    def integrate(self, axis):
+        """
+        Integrates over a scan axis with the trapezoidal rule
+
+        The coordinates of the axis are used as integration variable and
+        the error is propagated with the same weights. Ncount is summed.
+
+        Parameters
+        ----------
+        axis : str
+            Name of scan axis to integrate over
+        """
+        position = self._axis_position(axis)
+        weights = trapezoid_weights(self.axes[axis])
+
+        def weighted_sum(array, weights):
+            array = np.moveaxis(array, position, 0)
+            return np.tensordot(weights, array, axes=1)
+
+        intensity = weighted_sum(accumulation_array(self.Intensity), weights)
+        error = np.sqrt(weighted_sum(np.square(accumulation_array(self.Error)),
+                                     weights ** 2))
+        ncount = np.sum(self.Ncount, axis=position)
+
+        axes = {key: value for key, value in self.axes.items()
+                if key != axis}
+        return self._new(axes, intensity, error, ncount)
+
+    def totals(self):
+        """
+        Returns total intensity, error and ncount at each scan point
+
+        The arrays have the scan shape, errors are added in quadrature.
+        """
+        dims = tuple(range(len(self.axes), self.Intensity.ndim))
+
+        intensity = np.sum(self.Intensity, axis=dims, dtype=np.float64)
+        error = np.sqrt(np.sum(np.square(accumulation_array(self.Error)),
+                               axis=dims))
+        ncount = np.sum(self.Ncount, axis=dims)
+
+        return intensity, error, ncount
+
+    def point(self, **indices):
+        """
+        Returns McStasDataBinned for a single scan point
+
+        The scan parameters of the point are set in the metadata.
+
+        Parameters
+        ----------
+        indices : keyword arguments
+            Index along each scan axis, axes of length 1 can be left out
+        """
+        for axis, coordinates in self.axes.items():
+            if axis not in indices:
+                if len(coordinates) != 1:
+                    raise ValueError("Index needed for scan axis " + axis)
+                indices[axis] = 0
+
+        selected = self.isel(**indices)
+        if len(selected.axes) > 0:
+            raise ValueError("point needs an integer index for each scan "
+                             + "axis, got " + str(indices))
+
+        metadata = copy.deepcopy(self.metadata)
+        parameters = dict(metadata.parameters or {})
+        for axis, index in indices.items():
+            parameters[axis] = self.axes[axis][index].item()
+        metadata.parameters = parameters
+        metadata.info["Parameters"] = parameters
+
+        kwargs = {}
+        if self.xaxis is not None:
+            kwargs["xaxis"] = np.asarray(self.xaxis)
+
+        data = McStasDataBinned(metadata, np.array(selected.Intensity),
+                                np.array(selected.Error),
+                                np.array(selected.Ncount), **kwargs)
+        data.name = self.name
+
+        return data
+
+    def __str__(self):
+        string = "MonitorCube: " + str(self.name) + " scan "
+        string += ", ".join(axis + "(" + str(len(value)) + ")"
+                            for axis, value in self.axes.items())
+        string += " monitor shape " + str(self.monitor_shape)
+
+        return string
+
+    def __repr__(self):
+        return "\n" + self.__str__()
+
+
+class ScanResult:
+    """
+    Results of a parameter scan stacked into a MonitorCube per monitor
+
+    Scan points are placed on a grid given by the scan axes. Binned
+    monitors are stacked, event monitors are skipped. With a directory
+    the arrays are stored as memory-mapped .npy files, so scans larger
+    than memory can be built one point at a time and opened again later.
+
+    Attributes
+    ----------
+    axes : dict
+        Scan parameter name and numpy array of coordinates for each scan
+        dimension
+
+    monitors : dict
+        MonitorCube for each monitor name
+
+    directory : str or None
+        Folder with the arrays if stored on disk
+
+    Methods
+    -------
+    add_point(index, results)
+        Adds results of one scan point
+
+    isel(**indices)
+        Selects scan points by index on all monitors
+
+    sel(**values)
+        Selects scan points by parameter value on all monitors
+
+    flush()
+        Writes memory-mapped data to disk
+    """
+
+    def __init__(self, axes, directory=None, monitors=None):
+        """
+        Creates empty scan result with the given scan axes
+
+        Parameters
+        ----------
+        axes : dict
+            Scan parameter name and coordinates for each scan dimension
+
+        directory : str, optional
+            Folder in which arrays are stored as memory-mapped files
+
+        monitors : dict, optional
+            MonitorCube for each monitor name
+        """
+        self.axes = {key: np.asarray(value) for key, value in axes.items()}
+        for key, value in self.axes.items():
+            if value.ndim != 1:
+                raise ValueError("Coordinates of scan axis " + str(key)
+                                 + " should be one dimensional.")
+
+        self.monitors = {} if monitors is None else dict(monitors)
+        self.directory = directory
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._write_index()
+
+    @property
+    def shape(self):
+        return tuple(len(value) for value in self.axes.values())
+
+    @classmethod
+    def from_results(cls, results, axes, directory=None):
+        """
+        Creates scan result from a list of result lists
+
+        Parameters
+        ----------
+        results : list of lists of McStasData
+            Results for each scan point
+
+        axes : dict or list of str
+            With a dict of coordinates the results are given in C order,
+            the last axis changing fastest. With a list of parameter names
+            the coordinates are the sorted unique parameter values found
+            in the metadata and each point is placed accordingly.
+
+        directory : str, optional
+            Folder in which arrays are stored as memory-mapped files
+        """
+        parameter_list = [point_parameters(point) for point in results]
+        axes, indices = scan_grid(parameter_list, axes)
+
+        scan = cls(axes, directory=directory)
+        for index, point in zip(indices, results):
+            scan.add_point(index, point)
+
+        return scan
+
+    @classmethod
+    def from_folders(cls, folders, axes, directory=None, monitors=None,
+                     workers=1, dtypes=None):
+        """
+        Creates scan result by loading McStas output folders one by one
+
+        Only one scan point is in memory at a time. When axes are given as
+        parameter names, the grid is found from the metadata alone before
+        any monitor data is loaded.
+
+        Parameters
+        ----------
+        folders : list of str
+            McStas output folder for each scan point
+
+        axes : dict or list of str
+            Scan axes, see from_results
+
+        directory : str, optional
+            Folder in which arrays are stored as memory-mapped files
+
+        monitors : str, pattern or list of these, optional
+            Monitors to load, see load_results
+
+        workers : int, default 1
+            Number of workers used to load each folder
+
+        dtypes : str or dict, optional
+            Dtypes of loaded arrays, see load_results, the scan arrays
+            are stored with the dtypes of the first point
+        """
+        parameter_list = []
+        for folder in folders:
+            metadata_list = load_metadata(folder, monitors=monitors)
+            parameters = {}
+            if len(metadata_list) > 0:
+                parameters = metadata_list[0].parameters or {}
+            parameter_list.append(parameters)
+
+        axes, indices = scan_grid(parameter_list, axes)
+
+        scan = cls(axes, directory=directory)
+        for index, folder in zip(indices, folders):
+            point = load_results(folder, monitors=monitors, workers=workers,
+                                 dtypes=dtypes)
+            scan.add_point(index, point)
+
+        scan.flush()
+        return scan
+
+    @classmethod
+    def open(cls, directory, mode="r"):
+        """
+        Opens scan result stored in a directory
+
+        Parameters
+        ----------
+        directory : str
+            Folder given when the scan result was created
+
+        mode : str, default "r"
+            Memory-map mode, "r" for read only, "r+" to allow changes
+        """
+        with open(os.path.join(directory, INDEX_FILENAME), "r") as f:
+            index = json.load(f)
+
+        axes = {key: np.asarray(value) for key, value in index["axes"]}
+
+        monitors = {}
+        for name, description in index["monitors"].items():
+            metadata = metadata_from_json(description["info"],
+                                          description["metadata"])
+            arrays = [np.load(os.path.join(directory, file_name),
+                              mmap_mode=mode)
+                      for file_name in description["arrays"]]
+
+            xaxis = None
+            if description["xaxis"] is not None:
+                xaxis = np.asarray(description["xaxis"])
+
+            monitors[name] = MonitorCube(name, metadata, axes, *arrays,
+                                         xaxis=xaxis)
+
+        scan = cls(axes, monitors=monitors)
+        scan.directory = directory
+        return scan
+
+    def add_point(self, index, results):
+        """
+        Adds results of one scan point at given grid index
+
+        Arrays for a monitor are created when it is first seen.
+
+        Parameters
+        ----------
+        index : int or tuple of int
+            Index of the scan point along each scan axis, an int is
+            interpreted as flat index in C order
+
+        results : list of McStasData
+            Results of the scan point
+        """
+        if np.ndim(index) == 0:
+            index = np.unravel_index(int(index), self.shape)
+        index = tuple(int(value) for value in index)
+
+        for data in results:
+            if data.data_type == "Events":
+                continue
+
+            monitor_shape = np.shape(data.Intensity)
+            if data.name not in self.monitors:
+                self._add_monitor(data, monitor_shape)
+
+            cube = self.monitors[data.name]
+            if cube.monitor_shape != monitor_shape:
+                raise ValueError("Monitor " + str(data.name) + " has shape "
+                                 + str(monitor_shape) + " but earlier scan "
+                                 + "points had " + str(cube.monitor_shape))
+
+            cube.Intensity[index] = data.Intensity
+            cube.Error[index] = np.reshape(data.Error, monitor_shape)
+            cube.Ncount[index] = np.reshape(data.Ncount, monitor_shape)
+
+    def _add_monitor(self, data, monitor_shape):
+        """
+        Creates arrays for new monitor, missing points are NaN
+        """
+        shape = self.shape + tuple(monitor_shape)
+
+        arrays = []
+        for array_name in ARRAY_NAMES:
+            fill = 0 if array_name == "Ncount" else np.nan
+            # Arrays are stored with the dtype of the first scan point
+            dtype = np.asarray(getattr(data, array_name)).dtype
+            if dtype.kind != "f" and not (array_name == "Ncount"
+                                          and dtype.kind in "iu"):
+                # Missing scan points are NaN, which needs floating point
+                dtype = np.dtype(np.float64)
+
+            if self.directory is None:
+                array = np.full(shape, fill, dtype=dtype)
+            else:
+                path = os.path.join(self.directory,
+                                    array_file_name(data.name, array_name))
+                array = np.lib.format.open_memmap(path, mode="w+",
+                                                  dtype=dtype,
+                                                  shape=shape)
+                array[...] = fill
+            arrays.append(array)
+
+        xaxis = None
+        if hasattr(data, "xaxis") and data.xaxis is not None:
+            if np.size(data.xaxis) > 0:
+                xaxis = np.array(data.xaxis)
+
+        self.monitors[data.name] = MonitorCube(data.name,
+                                               copy.deepcopy(data.metadata),
+                                               self.axes, *arrays,
+                                               xaxis=xaxis)
+
+        if self.directory is not None:
+            self._write_index()
+
+    def _write_index(self):
+        """
+        Writes axes and monitor descriptions to the index file
+        """
+        monitors = {}
+        for name, cube in self.monitors.items():
+            info, metadata = metadata_to_json(cube.metadata)
+            xaxis = None if cube.xaxis is None else np.asarray(cube.xaxis)
+            monitors[name] = {
+                "info": info,
+                "metadata": metadata,
+                "arrays": [array_file_name(name, array_name)
+                           for array_name in ARRAY_NAMES],
+                "xaxis": None if xaxis is None else xaxis.tolist()}
+
+        index = {"axes": [[key, value.tolist()]
+                          for key, value in self.axes.items()],
+                 "monitors": monitors}
+
+        with open(os.path.join(self.directory, INDEX_FILENAME), "w") as f:
+            json.dump(index, f)
+
+    def flush(self):
+        """
+        Writes changes of memory-mapped arrays to disk
+        """
+        for cube in self.monitors.values():
+            for array in [cube.Intensity, cube.Error, cube.Ncount]:
+                if isinstance(array, np.memmap):
+                    array.flush()
+
+    def isel(self, **indices):
+        """
+        Selects scan points by index on all monitors, see MonitorCube.isel
+        """
+        monitors = {name: cube.isel(**indices)
+                    for name, cube in self.monitors.items()}
+        return self._from_monitors(monitors, indices)
+
+    def sel(self, **values):
+        """
+        Selects scan points by value on all monitors, see MonitorCube.sel
+        """
+        monitors = {name: cube.sel(**values)
+                    for name, cube in self.monitors.items()}
+        return self._from_monitors(monitors, values)
+
+    def _from_monitors(self, monitors, selection):
+        if len(monitors) > 0:
+            axes = next(iter(monitors.values())).axes
+        else:
+            axes = {key: value for key, value in self.axes.items()
+                    if key not in selection}
+
+        return ScanResult(axes, monitors=monitors)
+
+    def __getitem__(self, name):
+        return self.monitors[name]
+
+    def __contains__(self, name):
+        return name in self.monitors
+
+    def __iter__(self):
+        return iter(self.monitors.values())
+
+    def __len__(self):
+        return len(self.monitors)
+
+    def __str__(self):
+        string = "ScanResult with scan axes "
+        string += ", ".join(axis + "(" + str(len(value)) + ")"
+                            for axis, value in self.axes.items())
+        string += " and monitors: " + ", ".join(self.monitors)
+
+        return string
+
+    def __repr__(self):
+        return "\n" + self.__str__()
+
+
+def array_file_name(monitor_name, array_name):
+    return str(monitor_name) + "." + array_name + ".npy"
+
+
+def point_parameters(results):
+    """
+    Returns instrument parameters from the metadata of a result list
+    """
+    for data in results:
+        if data.metadata.parameters is not None:
+            return data.metadata.parameters
+
+    return {}
+
+
+def scan_grid(parameter_list, axes):
+    """
+    Returns scan axes and grid index of each scan point
+
+    Parameters
+    ----------
+    parameter_list : list of dict
+        Instrument parameters of each scan point
+
+    axes : dict or list of str
+        Coordinates of each axis, scan points given in C order, or names
+        of parameters from which the coordinates are found
+    """
+    if isinstance(axes, dict):
+        axes = {key: np.asarray(value) for key, value in axes.items()}
+        shape = tuple(len(value) for value in axes.values())
+        if int(np.prod(shape)) != len(parameter_list):
+            raise ValueError("Scan axes with shape " + str(shape)
+                             + " need " + str(int(np.prod(shape)))
+                             + " scan points, got " + str(len(parameter_list)))
+
+        indices = [np.unravel_index(flat_index, shape)
+                   for flat_index in range(len(parameter_list))]
+        return axes, indices
+
+    if isinstance(axes, str):
+        axes = [axes]
+
+    values = {}
+    for name in axes:
+        values[name] = []
+        for parameters in parameter_list:
+            if name not in parameters:
+                raise KeyError("Scan parameter " + str(name) + " not found "
+                               + "in metadata, available: "
+                               + str(list(parameters)))
+            values[name].append(parameters[name])
+
+    coordinates = {name: np.unique(value) for name, value in values.items()}
+    indices = [tuple(int(np.searchsorted(coordinates[name], values[name][i]))
+                     for name in axes)
+               for i in range(len(parameter_list))]
+
+    if len(set(indices)) != len(indices):
+        raise ValueError("Several scan points have the same values for "
+                         + "the scan parameters " + str(list(axes)))
+
+    return coordinates, indices
+
+
+def find_coordinate(coordinates, value, axis):
+    """
+    Returns index of value in coordinates of a scan axis
+    """
+    if coordinates.dtype.kind in "fc":
+        matches = np.flatnonzero(np.isclose(coordinates, value))
+    else:
+        matches = np.flatnonzero(coordinates == value)
+
+    if len(matches) == 0:
+        raise ValueError("Value " + str(value) + " not found on scan axis "
+                         + str(axis) + " with coordinates "
+                         + str(coordinates))
+
+    return int(matches[0])
+
+
+def trapezoid_weights(coordinates):
+    """
+    Returns weight of each point when integrating with trapezoidal rule
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    weights = np.zeros(len(coordinates))
+    steps = np.diff(coordinates)
+    weights[:-1] += steps / 2
+    weights[1:] += steps / 2
+
+    return weights
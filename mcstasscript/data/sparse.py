@@ -0,0 +1,205 @@
+import numpy as np
+
+from mcstasscript.data.dtypes import convert_array
+
+# Fields of binned data held by SparseBins
+SPARSE_FIELDS = ("Intensity", "Error", "Ncount")
+
+# Fill fraction below which monitors are stored sparse with sparse=True
+SPARSE_FILL_FRACTION = 0.1
+
+# Smaller monitors are always kept dense when chosen automatically
+SPARSE_MIN_BINS = 4096
+
+_default_sparse = False
+
+
+class SparseBins:
+    """
+    Intensity, error and ncount of the non-empty bins of a binned monitor
+
+    Stored in coordinate format with one flat index per non-empty bin,
+    a bin is empty when intensity, error and ncount all are zero. Dense
+    arrays are created on request and are read only, as changes to them
+    would not reach the sparse data.
+
+    Attributes
+    ----------
+    shape : tuple
+        Shape of the dense arrays
+
+    indices : numpy array
+        Flat index in C order of each stored bin
+
+    values : dict
+        Numpy array with the value in each stored bin for each field
+    """
+
+    def __init__(self, shape, indices, intensity, error, ncount):
+        """
+        Creates sparse bins from flat indices and values
+
+        Parameters
+        ----------
+        shape : tuple
+            Shape of the dense arrays
+
+        indices : numpy array
+            Flat index of each stored bin, sorted
+
+        intensity, error, ncount : numpy arrays
+            Value in each stored bin
+        """
+        self.shape = tuple(shape)
+        self.indices = indices
+        self.values = {"Intensity": intensity, "Error": error,
+                       "Ncount": ncount}
+
+    @classmethod
+    def from_dense(cls, intensity, error, ncount):
+        """
+        Creates sparse bins from dense arrays of the same shape
+
+        Error and ncount can be scalars, as for 0D monitors, and are then
+        broadcast to the shape of intensity.
+        """
+        intensity = np.asarray(intensity)
+        shape = intensity.shape
+        error = np.broadcast_to(error, shape)
+        ncount = np.broadcast_to(ncount, shape)
+
+        filled = (intensity != 0) | (error != 0) | (ncount != 0)
+        indices = np.flatnonzero(filled)
+        if intensity.size <= np.iinfo(np.int32).max:
+            indices = indices.astype(np.int32)
+
+        return cls(shape, indices, intensity.ravel()[indices],
+                   error.ravel()[indices], ncount.ravel()[indices])
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def fill_fraction(self):
+        """
+        Fraction of the bins that are stored
+        """
+        if self.size == 0:
+            return 0.0
+
+        return len(self.indices) / self.size
+
+    @property
+    def nbytes(self):
+        return self.indices.nbytes + sum(value.nbytes
+                                         for value in self.values.values())
+
+    def dense(self, field):
+        """
+        Returns read only dense array of given field
+
+        Parameters
+        ----------
+        field : str
+            Intensity, Error or Ncount
+        """
+        values = self.values[field]
+        array = np.zeros(self.size, dtype=values.dtype)
+        array[self.indices] = values
+        array = array.reshape(self.shape)
+        array.flags.writeable = False
+
+        return array
+
+    def totals(self):
+        """
+        Returns total intensity, error and ncount of all bins
+        """
+        error = self.values["Error"].astype(np.float64)
+        return (float(np.sum(self.values["Intensity"], dtype=np.float64)),
+                float(np.sqrt(np.sum(np.square(error)))),
+                float(np.sum(self.values["Ncount"], dtype=np.float64)))
+
+    def astype(self, dtypes):
+        """
+        Converts stored values to dtypes given per field
+        """
+        for field in SPARSE_FIELDS:
+            self.values[field] = convert_array(self.values[field],
+                                               dtypes[field])
+
+
+def set_default_sparse(sparse):
+    """
+    Sets whether loaders store mostly empty 2D monitors sparse
+
+    Parameters
+    ----------
+    sparse : bool or float
+        False (initial default) keeps all monitors dense, True stores 2D
+        monitors with a fill fraction below SPARSE_FILL_FRACTION sparse,
+        a number between 0 and 1 gives another fill fraction limit
+    """
+    global _default_sparse
+
+    resolve_sparse(sparse)
+    _default_sparse = sparse
+
+
+def get_default_sparse():
+    """
+    Returns sparse setting used by loaders when none is given
+    """
+    return _default_sparse
+
+
+def resolve_sparse(sparse=None):
+    """
+    Returns fill fraction limit for sparse storage, None if disabled
+
+    Parameters
+    ----------
+    sparse : bool, float or None
+        Sparse setting, None uses the default
+    """
+    if sparse is None:
+        sparse = _default_sparse
+
+    if sparse is False:
+        return None
+
+    if sparse is True:
+        return SPARSE_FILL_FRACTION
+
+    if not isinstance(sparse, (int, float)) or not 0 < sparse <= 1:
+        raise ValueError("sparse should be a bool or a fill fraction "
+                         + "between 0 and 1, got " + str(sparse))
+
+    return float(sparse)
+
+
+def apply_sparse(data, sparse=None):
+    """
+    Stores 2D binned data sparse if its fill fraction is low enough
+
+    Returns the given object.
+
+    Parameters
+    ----------
+    data : McStasData
+        Data to store sparse, only binned 2D data is considered
+
+    sparse : bool, float or None
+        Sparse setting, see resolve_sparse
+    """
+    limit = resolve_sparse(sparse)
+    if limit is None or data.data_type != "Binned 2D" or data.is_sparse:
+        return data
+
+    intensity = data.Intensity
+    if intensity.size < SPARSE_MIN_BINS:
+        return data
+
+    data.to_sparse(limit=limit)
+    return data
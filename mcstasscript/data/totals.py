@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class TotalsTable:
+    """
+    Total intensity, error and ray count of each monitor for many runs
+
+    Built by load_totals from the simulation metadata alone. Runs are
+    rows and monitors columns, monitors missing in a run are NaN.
+
+    Attributes
+    ----------
+    folders : list of str
+        Data folder of each run
+
+    monitors : list of str
+        Component name of each monitor, in order of first appearance
+
+    values : numpy array
+        Array with shape (runs, monitors, 3) holding I, E and N
+
+    parameters : dict
+        Numpy array with the value in each run for each instrument
+        parameter, numbers are NaN and other values None where missing
+
+    Methods
+    -------
+    monitor(name)
+        Returns array of I, E and N for each run for one monitor
+
+    select(mask)
+        Returns table with a subset of the runs
+    """
+
+    def __init__(self, folders, monitors, values, parameters):
+        """
+        Creates table from arrays, usually done by load_totals
+
+        Parameters
+        ----------
+        folders : list of str
+            Data folder of each run
+
+        monitors : list of str
+            Component name of each monitor
+
+        values : numpy array
+            Array with shape (runs, monitors, 3)
+
+        parameters : dict
+            Numpy array of values in each run for each parameter
+        """
+        self.folders = list(folders)
+        self.monitors = list(monitors)
+        self.values = values
+        self.parameters = parameters
+
+        if values.shape != (len(self.folders), len(self.monitors), 3):
+            raise ValueError("Totals should have shape (runs, monitors, 3), "
+                             + "got " + str(values.shape))
+
+    @property
+    def I(self):
+        return self.values[:, :, 0]
+
+    @property
+    def E(self):
+        return self.values[:, :, 1]
+
+    @property
+    def N(self):
+        return self.values[:, :, 2]
+
+    def monitor(self, name):
+        """
+        Returns array with shape (runs, 3) of I, E and N for one monitor
+
+        Parameters
+        ----------
+        name : str
+            Component name of the monitor
+        """
+        if name not in self.monitors:
+            raise NameError("No monitor named " + str(name)
+                            + " in totals, available: " + str(self.monitors))
+
+        return self.values[:, self.monitors.index(name), :]
+
+    def select(self, mask):
+        """
+        Returns table with the runs selected by a boolean mask or indices
+
+        Parameters
+        ----------
+        mask : numpy array
+            Boolean array with one element per run or array of run indices
+        """
+        mask = np.asarray(mask)
+        if mask.dtype == bool:
+            mask = np.flatnonzero(mask)
+
+        folders = [self.folders[index] for index in mask]
+        parameters = {name: value[mask]
+                      for name, value in self.parameters.items()}
+
+        return TotalsTable(folders, self.monitors, self.values[mask],
+                           parameters)
+
+    def __len__(self):
+        return len(self.folders)
+
+    def __str__(self):
+        string = "TotalsTable with " + str(len(self)) + " runs of "
+        string += str(len(self.monitors)) + " monitors: "
+        string += ", ".join(self.monitors)
+
+        return string
+
+    def __repr__(self):
+        return "\n" + self.__str__()
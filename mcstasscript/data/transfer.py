@@ -0,0 +1,215 @@
+import copy
+import os
+import tempfile
+import weakref
+
+import numpy as np
+
+from mcstasscript.data.data import McStasDataList
+from mcstasscript.data.memory import _remove_file
+
+# Attributes of McStasData objects holding the data arrays
+PAYLOAD_ATTRIBUTES = ("_Intensity", "_Error", "_Ncount", "_events")
+
+# Arrays smaller than this are pickled with the data instead of shared
+SHARE_MIN_BYTES = 2**20
+
+
+def shared_memory_folder():
+    """
+    Returns folder for shared arrays, /dev/shm when available
+
+    Files in /dev/shm are held in memory, so the arrays are never written
+    to disk, elsewhere the temporary folder of the system is used.
+    """
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+
+    return tempfile.gettempdir()
+
+
+class SharedArray:
+    """
+    Handle to a numpy array stored in a memory-mapped .npy file
+
+    Only the file name, shape and dtype are pickled, so handles can be
+    sent between processes cheaply. The receiving process maps the file
+    with attach, which gives an array without copying the data.
+    """
+
+    def __init__(self, filename, shape, dtype):
+        self.filename = filename
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+    @classmethod
+    def from_array(cls, array, folder=None):
+        """
+        Writes array to a new file in folder and returns handle to it
+
+        Parameters
+        ----------
+        array : numpy array
+            Array to share, Fortran order is kept
+
+        folder : str, optional
+            Folder for the file, default is shared_memory_folder
+        """
+        if folder is None:
+            folder = shared_memory_folder()
+
+        handle, filename = tempfile.mkstemp(prefix="mcstasscript_",
+                                            suffix=".npy", dir=folder)
+        os.close(handle)
+
+        fortran_order = (array.flags.f_contiguous
+                         and not array.flags.c_contiguous)
+        shared = np.lib.format.open_memmap(filename, mode="w+",
+                                           dtype=array.dtype,
+                                           shape=array.shape,
+                                           fortran_order=fortran_order)
+        shared[...] = array
+        shared.flush()
+        del shared
+
+        return cls(filename, array.shape, array.dtype)
+
+    def attach(self):
+        """
+        Returns the array mapped from the file, without copying
+
+        The file is removed once the mapped array and all views of it are
+        released, which frees the memory. The file can not be removed
+        while it is mapped on all systems, so it is kept until then.
+        """
+        mapped = np.load(self.filename, mmap_mode="r+")
+        memory_map = getattr(mapped, "_mmap", None)
+        if memory_map is None:
+            # Nothing is mapped for empty arrays
+            _remove_file(self.filename)
+        else:
+            # Called after the memory map is closed
+            weakref.finalize(memory_map, _remove_file, self.filename)
+
+        # Plain array view, the memmap is kept alive as its base
+        return np.asarray(mapped)
+
+    def release(self):
+        """
+        Removes the file without attaching it
+        """
+        _remove_file(self.filename)
+
+    def __repr__(self):
+        return ("SharedArray(shape=" + str(self.shape) + ", dtype="
+                + str(self.dtype) + ", file=" + self.filename + ")")
+
+
+def share_data(data, folder=None, min_bytes=SHARE_MIN_BYTES):
+    """
+    Returns copy of McStasData with large arrays replaced by SharedArray
+
+    The copy is cheap to pickle and is turned back into a McStasData
+    object with restore_data. Sparse data, small arrays and derived
+    columns cached by event data are pickled as usual.
+
+    Parameters
+    ----------
+    data : McStasData
+        Data to share
+
+    folder : str, optional
+        Folder for the shared files, default is shared_memory_folder
+
+    min_bytes : int
+        Smallest array placed in a shared file
+    """
+    shared = copy.copy(data)
+    if hasattr(shared, "_column_cache"):
+        shared._column_cache = {}
+        shared._range_cache = {}
+
+    for attribute in PAYLOAD_ATTRIBUTES:
+        if not hasattr(data, attribute):
+            continue
+
+        array = data._load_payload(attribute)
+        if isinstance(array, np.ndarray) and array.nbytes >= min_bytes:
+            # Set directly so the handle is not seen as data in memory
+            shared.__dict__[attribute] = SharedArray.from_array(array,
+                                                                folder)
+
+    return shared
+
+
+def restore_data(shared):
+    """
+    Returns McStasData object with the shared arrays attached
+
+    The object given is updated in place and returned.
+
+    Parameters
+    ----------
+    shared : McStasData
+        Data returned by share_data
+    """
+    for attribute in PAYLOAD_ATTRIBUTES:
+        handle = shared.__dict__.get(attribute)
+        if isinstance(handle, SharedArray):
+            shared._store_payload(attribute, handle.attach())
+
+    return shared
+
+
+def share_results(results, folder=None, min_bytes=SHARE_MIN_BYTES):
+    """
+    Returns list of McStasData copies to send to another process
+
+    Used in worker processes, the large arrays are placed in files in
+    shared memory and only handles to them are pickled when the list is
+    returned. The receiving process calls restore_results, which maps the
+    arrays without copying them. Files of results that are not restored
+    are removed with release_results.
+
+    Parameters
+    ----------
+    results : list of McStasData
+        Results to send
+
+    folder : str, optional
+        Folder for the shared files, default is shared_memory_folder
+
+    min_bytes : int
+        Smallest array placed in a shared file, smaller arrays are pickled
+    """
+    return [share_data(data, folder=folder, min_bytes=min_bytes)
+            for data in results]
+
+
+def restore_results(shared_results):
+    """
+    Returns McStasDataList with the shared arrays attached without copies
+
+    Parameters
+    ----------
+    shared_results : list of McStasData
+        Results returned by share_results
+    """
+    return McStasDataList([restore_data(shared)
+                           for shared in shared_results])
+
+
+def release_results(shared_results):
+    """
+    Removes the shared files of results that will not be restored
+
+    Parameters
+    ----------
+    shared_results : list of McStasData
+        Results returned by share_results
+    """
+    for shared in shared_results:
+        for attribute in PAYLOAD_ATTRIBUTES:
+            handle = shared.__dict__.get(attribute)
+            if isinstance(handle, SharedArray):
+                handle.release()
@@ -3,6 +3,9 @@ from datetime import datetime
 import time
 import json
 
+from mcstasscript.data.mcpl import iter_mcpl
+from mcstasscript.data.mcpl import load_mcpl
+
 TIME_FORMAT = "%d/%m/%Y %H:%M:%S" # Time format used for database
 
 class BeamDumpDatabase:
@@ -386,6 +389,33 @@ class BeamDump:
         """
         return os.path.isfile(os.path.join(origin_path,self.data["data_path"]))
 
+    def iter_particles(self, origin_path, chunk_size=1000000):
+        """
+        Yields the particles of the dump in chunks of structured arrays
+
+        origin_path : str
+            Path the data_path of the dump is relative to
+
+        chunk_size : int
+            Number of particles in each chunk
+        """
+        return iter_mcpl(os.path.join(origin_path, self.data["data_path"]),
+                         chunk_size=chunk_size)
+
+    def read_particles(self, origin_path, sidecar=False):
+        """
+        Returns all particles of the dump as a structured array
+
+        origin_path : str
+            Path the data_path of the dump is relative to
+
+        sidecar : bool
+            If True a .npy copy is written next to the MCPL file and
+            memory-mapped, which makes later reads fast
+        """
+        return load_mcpl(os.path.join(origin_path, self.data["data_path"]),
+                         sidecar=sidecar)
+
     def print_all(self):
         """
         Print all entries in data for dump
@@ -5,12 +5,34 @@ import mmap
 import warnings
 import h5py
 import re
+import fnmatch
+import functools
+import itertools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
 
 from mcstasscript.helper.formatting import bcolors
 from mcstasscript.data.data import McStasMetaData
 from mcstasscript.data.data import McStasDataBinned
 from mcstasscript.data.data import McStasDataEvent
+from mcstasscript.data.data import McStasDataList
 from mcstasscript.data.data import ComponentData
+from mcstasscript.data.totals import TotalsTable
+from mcstasscript.data.dtypes import resolve_dtypes
+from mcstasscript.data.dtypes import apply_dtypes
+from mcstasscript.data.sparse import resolve_sparse
+from mcstasscript.data.sparse import apply_sparse
+from mcstasscript.data.transfer import share_results
+from mcstasscript.data.transfer import restore_results
+from mcstasscript.data.transfer import release_results
+
+# Bytes found in text data files
+TEXT_BYTES = bytes(range(32, 127)) + b"\n\r\t\f\v"
+
+# Rows of event data read at a time when filling Fortran-ordered arrays
+EVENT_BLOCK_ROWS = 100000
 
 
 class ManagedMcrun:
@@ -90,6 +112,14 @@ class ManagedMcrun:
                 If True, adds the --openacc flag to mcrun call
             NeXus : bool, default False
                 If True, adds the --format=NeXus to mcrun call
+            load_workers : int, default 1
+                Number of workers used when loading monitor files
+            monitors : str, pattern or list of these, default None
+                Monitors to load, see load_results, None loads all
+            dtypes : str or dict, default None
+                Dtypes of loaded arrays, see load_results
+            sparse : bool or float, default None
+                Sparse storage of 2D monitors, see load_results
 
         """
 
@@ -114,7 +144,10 @@ class ManagedMcrun:
         self.simulation_performed = False
         self.simulation_wrote_data = False
         self.simulation_succeeded = False
-
+        self.load_workers = 1
+        self.monitors = None
+        self.dtypes = None
+        self.sparse = None
 
         # executable_path always in kwargs
         if "executable_path" in kwargs:
@@ -190,6 +223,23 @@ class ManagedMcrun:
         if "suppress_output" in kwargs:
             self.suppress_output = bool(kwargs["suppress_output"])
 
+        if "load_workers" in kwargs:
+            self.load_workers = kwargs["load_workers"]
+            if self.load_workers is not None:
+                self.load_workers = int(self.load_workers)
+                if self.load_workers < 1:
+                    raise ValueError("load_workers should be a positive "
+                                     + "integer, was "
+                                     + str(self.load_workers))
+
+        if "monitors" in kwargs:
+            self.monitors = kwargs["monitors"]
+
+        if "dtypes" in kwargs:
+            self.dtypes = kwargs["dtypes"]
+
+        if "sparse" in kwargs:
+            self.sparse = kwargs["sparse"]
 
         # get relevant paths and check their validity
         current_directory = os.getcwd()
@@ -317,7 +367,7 @@ class ManagedMcrun:
         if process.returncode == 0 and self.simulation_wrote_data:
             self.simulation_succeeded = True  # Signals simulation ran as expected
 
-    def load_results(self, *args):
+    def load_results(self, *args, **kwargs):
         """
         Method for loading data from a mcstas simulation
 
@@ -330,6 +380,12 @@ class ManagedMcrun:
         optional first argument : str
             path to folder from which data should be loaded
 
+        kwargs : keyword arguments
+            Passed to the load_results function, workers defaults to the
+            load_workers given at initialization, monitors, dtypes and
+            sparse default to those given at initialization, lazy_events
+            can be used to keep event data on disk
+
         """
 
         if len(args) == 0:
@@ -340,8 +396,61 @@ class ManagedMcrun:
             raise RuntimeError("load_results can be called "
                                + "with 0 or 1 arguments")
 
+        if "workers" not in kwargs:
+            kwargs["workers"] = self.load_workers
+
+        if "monitors" not in kwargs:
+            kwargs["monitors"] = self.monitors
+
+        if "dtypes" not in kwargs:
+            kwargs["dtypes"] = self.dtypes
+
+        if "sparse" not in kwargs:
+            kwargs["sparse"] = self.sparse
+
         if os.path.isdir(data_folder_name):
-            return load_results(data_folder_name)
+            return load_results(data_folder_name, **kwargs)
+        else:
+            warnings.warn("No data available to load.")
+            return None
+
+    def iter_results(self, *args, **kwargs):
+        """
+        Method returning iterator over the data of a mcstas simulation
+
+        Yields McStasData objects one at a time, or in batches, as they are
+        read, see the iter_results function.
+
+        Parameters
+        ----------
+
+        optional first argument : str
+            path to folder from which data should be loaded
+
+        kwargs : keyword arguments
+            Passed to the iter_results function, monitors, dtypes and
+            sparse default to those given at initialization
+        """
+
+        if len(args) == 0:
+            data_folder_name = self.data_folder_name
+        elif len(args) == 1:
+            data_folder_name = args[0]
+        else:
+            raise RuntimeError("iter_results can be called "
+                               + "with 0 or 1 arguments")
+
+        if "monitors" not in kwargs:
+            kwargs["monitors"] = self.monitors
+
+        if "dtypes" not in kwargs:
+            kwargs["dtypes"] = self.dtypes
+
+        if "sparse" not in kwargs:
+            kwargs["sparse"] = self.sparse
+
+        if os.path.isdir(data_folder_name):
+            return iter_results(data_folder_name, **kwargs)
         else:
             warnings.warn("No data available to load.")
             return None
@@ -362,12 +471,19 @@ class ManagedMcrun:
             except:
                 pass
 
-def load_results(data_folder_name):
+def load_results(data_folder_name, workers=1, use_processes=False,
+                 lazy_events=False, monitors=None, dtypes=None, sparse=None):
     """
     Function for loading data from a mcstas simulation
 
     Loads data on all monitors in a McStas data folder, and returns these
-    as a list of McStasData objects.
+    as a McStasDataList of McStasData objects, a list that can also be
+    searched by component name or filename.
+
+    Monitor files can be read concurrently, the returned list is always
+    in the order of the metadata. Threads work well for text files as the
+    bulk of the parsing happens in NumPy, while NeXus files need processes
+    as h5py only allows one thread in the library at a time.
 
     Parameters
     ----------
@@ -375,6 +491,29 @@ def load_results(data_folder_name):
     data_folder_name : str
         path to folder from which data should be loaded
 
+    workers : int or None, default 1
+        Number of workers reading monitors, None uses the cpu count
+
+    use_processes : bool, default False
+        If True a process pool is used instead of a thread pool
+
+    lazy_events : bool, default False
+        If True event data is kept on disk, see load_monitor
+
+    monitors : str, pattern or list of these, optional
+        Only monitors matching one of these are loaded, see
+        monitor_matcher, default is all monitors
+
+    dtypes : str or dict, optional
+        Dtypes of the loaded arrays, "float64", "compact" or dict with
+        dtype per field, default set with set_default_dtypes. Each monitor
+        is converted as soon as it is read, events kept on disk are left
+        as they are stored.
+
+    sparse : bool or float, optional
+        True stores 2D monitors with few non-empty bins sparse, a number
+        gives the largest fill fraction stored sparse, default set with
+        set_default_sparse, see McStasDataBinned.to_sparse
     """
 
     if not os.path.isdir(data_folder_name):
@@ -391,32 +530,372 @@ def load_results(data_folder_name):
     else:
         raise NameError("No mccode.sim or mccode.h5 in data folder.")
 
-    if NeXus:
-        # Open mccode to read metadata for all datasets written to disk
-        with h5py.File(os.path.join(data_folder_name, "mccode.h5"), "r", swmr=True) as f:
+    if workers is None:
+        workers = os.cpu_count() or 1
 
-            # Pass file object to all functions to avoid multiple open / close
-            metadata_list = load_metadata_nexus(f)
+    # Defaults are resolved here, as worker processes may not share them
+    dtypes = resolve_dtypes(dtypes)
+    sparse = resolve_sparse(sparse)
+    if sparse is None:
+        sparse = False
 
-            results = []
-            for metadata in metadata_list:
-                result = load_monitor_nexus(metadata, f)
-                result.set_data_location(data_folder_name)
-                results.append(result)
+    if NeXus and not (use_processes and workers > 1):
+        results = load_results_nexus(data_folder_name, monitors=monitors,
+                                     lazy_events=lazy_events, dtypes=dtypes,
+                                     sparse=sparse)
+        for result in results:
+            result.set_data_location(data_folder_name)
 
-    else:
-        # Older workflow, still handles both text and NeXus
-        metadata_list = load_metadata(data_folder_name)
+        return McStasDataList(results)
+
+    # Older workflow, still handles both text and NeXus
+    metadata_list = load_metadata(data_folder_name, monitors=monitors)
+    results = load_monitors(metadata_list, data_folder_name,
+                            workers=workers, use_processes=use_processes,
+                            lazy_events=lazy_events, dtypes=dtypes,
+                            sparse=sparse)
+
+    for result in results:
+        result.set_data_location(data_folder_name)
+
+    return McStasDataList(results)
+
+
+def iter_results(data_folder_name, batch_size=None, lazy_events=False,
+                 monitors=None, dtypes=None, sparse=None):
+    """
+    Returns iterator over the monitors of a mcstas simulation
+
+    Yields McStasData objects one at a time as they are read, or
+    McStasDataList objects with up to batch_size monitors, in the order of
+    the metadata. Only the monitors of the current batch are held by the
+    iterator, so results can be reduced and discarded while reading a
+    folder with many large monitors. mccode.h5 is opened once and closed
+    when the iterator is exhausted or closed, unless event datasets are
+    kept on disk with lazy_events, which keep it open while they are used.
+
+    The folder is checked and the metadata is read when called, so
+    missing or broken metadata raises here. The monitors are read during
+    iteration, errors reading them are raised by the iterator.
+
+    Parameters
+    ----------
+
+    data_folder_name : str
+        path to folder from which data should be loaded
+
+    batch_size : int, optional
+        Number of monitors in each yielded McStasDataList, default yields
+        single McStasData objects
+
+    lazy_events : bool, default False
+        If True event data is kept on disk, see load_monitor
+
+    monitors : str, pattern or list of these, optional
+        Only monitors matching one of these are loaded, see
+        monitor_matcher, default is all monitors
+
+    dtypes : str or dict, optional
+        Dtypes of the loaded arrays, see load_results
+
+    sparse : bool or float, optional
+        Sparse storage of 2D monitors, see load_results
+    """
+
+    if not os.path.isdir(data_folder_name):
+        raise NameError("Given data directory does not exist.")
+
+    files_in_folder = os.listdir(data_folder_name)
+    if "mccode.sim" not in files_in_folder and "mccode.h5" not in files_in_folder:
+        raise NameError("No mccode.sim or mccode.h5 in data folder.")
+
+    if batch_size is not None:
+        batch_size = int(batch_size)
+        if batch_size < 1:
+            raise ValueError("batch_size should be at least 1, got "
+                             + str(batch_size) + ".")
+
+    dtypes = resolve_dtypes(dtypes)
+    sparse = resolve_sparse(sparse)
+    if sparse is None:
+        sparse = False
+
+    metadata_list = load_metadata(data_folder_name, monitors=monitors)
+
+    results = _iter_monitors(metadata_list, data_folder_name,
+                             lazy_events=lazy_events, dtypes=dtypes,
+                             sparse=sparse)
+    if batch_size is None:
+        return results
+
+    return _iter_batches(results, batch_size)
+
+
+def _iter_monitors(metadata_list, data_folder_name, lazy_events=False,
+                   dtypes=None, sparse=None):
+    """
+    Yields the monitors given by metadata_list one by one, see iter_results
+    """
+    nexus_file = None
+    if any("NeXus_field" in metadata.info for metadata in metadata_list):
+        nexus_file = LazyNexusFile(data_folder_name)
+
+    try:
+        data_group = None
+        if nexus_file is not None:
+            data_group = nexus_data_group(nexus_file.file)
 
-        results = []
         for metadata in metadata_list:
-            result = load_monitor(metadata, data_folder_name)
+            if "NeXus_field" in metadata.info:
+                result = load_monitor_nexus(metadata, nexus_file.file,
+                                            lazy_events=lazy_events,
+                                            data_group=data_group)
+                # Lazy event datasets keep using the open file
+                nexus_file.keep_open(result)
+            else:
+                result = load_monitor_text(metadata, data_folder_name,
+                                           lazy_events=lazy_events)
+
+            result = prepare_result(result, dtypes, sparse)
             result.set_data_location(data_folder_name)
-            results.append(result)
+            yield result
+            # Drop reference before the next monitor is read
+            del result
+    finally:
+        if nexus_file is not None:
+            nexus_file.release()
+
+
+def _iter_batches(results, batch_size):
+    """
+    Yields McStasDataList objects with up to batch_size results
+    """
+    batch = []
+    for result in results:
+        batch.append(result)
+        if len(batch) == batch_size:
+            yield McStasDataList(batch)
+            batch = []
+
+    if len(batch) > 0:
+        yield McStasDataList(batch)
+
+
+def load_monitors(metadata_list, data_folder_name, workers=1,
+                  use_processes=False, lazy_events=False, dtypes=None,
+                  sparse=None):
+    """
+    Loads the monitors described by a list of metadata objects
+
+    Returns a list of McStasData objects in the same order as the given
+    metadata, regardless of the order in which the workers finish.
+
+    Parameters
+    ----------
+
+    metadata_list : list of McStasMetaData objects
+        Metadata for each monitor to load
+
+    data_folder_name : str
+        path to folder from which data should be loaded
+
+    workers : int or None, default 1
+        Number of workers reading monitors, None uses the cpu count
+
+    use_processes : bool, default False
+        If True a process pool is used instead of a thread pool, the
+        arrays are returned from the processes in shared memory
+
+    lazy_events : bool, default False
+        If True event data is kept on disk, see load_monitor
+
+    dtypes : str or dict, optional
+        Dtypes of the loaded arrays, see load_results
+
+    sparse : bool or float, optional
+        Sparse storage of 2D monitors, see load_results
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    workers = min(int(workers), len(metadata_list))
+
+    NeXus = any("NeXus_field" in metadata.info for metadata in metadata_list)
+
+    if workers <= 1 or (NeXus and not use_processes):
+        # Threads do not help for NeXus, h5py holds a global lock
+        return load_monitor_batch(metadata_list, data_folder_name,
+                                  lazy_events=lazy_events, dtypes=dtypes,
+                                  sparse=sparse)
+
+    if use_processes:
+        if lazy_events:
+            raise ValueError("lazy_events can not be used with a process "
+                             + "pool as the disk backed events can not be "
+                             + "transferred between processes.")
+
+        # Each process loads a contiguous batch, opening mccode.h5 once
+        batch_size = -(-len(metadata_list) // workers)
+        batches = [metadata_list[start:start + batch_size]
+                   for start in range(0, len(metadata_list), batch_size)]
+        load_function = functools.partial(load_monitor_batch_shared,
+                                          data_folder_name=data_folder_name,
+                                          dtypes=resolve_dtypes(dtypes),
+                                          sparse=sparse)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(load_function, batch)
+                       for batch in batches]
+            wait(futures)
+
+        errors = [future.exception() for future in futures
+                  if future.exception() is not None]
+        if len(errors) > 0:
+            for future in futures:
+                if future.exception() is None:
+                    release_results(future.result())
+            raise errors[0]
+
+        # Results kept in submission order
+        return [result for future in futures
+                for result in restore_results(future.result())]
+
+    load_function = functools.partial(load_monitor, lazy_events=lazy_events,
+                                      dtypes=dtypes, sparse=sparse)
+    folder_names = [data_folder_name] * len(metadata_list)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # map returns results in submission order
+        return list(executor.map(load_function, metadata_list, folder_names))
+
+
+def load_monitor_batch(metadata_list, data_folder_name, lazy_events=False,
+                       dtypes=None, sparse=None):
+    """
+    Loads a list of monitors one by one, opening mccode.h5 at most once
+
+    Parameters
+    ----------
+
+    metadata_list : list of McStasMetaData objects
+        Metadata for each monitor to load
+
+    data_folder_name : str
+        path to folder from which data should be loaded
+
+    lazy_events : bool, default False
+        If True event data is kept on disk, see load_monitor
+
+    dtypes : str or dict, optional
+        Dtypes of the loaded arrays, see load_results
+
+    sparse : bool or float, optional
+        Sparse storage of 2D monitors, see load_results
+    """
+    if not any("NeXus_field" in metadata.info for metadata in metadata_list):
+        return [load_monitor(metadata, data_folder_name,
+                             lazy_events=lazy_events, dtypes=dtypes,
+                             sparse=sparse)
+                for metadata in metadata_list]
+
+    nexus_file = LazyNexusFile(data_folder_name)
+    try:
+        data_group = nexus_data_group(nexus_file.file)
+        results = []
+        for metadata in metadata_list:
+            if "NeXus_field" in metadata.info:
+                result = load_monitor_nexus(metadata, nexus_file.file,
+                                            lazy_events=lazy_events,
+                                            data_group=data_group)
+                # Lazy event datasets keep using the open file
+                nexus_file.keep_open(result)
+            else:
+                result = load_monitor_text(metadata, data_folder_name,
+                                           lazy_events=lazy_events)
+            results.append(prepare_result(result, dtypes, sparse))
+    finally:
+        nexus_file.release()
 
     return results
 
-def load_metadata(data_folder_name):
+
+def load_monitor_batch_shared(metadata_list, data_folder_name, dtypes=None,
+                              sparse=None):
+    """
+    Loads a list of monitors in a worker process for load_monitors
+
+    The large arrays are returned in shared memory, so only small handles
+    are sent back to the parent, which uses restore_results to get the
+    McStasData objects without copying the arrays.
+
+    Parameters
+    ----------
+
+    metadata_list : list of McStasMetaData objects
+        Metadata for each monitor to load
+
+    data_folder_name : str
+        path to folder from which data should be loaded
+
+    dtypes : str or dict, optional
+        Dtypes of the loaded arrays, see load_results
+
+    sparse : bool or float, optional
+        Sparse storage of 2D monitors, see load_results
+    """
+    results = load_monitor_batch(metadata_list, data_folder_name,
+                                 dtypes=dtypes, sparse=sparse)
+    return share_results(results)
+
+
+def load_results_nexus(data_folder_name, monitors=None, lazy_events=False,
+                       dtypes=None, sparse=None):
+    """
+    Loads monitors from mccode.h5 in a data folder
+
+    The file is opened once and the data group is visited once, each
+    dataset is read directly into a preallocated array.
+
+    Parameters
+    ----------
+
+    data_folder_name : str
+        path to folder containing mccode.h5
+
+    monitors : str, pattern or list of these, optional
+        Monitors to load, see monitor_matcher, default is all monitors
+
+    lazy_events : bool, default False
+        If True event data is returned as views of the h5py datasets and
+        the file is left open while any of them is used
+
+    dtypes : str or dict, optional
+        Dtypes of the loaded arrays, see load_results
+
+    sparse : bool or float, optional
+        Sparse storage of 2D monitors, see load_results
+    """
+    dtypes = resolve_dtypes(dtypes)
+
+    nexus_file = LazyNexusFile(data_folder_name)
+    try:
+        f = nexus_file.file
+        metadata_list = load_metadata_nexus(f, monitors=monitors)
+        data_group = f["entry1"]["data"]
+
+        results = []
+        for metadata in metadata_list:
+            result = load_monitor_nexus(metadata, f, lazy_events=lazy_events,
+                                        data_group=data_group)
+            # Lazy event datasets keep using the open file
+            nexus_file.keep_open(result)
+            results.append(prepare_result(result, dtypes, sparse))
+    finally:
+        nexus_file.release()
+
+    return results
+
+
+def load_metadata(data_folder_name, monitors=None):
     """
     Function that loads metadata from a mcstas simulation
 
@@ -428,6 +907,10 @@ def load_metadata(data_folder_name):
 
     first argument : str
         path to folder from which metadata should be loaded
+
+    monitors : str, pattern or list of these, optional
+        Only metadata for matching monitors is returned, see
+        monitor_matcher, default is all monitors
     """
 
     if not os.path.isdir(data_folder_name):
@@ -438,10 +921,16 @@ def load_metadata(data_folder_name):
 
     # Raise an error if mccode.sim is not available
     if "mccode.sim" in files_in_folder:
-        return load_metadata_text(data_folder_name)
+        metadata_list = load_metadata_text(data_folder_name)
+        if monitors is None:
+            return metadata_list
+
+        matches = monitor_matcher(monitors)
+        return [metadata for metadata in metadata_list
+                if matches(metadata.component_name, metadata.filename)]
     elif "mccode.h5" in files_in_folder:
         with h5py.File(os.path.join(data_folder_name, "mccode.h5"), "r", swmr=True) as f:
-            return load_metadata_nexus(f)
+            return load_metadata_nexus(f, monitors=monitors)
     else:
         raise NameError("No mccode.sim or mccode.h5 in data folder.")
 
@@ -538,23 +1027,133 @@ def load_metadata_text(data_folder_name):
     return metadata_list
 
 
-def load_metadata_nexus(file_object):
-    instrument_parameters = {}
+def nexus_data_group(file_object):
+    """
+    Checks structure of McStas NeXus file and returns the data group
 
+    Parameters
+    ----------
+
+    file_object : h5py file object in read mode
+    """
     f = file_object
 
-    if "entry1" not in list(f.keys()):
+    if "entry1" not in f:
         raise ValueError("h5 file not formatted as expected.")
 
-    if "data" not in list(f["entry1"].keys()):
+    entry = f["entry1"]
+    if "data" not in entry:
         raise ValueError("h5 file not formatted as expected.")
 
-    if "simulation" not in list(f["entry1"].keys()):
+    if "simulation" not in entry:
         raise ValueError("h5 file not formatted as expected.")
 
-    if "Param" not in list(f["entry1"]["simulation"].keys()):
+    if "Param" not in entry["simulation"]:
         raise ValueError("h5 file not formatted as expected.")
 
+    return entry["data"]
+
+
+class LazyNexusFile:
+    """
+    Open mccode.h5 used by event data kept as h5py dataset views
+
+    Event datasets returned by keep_open hold a reference to this object,
+    and the file is closed when this object is garbage collected. When no
+    dataset view was returned, the file is thus closed as soon as the
+    loader is done with it, or directly by release.
+    """
+
+    def __init__(self, data_folder_name):
+        self.file = h5py.File(os.path.join(data_folder_name, "mccode.h5"),
+                              "r", swmr=True)
+        self._finalizer = weakref.finalize(self, self.file.close)
+        self._views = 0
+
+    def keep_open(self, result):
+        """
+        Keeps the file open while the event dataset of result is used
+
+        Returns the given result.
+
+        Parameters
+        ----------
+
+        result : McStasData
+            Data loaded from the file
+        """
+        if result.data_type == "Events" and isinstance(result.Events,
+                                                       h5py.Dataset):
+            result.Events._lazy_nexus_file = self
+            self._views += 1
+
+        return result
+
+    def release(self):
+        """
+        Closes the file unless keep_open returned a dataset view
+        """
+        if self._views == 0:
+            self._finalizer()
+
+
+def read_nexus_dataset(dataset, order="C"):
+    """
+    Reads h5py dataset into a new numpy array with read_direct
+
+    read_direct can only fill C-ordered arrays, so for Fortran order the
+    rows are read in blocks through a small buffer into the final array.
+
+    Parameters
+    ----------
+
+    dataset : h5py dataset
+
+    order : str, default "C"
+        Memory layout of the returned array, "F" for event data
+    """
+    if dataset.shape is None or dataset.shape == ():
+        return np.array(dataset[()])
+
+    array = np.empty(dataset.shape, dtype=dataset.dtype, order=order)
+    if array.size == 0:
+        return array
+
+    if array.flags.c_contiguous:
+        dataset.read_direct(array)
+        return array
+
+    n_rows = len(array)
+    buffer = np.empty((min(EVENT_BLOCK_ROWS, n_rows),) + array.shape[1:],
+                      dtype=array.dtype)
+    for start in range(0, n_rows, len(buffer)):
+        stop = min(start + len(buffer), n_rows)
+        dataset.read_direct(buffer, source_sel=np.s_[start:stop],
+                            dest_sel=np.s_[0:stop - start])
+        array[start:stop] = buffer[0:stop - start]
+
+    return array
+
+
+def load_metadata_nexus(file_object, monitors=None):
+    """
+    Loads metadata for the monitors in an open McStas NeXus file
+
+    Parameters
+    ----------
+
+    file_object : h5py file object in read mode
+
+    monitors : str, pattern or list of these, optional
+        Only monitors with a component name, filename or NeXus field
+        matching one of these are included, see monitor_matcher, default
+        is all monitors
+    """
+
+    f = file_object
+
+    data_group = nexus_data_group(f)
+
     # Common information
 
     # Instrument parameters
@@ -573,8 +1172,21 @@ def load_metadata_nexus(file_object):
 
     metadata_list = []
 
+    matches = None
+    if monitors is not None:
+        matches = monitor_matcher(monitors)
+
     # For each entry in data, make a metadata object
-    for key in f["entry1"]["data"].keys():
+    for key, group in data_group.items():
+
+        # Add all the read info from attribute section
+        info = dict(group.attrs)
+        info = decode_dict(info)
+
+        if matches is not None:
+            if not matches(key, str(info.get("component", "")).rstrip(),
+                           info.get("filename")):
+                continue
 
         # Make the metadata object and add instrument parameters
         metadata = McStasMetaData()
@@ -583,9 +1195,6 @@ def load_metadata_nexus(file_object):
         # Add NeXus field name
         metadata.add_info("NeXus_field", key)
 
-        # Add all the read info from attribute section
-        info = dict(f["entry1"]["data"][key].attrs)
-        info = decode_dict(info)
         for name, value in info.items():
             if isinstance(value, bytes):
                 value = value.decode('utf-8')
@@ -600,6 +1209,310 @@ def load_metadata_nexus(file_object):
     return metadata_list
 
 
+def monitor_matcher(monitors):
+    """
+    Returns function that checks if any given name matches monitors
+
+    Strings are matched as glob patterns, so a plain monitor name only
+    matches itself while "PSD_*" matches all names starting with PSD_.
+    Compiled regular expressions must match the entire name.
+
+    Parameters
+    ----------
+
+    monitors : str, compiled regular expression or list of these
+        Names or patterns for the monitors to select
+    """
+    if isinstance(monitors, (str, re.Pattern)):
+        monitors = [monitors]
+
+    names = set()
+    patterns = []
+    for monitor in monitors:
+        if isinstance(monitor, re.Pattern):
+            patterns.append(monitor)
+        elif isinstance(monitor, str):
+            if any(char in monitor for char in "*?["):
+                patterns.append(re.compile(fnmatch.translate(monitor)))
+            else:
+                names.add(monitor)
+        else:
+            raise TypeError("Monitors should be given as str or compiled "
+                            + "regular expression, got "
+                            + str(type(monitor)))
+
+    def matches(*candidates):
+        for name in candidates:
+            if name is None:
+                continue
+            if name in names:
+                return True
+            if any(pattern.fullmatch(name) for pattern in patterns):
+                return True
+
+        return False
+
+    return matches
+
+
+def load_totals(data_folder_names, monitors=None, workers=1):
+    """
+    Loads total intensity, error and ray count of monitors in many runs
+
+    Only mccode.sim or the attributes in mccode.h5 are read, data files
+    are never opened. Folders are read concurrently with a thread pool
+    when workers is above 1.
+
+    Parameters
+    ----------
+
+    data_folder_names : str or list of str
+        Path of each data folder to read
+
+    monitors : str, pattern or list of these, optional
+        Only monitors matching one of these are included, see
+        monitor_matcher, default is all monitors
+
+    workers : int or None, default 1
+        Number of threads reading folders, None uses the cpu count
+    """
+    if isinstance(data_folder_names, (str, os.PathLike)):
+        data_folder_names = [data_folder_names]
+    data_folder_names = list(data_folder_names)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(int(workers), len(data_folder_names)))
+
+    load_function = functools.partial(load_totals_folder, monitors=monitors)
+    if workers == 1:
+        runs = [load_function(folder) for folder in data_folder_names]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map returns results in submission order
+            runs = list(executor.map(load_function, data_folder_names))
+
+    monitor_columns = {}
+    for _, names, _ in runs:
+        for name in names:
+            monitor_columns.setdefault(name, len(monitor_columns))
+
+    values = np.full((len(runs), len(monitor_columns), 3), np.nan)
+    for row, (_, names, totals) in enumerate(runs):
+        columns = [monitor_columns[name] for name in names]
+        values[row, columns, :] = totals
+
+    parameter_names = {}
+    for parameters, _, _ in runs:
+        for name in parameters:
+            parameter_names.setdefault(name, None)
+
+    parameters = {}
+    for name in parameter_names:
+        column = [run[0].get(name) for run in runs]
+        if all(isinstance(value, float) for value in column if value is not None):
+            column = [np.nan if value is None else value for value in column]
+            parameters[name] = np.array(column, dtype=float)
+        else:
+            parameters[name] = np.array(column, dtype=object)
+
+    return TotalsTable(data_folder_names, list(monitor_columns), values,
+                       parameters)
+
+
+def load_totals_folder(data_folder_name, monitors=None):
+    """
+    Reads parameters and monitor totals of a single data folder
+
+    Returns dict of parameters, list of monitor names and numpy array
+    with shape (monitors, 3) of I, E and N. Monitors are selected by
+    component name or filename, as in load_metadata. Components with
+    several outputs, such as a Monitor_nD, are named by their filename,
+    see totals_columns.
+
+    Parameters
+    ----------
+
+    data_folder_name : str
+        path to folder with mccode.sim or mccode.h5
+
+    monitors : str, pattern or list of these, optional
+        Only monitors with a component name or filename matching one of
+        these are included
+    """
+    sim_file = os.path.join(data_folder_name, "mccode.sim")
+    nexus_file = os.path.join(data_folder_name, "mccode.h5")
+    if os.path.isfile(sim_file):
+        parameters, names, filenames, totals = load_totals_text(sim_file)
+    elif os.path.isfile(nexus_file):
+        parameters, names, filenames, totals = load_totals_nexus(nexus_file)
+    elif not os.path.isdir(data_folder_name):
+        raise NameError("Given data directory does not exist: "
+                        + str(data_folder_name))
+    else:
+        raise NameError("No mccode.sim or mccode.h5 in data folder: "
+                        + str(data_folder_name))
+
+    if monitors is not None:
+        matches = monitor_matcher(monitors)
+        keep = [index for index, (name, filename)
+                in enumerate(zip(names, filenames))
+                if matches(name, filename)]
+        names = [names[index] for index in keep]
+        filenames = [filenames[index] for index in keep]
+        totals = [totals[index] for index in keep]
+
+    return (parameters, totals_columns(names, filenames),
+            np.array(totals, dtype=float).reshape(-1, 3))
+
+
+def totals_columns(names, filenames):
+    """
+    Returns unique column name for each monitor in a totals table
+
+    The component name is used when it is unique. Components with several
+    outputs use the filename instead, and a number is appended to names
+    that are still repeated.
+
+    Parameters
+    ----------
+
+    names : list of str
+        Component name of each monitor
+
+    filenames : list of str or None
+        Filename of each monitor, None if not known
+    """
+    counts = {}
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+    repeated = {name for name, count in counts.items() if count > 1}
+
+    columns = []
+    used = set()
+    for name, filename in zip(names, filenames):
+        column = name
+        if name in repeated and filename is not None:
+            column = filename
+
+        candidate = column
+        number = 1
+        while candidate in used:
+            number += 1
+            candidate = column + "_" + str(number)
+
+        used.add(candidate)
+        columns.append(candidate)
+
+    return columns
+
+
+# Patterns for the lines in mccode.sim read by load_totals_text
+SIM_PARAM_PATTERN = re.compile(r"^\s*Param:\s*([^=\n]*?)\s*=(.*)$", re.M)
+SIM_COMPONENT_PATTERN = re.compile(r"^\s*component:\s*(.*?)\s*$", re.M)
+SIM_VALUES_PATTERN = re.compile(r"^\s*values:\s*(.*?)\s*$", re.M)
+SIM_FILENAME_PATTERN = re.compile(r"^\s*filename:\s*(.*?)\s*$", re.M)
+
+
+def load_totals_text(sim_file):
+    """
+    Reads parameters and monitor totals from a mccode.sim file
+
+    Only the Param, component, filename and values lines are parsed.
+    Returns dict of parameters and lists of monitor names, filenames
+    (None if not given) and totals.
+
+    Parameters
+    ----------
+
+    sim_file : str
+        path of mccode.sim file
+    """
+    with open(sim_file, "r") as f:
+        text = f.read()
+
+    sections = text.split("begin data")
+
+    parameters = {}
+    for name, value in SIM_PARAM_PATTERN.findall(sections[0]):
+        value = value.strip()
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+        parameters[name] = value
+
+    names = []
+    filenames = []
+    totals = []
+    for section in sections[1:]:
+        component = SIM_COMPONENT_PATTERN.search(section)
+        values = SIM_VALUES_PATTERN.search(section)
+        if component is None or values is None:
+            continue
+
+        filename = SIM_FILENAME_PATTERN.search(section)
+        names.append(component.group(1))
+        filenames.append(None if filename is None else filename.group(1))
+        totals.append([float(value) for value in values.group(1).split()[:3]])
+
+    return parameters, names, filenames, totals
+
+
+def load_totals_nexus(nexus_file):
+    """
+    Reads parameters and monitor totals from attributes in mccode.h5
+
+    Returns dict of parameters and lists of monitor names, filenames
+    (None if not given) and totals.
+
+    Parameters
+    ----------
+
+    nexus_file : str
+        path of mccode.h5 file
+    """
+    with h5py.File(nexus_file, "r", swmr=True) as f:
+        data_group = nexus_data_group(f)
+
+        parameters = {}
+        loaded_par_dict = f["entry1"]["simulation"]["Param"].attrs
+        for par_name in loaded_par_dict:
+            if par_name == "NX_class":
+                continue
+
+            try:
+                value = float(loaded_par_dict[par_name])
+            except:
+                value = str(loaded_par_dict[par_name])
+
+            parameters[par_name] = value
+
+        names = []
+        filenames = []
+        totals = []
+        for key, group in data_group.items():
+            values = group.attrs.get("values")
+            if values is None:
+                continue
+            if isinstance(values, bytes):
+                values = values.decode("utf-8")
+
+            component = group.attrs.get("component", key)
+            if isinstance(component, bytes):
+                component = component.decode("utf-8")
+
+            filename = group.attrs.get("filename")
+            if isinstance(filename, bytes):
+                filename = filename.decode("utf-8")
+
+            names.append(str(component).strip())
+            filenames.append(None if filename is None else str(filename).strip())
+            totals.append([float(value) for value in str(values).split()[:3]])
+
+    return parameters, names, filenames, totals
+
+
 def decode_dict(dictionary):
     for key, value in dictionary.items():
         if isinstance(value, bytes):
@@ -612,19 +1525,45 @@ def decode_dict(dictionary):
     return dictionary
 
 
-def load_monitor(metadata, data_folder_name):
+def load_monitor(metadata, data_folder_name, lazy_events=False,
+                 dtypes=None, sparse=None):
     """
     Switches to appropriate loader function
+
+    With lazy_events, event data from NeXus files is kept as a view of
+    the h5py dataset, while event data from text files is converted once
+    to a binary .npy file next to the text file which is memory-mapped.
+    The NeXus file is closed when the dataset view is no longer used.
+    The arrays are converted to dtypes and stored sparse according to
+    sparse, see load_results.
     """
 
     if "NeXus_field" in metadata.info:
-        with h5py.File(os.path.join(data_folder_name, "mccode.h5"), "r", swmr=True) as f:
-            return load_monitor_nexus(metadata, f)
+        if lazy_events:
+            # File remains open for the lifetime of an event dataset view
+            nexus_file = LazyNexusFile(data_folder_name)
+            result = nexus_file.keep_open(
+                load_monitor_nexus(metadata, nexus_file.file,
+                                   lazy_events=True))
+        else:
+            with h5py.File(os.path.join(data_folder_name, "mccode.h5"), "r", swmr=True) as f:
+                result = load_monitor_nexus(metadata, f)
     else:
-        return load_monitor_text(metadata, data_folder_name)
+        result = load_monitor_text(metadata, data_folder_name,
+                                   lazy_events=lazy_events)
+
+    return prepare_result(result, dtypes, sparse)
 
 
-def load_monitor_nexus(metadata, file_object):
+def prepare_result(result, dtypes=None, sparse=None):
+    """
+    Converts loaded data to dtypes and stores it sparse if requested
+    """
+    return apply_sparse(apply_dtypes(result, dtypes), sparse)
+
+
+def load_monitor_nexus(metadata, file_object, lazy_events=False,
+                       data_group=None):
     """
     Function that loads data given metadata and name of data folder
     This version is for a nexus file
@@ -638,25 +1577,22 @@ def load_monitor_nexus(metadata, file_object):
         McStasMetaData object corresponding to the monitor to be loaded
 
     file_object : h5py file object in read mode
-    """
 
-    f = file_object
+    lazy_events : bool, default False
+        If True event data is returned as a view of the h5py dataset, the
+        file object must then stay open while the data is used
 
-    if "entry1" not in list(f.keys()):
-        raise ValueError("h5 file not formatted as expected.")
-
-    if "data" not in list(f["entry1"].keys()):
-        raise ValueError("h5 file not formatted as expected.")
-
-    if "simulation" not in list(f["entry1"].keys()):
-        raise ValueError("h5 file not formatted as expected.")
+    data_group : h5py group, optional
+        Data group of the file, the file structure is checked when omitted
+    """
 
-    if "Param" not in list(f["entry1"]["simulation"].keys()):
-        raise ValueError("h5 file not formatted as expected.")
+    if data_group is None:
+        data_group = nexus_data_group(file_object)
 
     NeXus_field = metadata.info["NeXus_field"]
 
-    available_fields = f["entry1"]["data"][NeXus_field].keys()
+    group = data_group[NeXus_field]
+    available_fields = set(group.keys())
     if not metadata.dimension == 0 and "events" not in available_fields:
         if "data" not in available_fields:
             raise ValueError("NeXus reading: data not found! \n"
@@ -672,18 +1608,21 @@ def load_monitor_nexus(metadata, file_object):
 
     # Need to check if it is binned data or event data
     if "events" in available_fields:
-        Events = np.array(f["entry1"]["data"][NeXus_field]["events"])
+        if lazy_events:
+            Events = group["events"]
+        else:
+            Events = read_nexus_dataset(group["events"], order="F")
         return McStasDataEvent(metadata, Events)
 
     # Split data into intensity, error and ncount
     if type(metadata.dimension) == int and metadata.dimension == 0:
 
-        if "data" in f["entry1"]["data"][NeXus_field].keys():
+        if "data" in available_fields:
             raise ValueError("Found array data in 0D dataset?")
 
         values = None
-        if "values" in f["entry1"]["data"][NeXus_field].keys():
-            values = np.array(f["entry1"]["data"][NeXus_field]["values"])
+        if "values" in available_fields:
+            values = read_nexus_dataset(group["values"])
 
         if metadata.total_I is None:
             if values is not None:
@@ -720,28 +1659,28 @@ def load_monitor_nexus(metadata, file_object):
         # All special characters are substituted with _ in McStas NeXus file
         x_field = re.sub(r'[^a-zA-Z]', "_", original_xlabel)
 
-        if x_field not in f["entry1"]["data"][NeXus_field].keys():
+        if x_field not in available_fields:
             error_text = ("Didn't find xaxis in NeXus file. \n"
                           + "Expected this field for x axis: "
                           + str(x_field) + "\n"
                           + "Existing fields: "
-                          + str(f["entry1"]["data"][NeXus_field].keys()))
+                          + str(sorted(available_fields)))
 
             raise ValueError(error_text)
 
-        xaxis = np.array(f["entry1"]["data"][NeXus_field][x_field])
-        Intensity = np.array(f["entry1"]["data"][NeXus_field]["data"])
-        Error = np.array(f["entry1"]["data"][NeXus_field]["errors"])
-        Ncount = np.array(f["entry1"]["data"][NeXus_field]["ncount"])
+        xaxis = read_nexus_dataset(group[x_field])
+        Intensity = read_nexus_dataset(group["data"])
+        Error = read_nexus_dataset(group["errors"])
+        Ncount = read_nexus_dataset(group["ncount"])
 
         # The data is saved as a McStasDataBinned object
         return McStasDataBinned(metadata, Intensity, Error, Ncount, xaxis=xaxis)
 
     elif len(metadata.dimension) == 2:
         xaxis = []  # Assume evenly binned in 2d
-        Intensity = np.array(f["entry1"]["data"][NeXus_field]["data"]).T
-        Error = np.array(f["entry1"]["data"][NeXus_field]["errors"]).T
-        Ncount = np.array(f["entry1"]["data"][NeXus_field]["ncount"]).T
+        Intensity = read_nexus_dataset(group["data"]).T
+        Error = read_nexus_dataset(group["errors"]).T
+        Ncount = read_nexus_dataset(group["ncount"]).T
 
         # The data is saved as a McStasDataBinned object
         return McStasDataBinned(metadata, Intensity, Error, Ncount, xaxis=xaxis)
@@ -752,7 +1691,7 @@ def load_monitor_nexus(metadata, file_object):
             + metadata.component_name)
 
 
-def load_monitor_text(metadata, data_folder_name):
+def load_monitor_text(metadata, data_folder_name, lazy_events=False):
     """
     Function that loads data given metadata and name of data folder
     This version is for a text file
@@ -767,9 +1706,34 @@ def load_monitor_text(metadata, data_folder_name):
 
     data_folder_name : str
         path to folder from which metadata should be loaded
+
+    lazy_events : bool, default False
+        If True event data is memory-mapped, text event lists through a
+        binary .npy copy
     """
-    # Load data with numpy
     filename = os.path.join(data_folder_name, metadata.filename.rstrip())
+
+    if isinstance(metadata.dimension, list) and "variables" in metadata.info:
+        # Event lists written by Monitor_nD with the binary option
+        Events = load_binary_events(filename, metadata,
+                                    lazy_events=lazy_events)
+        if Events is not None:
+            return McStasDataEvent(metadata, Events)
+
+    if lazy_events and isinstance(metadata.dimension, list):
+        # Only event files get a binary copy
+        Events = load_event_cache(filename)
+        if Events is not None:
+            return McStasDataEvent(metadata, Events)
+
+    if isinstance(metadata.dimension, list) and is_event_text(filename):
+        Events = load_text_events(filename, metadata)
+        if lazy_events:
+            Events = write_event_cache(filename, Events)
+
+        return McStasDataEvent(metadata, Events)
+
+    # Load data with numpy
     data = np.loadtxt(filename)
 
     # Split data into intensity, error and ncount
@@ -797,30 +1761,15 @@ def load_monitor_text(metadata, data_folder_name):
         return McStasDataBinned(metadata, Intensity, Error, Ncount, xaxis=xaxis)
 
     elif len(metadata.dimension) == 2:
-        # Need to check if it is binned data or event data
-
-        with open(filename, 'rb', 0) as file, \
-                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as s:
-            if s.find(b'# Errors') != -1:
-                data_type = "Binned"
-            else:
-                data_type = "Events"
-
-        if data_type == "Events":
-            Events = data
-
-            return McStasDataEvent(metadata, Events)
-
-        elif data_type == "Binned":
-            # Binned 2D data
-            xaxis = []  # Assume evenly binned in 2d
-            data_lines = metadata.dimension[1]
-            Intensity = data[0:data_lines, :]
-            Error = data[data_lines:2 * data_lines, :]
-            Ncount = data[2 * data_lines:3 * data_lines, :]
+        # Binned 2D data, event data is loaded above
+        xaxis = []  # Assume evenly binned in 2d
+        data_lines = metadata.dimension[1]
+        Intensity = data[0:data_lines, :]
+        Error = data[data_lines:2 * data_lines, :]
+        Ncount = data[2 * data_lines:3 * data_lines, :]
 
-            # The data is saved as a McStasDataBinned object
-            return McStasDataBinned(metadata, Intensity, Error, Ncount, xaxis=xaxis)
+        # The data is saved as a McStasDataBinned object
+        return McStasDataBinned(metadata, Intensity, Error, Ncount, xaxis=xaxis)
     else:
         raise NameError(
             "Dimension not read correctly in data set "
@@ -828,6 +1777,225 @@ def load_monitor_text(metadata, data_folder_name):
             + metadata.component_name)
 
 
+def is_event_text(filename):
+    """
+    Returns True if a 2D text data file holds events rather than bins
+
+    Binned 2D files have an Errors block, event files do not.
+
+    Parameters
+    ----------
+
+    filename : str
+        path to McStas data file
+    """
+    with open(filename, 'rb', 0) as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as s:
+        return s.find(b'# Errors') == -1
+
+
+def load_text_events(filename, metadata):
+    """
+    Reads text event file into a Fortran-ordered array
+
+    The rows are parsed in blocks directly into an array with each column
+    contiguous, so the events are not held in memory twice. The number of
+    events in the metadata sets the size of the array, it is adjusted if
+    the file holds a different number of rows.
+
+    Parameters
+    ----------
+
+    filename : str
+        path to event file
+
+    metadata : McStasMetaData object
+        metadata of the event file, gives the number of events
+    """
+    n_rows = metadata.dimension[1]
+    events = None
+    n_read = 0
+    with open(filename) as f:
+        lines = (line for line in f
+                 if line.strip() and not line.lstrip().startswith("#"))
+        while True:
+            block = list(itertools.islice(lines, EVENT_BLOCK_ROWS))
+            if len(block) == 0:
+                break
+
+            values = np.loadtxt(block, ndmin=2)
+            if events is None:
+                events = np.empty((max(n_rows, len(values)),
+                                   values.shape[1]), order="F")
+            elif n_read + len(values) > len(events):
+                grown = np.empty((2 * (n_read + len(values)),
+                                  events.shape[1]), order="F")
+                grown[0:n_read] = events[0:n_read]
+                events = grown
+
+            events[n_read:n_read + len(values)] = values
+            n_read += len(values)
+
+    if events is None:
+        n_columns = len(metadata.info.get("variables", "").split())
+        return np.empty((0, n_columns), order="F")
+
+    if n_read < len(events):
+        events = np.asfortranarray(events[0:n_read])
+
+    return events
+
+
+def read_text_header(filename):
+    """
+    Returns header text and byte offset of the data in a McStas data file
+
+    The header is the block of lines starting with # at the top of the
+    file, the data follows directly after it.
+
+    Parameters
+    ----------
+
+    filename : str
+        path to McStas data file
+    """
+    header_lines = []
+    with open(filename, "rb") as f:
+        offset = 0
+        for line in f:
+            if not line.startswith(b"#"):
+                break
+            header_lines.append(line)
+            offset += len(line)
+
+    header = b"".join(header_lines).decode("utf-8", errors="replace")
+    return header, offset
+
+
+def is_binary_data(filename, offset, sample_size=1024):
+    """
+    Returns True if the data after offset is not text
+    """
+    with open(filename, "rb") as f:
+        f.seek(offset)
+        sample = f.read(sample_size)
+
+    return len(sample.translate(None, TEXT_BYTES)) > 0
+
+
+def load_binary_events(filename, metadata, lazy_events=False):
+    """
+    Loads event list stored as binary data after the text header
+
+    Monitor_nD writes list mode data in binary with the binary option,
+    one row per event with a column per variable. Values are float32 as
+    written by Monitor_nD, or float64 when the header or the size of the
+    data shows they are double. Returns None if the data is text.
+
+    Parameters
+    ----------
+
+    filename : str
+        path to event file
+
+    metadata : McStasMetaData object
+        metadata of the event file, gives variables and number of events
+
+    lazy_events : bool, default False
+        If True the events are memory-mapped instead of read
+    """
+    header, offset = read_text_header(filename)
+    n_bytes = os.path.getsize(filename) - offset
+    if n_bytes == 0 or not is_binary_data(filename, offset):
+        return None
+
+    n_columns = len(metadata.info["variables"].split())
+    n_rows = metadata.dimension[1]
+
+    if n_rows * n_columns * 8 == n_bytes:
+        dtype = np.dtype("<f8")
+    elif n_rows * n_columns * 4 == n_bytes:
+        dtype = np.dtype("<f4")
+    else:
+        # Size does not match the header, use the stored format
+        dtype = np.dtype("<f8" if "double" in header.lower() else "<f4")
+        n_rows = n_bytes // (n_columns * dtype.itemsize)
+
+    shape = (n_rows, n_columns)
+    if lazy_events:
+        return np.memmap(filename, dtype=dtype, mode="r", offset=offset,
+                         shape=shape)
+
+    events = np.empty(shape, dtype=dtype, order="F")
+    if n_rows == 0:
+        return events
+
+    # Copied from a memory map so the events are only held once in memory
+    stored = np.memmap(filename, dtype=dtype, mode="r", offset=offset,
+                       shape=shape)
+    for start in range(0, n_rows, EVENT_BLOCK_ROWS):
+        stop = min(start + EVENT_BLOCK_ROWS, n_rows)
+        events[start:stop] = stored[start:stop]
+    del stored
+
+    return events
+
+
+def event_cache_name(filename):
+    """
+    Returns name of the binary .npy copy of a text event file
+    """
+    return filename + ".npy"
+
+
+def load_event_cache(filename):
+    """
+    Memory-maps the binary copy of a text event file if it is up to date
+
+    Returns None if there is no usable binary copy.
+
+    Parameters
+    ----------
+
+    filename : str
+        path to the text event file
+    """
+    cache_name = event_cache_name(filename)
+    if not os.path.isfile(cache_name):
+        return None
+
+    if os.path.getmtime(cache_name) < os.path.getmtime(filename):
+        return None
+
+    return np.load(cache_name, mmap_mode="r")
+
+
+def write_event_cache(filename, events):
+    """
+    Writes binary copy of event data and returns it memory-mapped
+
+    If the copy can not be written, the given events are returned.
+
+    Parameters
+    ----------
+
+    filename : str
+        path to the text event file
+
+    events : numpy array
+        event data read from the text file
+    """
+    cache_name = event_cache_name(filename)
+    try:
+        np.save(cache_name, np.asfortranarray(events))
+    except OSError:
+        warnings.warn("Could not write binary event file " + cache_name
+                      + ", event data kept in memory.")
+        return events
+
+    return np.load(cache_name, mmap_mode="r")
+
+
 def print_sim_output(sim_output):
     print(highlight(sim_output, "error", return_section=True, after_lines=10, highlight_type="FAIL"))
     print(highlight(sim_output, "error", return_section=False, highlight_type="FAIL"))
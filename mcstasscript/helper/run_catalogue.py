@@ -0,0 +1,478 @@
+import os
+import re
+import sqlite3
+import time
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import h5py
+
+from mcstasscript.helper.managed_mcrun import load_totals_folder
+
+# Time format of the Date line in mccode.sim
+SIM_TIME_FORMAT = "%a %b %d %H:%M:%S %Y"
+
+SIM_HEADER_PATTERNS = {
+    "date": re.compile(r"^Date:\s*(.*?)\s*$", re.M),
+    "instrument": re.compile(r"^begin instrument:\s*(.*?)\s*$", re.M),
+    "ncount": re.compile(r"^\s*Ncount:\s*(.*?)\s*$", re.M),
+    "seed": re.compile(r"^\s*Seed:\s*(.*?)\s*$", re.M),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    instrument TEXT,
+    ncount REAL,
+    seed TEXT,
+    date TEXT,
+    timestamp REAL,
+    format TEXT,
+    modified REAL
+);
+CREATE TABLE IF NOT EXISTS parameters (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS monitors (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    I REAL,
+    E REAL,
+    N REAL
+);
+CREATE INDEX IF NOT EXISTS runs_instrument ON runs(instrument);
+CREATE INDEX IF NOT EXISTS parameters_name_value ON parameters(name, value);
+CREATE INDEX IF NOT EXISTS parameters_run ON parameters(run_id);
+CREATE INDEX IF NOT EXISTS monitors_name ON monitors(name);
+CREATE INDEX IF NOT EXISTS monitors_run ON monitors(run_id);
+"""
+
+
+class RunCatalogue:
+    """
+    SQLite catalogue of McStas / McXtrace output folders
+
+    Each run is stored with its instrument name, parameters, ncount, seed,
+    time, monitor totals and path, read from mccode.sim or mccode.h5 with
+    the metadata loaders. Folders are only read again when their metadata
+    file changed, so indexing a tree again is cheap.
+
+    Attributes
+    ----------
+    path : str
+        Path of the SQLite file
+
+    Methods
+    -------
+    add_run(data_folder_name)
+        Adds or updates a single output folder
+
+    scan(root, workers=8)
+        Adds all output folders below root, reading them in parallel
+
+    rebuild(root, workers=8)
+        Clears the catalogue and scans root
+
+    prune()
+        Removes runs whose folder no longer exists
+
+    find(instrument=None, monitor=None, after=None, before=None, **parameters)
+        Returns runs matching the given conditions
+    """
+
+    def __init__(self, path):
+        """
+        Opens catalogue, the file is created if it does not exist
+
+        Parameters
+        ----------
+        path : str
+            Path of the SQLite file
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def _modified(self, data_folder_name):
+        """
+        Returns stored modification time of folder, None if not indexed
+        """
+        row = self.connection.execute("SELECT modified FROM runs WHERE path = ?",
+                                      (data_folder_name,)).fetchone()
+        return None if row is None else row[0]
+
+    def add_run(self, data_folder_name):
+        """
+        Adds output folder to the catalogue, updating an existing entry
+
+        Returns True if the folder was read, False if it was unchanged.
+
+        Parameters
+        ----------
+        data_folder_name : str
+            Path of output folder with mccode.sim or mccode.h5
+        """
+        data_folder_name = os.path.abspath(data_folder_name)
+        modified = metadata_modified(data_folder_name)
+        if modified is None:
+            raise NameError("No mccode.sim or mccode.h5 in data folder: "
+                            + str(data_folder_name))
+
+        if self._modified(data_folder_name) == modified:
+            return False
+
+        with self.connection:
+            self._insert(read_run_info(data_folder_name))
+
+        return True
+
+    def scan(self, root, workers=8):
+        """
+        Adds all output folders below root to the catalogue
+
+        Folders are found by walking the tree and unchanged folders are
+        skipped. New or changed folders are read in parallel and written to
+        the catalogue in a single transaction. Returns the number of folders
+        read.
+
+        Parameters
+        ----------
+        root : str
+            Folder to search for output folders
+
+        workers : int, default 8
+            Number of threads reading folders
+        """
+        folders = []
+        for folder, _, files in os.walk(os.path.abspath(root)):
+            if "mccode.sim" not in files and "mccode.h5" not in files:
+                continue
+
+            if self._modified(folder) != metadata_modified(folder):
+                folders.append(folder)
+
+        workers = max(1, min(int(workers), len(folders)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            run_infos = list(executor.map(try_read_run_info, folders))
+
+        with self.connection:
+            for run_info in run_infos:
+                if run_info is not None:
+                    self._insert(run_info)
+
+        return sum(run_info is not None for run_info in run_infos)
+
+    def rebuild(self, root, workers=8):
+        """
+        Removes all runs from the catalogue and scans root again
+
+        Parameters
+        ----------
+        root : str
+            Folder to search for output folders
+
+        workers : int, default 8
+            Number of threads reading folders
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM runs")
+
+        return self.scan(root, workers=workers)
+
+    def prune(self):
+        """
+        Removes runs whose output folder no longer exists
+        """
+        rows = self.connection.execute("SELECT id, path FROM runs").fetchall()
+        missing = [(run_id,) for run_id, path in rows
+                   if metadata_modified(path) is None]
+        with self.connection:
+            self.connection.executemany("DELETE FROM runs WHERE id = ?",
+                                        missing)
+
+        return len(missing)
+
+    def _insert(self, run_info):
+        """
+        Writes run to the database, replacing earlier entry of the path
+        """
+        self.connection.execute("DELETE FROM runs WHERE path = ?",
+                                (run_info["path"],))
+        cursor = self.connection.execute(
+            "INSERT INTO runs (path, instrument, ncount, seed, date, "
+            + "timestamp, format, modified) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_info["path"], run_info["instrument"], run_info["ncount"],
+             run_info["seed"], run_info["date"], run_info["timestamp"],
+             run_info["format"], run_info["modified"]))
+        run_id = cursor.lastrowid
+
+        parameter_rows = []
+        for name, value in run_info["parameters"].items():
+            if isinstance(value, float):
+                parameter_rows.append((run_id, name, value, None))
+            else:
+                parameter_rows.append((run_id, name, None, str(value)))
+        self.connection.executemany(
+            "INSERT INTO parameters (run_id, name, value, text) "
+            + "VALUES (?, ?, ?, ?)", parameter_rows)
+
+        self.connection.executemany(
+            "INSERT INTO monitors (run_id, name, I, E, N) "
+            + "VALUES (?, ?, ?, ?, ?)",
+            [(run_id, name, *totals)
+             for name, totals in run_info["monitors"].items()])
+
+    def find(self, instrument=None, monitor=None, after=None, before=None,
+             **parameters):
+        """
+        Returns runs matching all given conditions, oldest first
+
+        Each run is a dict with path, instrument, ncount, seed, date,
+        timestamp, format, parameters and monitors, where monitors holds
+        (I, E, N) for each monitor name.
+
+        Parameters
+        ----------
+        instrument : str, optional
+            Name of the instrument
+
+        monitor : str, optional
+            Name of a monitor the run must have
+
+        after : datetime or float, optional
+            Only runs started at or after this time
+
+        before : datetime or float, optional
+            Only runs started at or before this time
+
+        parameters : keyword arguments
+            Parameter name with a value or a (min, max) tuple, either
+            limit can be None, for example wavelength=(2, 4)
+        """
+        conditions = []
+        arguments = []
+
+        if instrument is not None:
+            conditions.append("runs.instrument = ?")
+            arguments.append(instrument)
+
+        if monitor is not None:
+            conditions.append("EXISTS (SELECT 1 FROM monitors WHERE "
+                              + "monitors.run_id = runs.id AND "
+                              + "monitors.name = ?)")
+            arguments.append(monitor)
+
+        if after is not None:
+            conditions.append("runs.timestamp >= ?")
+            arguments.append(to_timestamp(after))
+
+        if before is not None:
+            conditions.append("runs.timestamp <= ?")
+            arguments.append(to_timestamp(before))
+
+        for name, value in parameters.items():
+            condition = ("EXISTS (SELECT 1 FROM parameters WHERE "
+                         + "parameters.run_id = runs.id AND "
+                         + "parameters.name = ? AND ")
+            arguments.append(name)
+
+            if isinstance(value, tuple):
+                if len(value) != 2:
+                    raise ValueError("Range for parameter " + name + " should "
+                                     + "be given as (min, max), got "
+                                     + str(value))
+                limits = ["1"]
+                lower, upper = value
+                if lower is not None:
+                    limits.append("parameters.value >= ?")
+                    arguments.append(float(lower))
+                if upper is not None:
+                    limits.append("parameters.value <= ?")
+                    arguments.append(float(upper))
+                condition += " AND ".join(limits) + ")"
+            elif isinstance(value, (int, float)):
+                condition += "parameters.value = ?)"
+                arguments.append(float(value))
+            else:
+                condition += "parameters.text = ?)"
+                arguments.append(str(value))
+
+            conditions.append(condition)
+
+        query = ("SELECT id, path, instrument, ncount, seed, date, timestamp, "
+                 + "format FROM runs")
+        if len(conditions) > 0:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp, path"
+
+        keys = ["path", "instrument", "ncount", "seed", "date", "timestamp",
+                "format"]
+        runs = {}
+        for row in self.connection.execute(query, arguments):
+            run = dict(zip(keys, row[1:]))
+            run["parameters"] = {}
+            run["monitors"] = {}
+            runs[row[0]] = run
+
+        if len(runs) == 0:
+            return []
+
+        # Parameters and monitors of the matching runs in two queries
+        selected = "SELECT id FROM runs"
+        if len(conditions) > 0:
+            selected += " WHERE " + " AND ".join(conditions)
+
+        for run_id, name, value, text in self.connection.execute(
+                "SELECT run_id, name, value, text FROM parameters WHERE "
+                + "run_id IN (" + selected + ")", arguments):
+            runs[run_id]["parameters"][name] = text if value is None else value
+
+        for run_id, name, intensity, error, ncount in self.connection.execute(
+                "SELECT run_id, name, I, E, N FROM monitors WHERE "
+                + "run_id IN (" + selected + ")", arguments):
+            runs[run_id]["monitors"][name] = (intensity, error, ncount)
+
+        return list(runs.values())
+
+
+def metadata_modified(data_folder_name):
+    """
+    Returns modification time of the metadata file, None if there is none
+    """
+    for filename in ["mccode.sim", "mccode.h5"]:
+        path = os.path.join(data_folder_name, filename)
+        if os.path.isfile(path):
+            return os.path.getmtime(path)
+
+    return None
+
+
+def read_run_info(data_folder_name):
+    """
+    Reads the catalogue information of an output folder
+
+    Parameters and monitor totals are read with load_totals_folder, the
+    remaining information from the header of mccode.sim or the simulation
+    attributes of mccode.h5.
+
+    Parameters
+    ----------
+    data_folder_name : str
+        Path of output folder with mccode.sim or mccode.h5
+    """
+    parameters, names, totals = load_totals_folder(data_folder_name)
+
+    sim_file = os.path.join(data_folder_name, "mccode.sim")
+    if os.path.isfile(sim_file):
+        header = read_sim_header(sim_file)
+        file_format = "text"
+    else:
+        header = read_nexus_header(os.path.join(data_folder_name,
+                                                "mccode.h5"))
+        file_format = "NeXus"
+
+    modified = metadata_modified(data_folder_name)
+
+    timestamp = None
+    if header["date"] is not None:
+        try:
+            timestamp = time.mktime(time.strptime(header["date"],
+                                                  SIM_TIME_FORMAT))
+        except ValueError:
+            pass
+    if timestamp is None:
+        timestamp = modified
+
+    ncount = header["ncount"]
+    try:
+        ncount = float(ncount)
+    except (TypeError, ValueError):
+        ncount = None
+
+    return {"path": os.path.abspath(data_folder_name),
+            "instrument": header["instrument"],
+            "ncount": ncount,
+            "seed": header["seed"],
+            "date": header["date"],
+            "timestamp": timestamp,
+            "format": file_format,
+            "modified": modified,
+            "parameters": parameters,
+            "monitors": {name: tuple(float(value) for value in total)
+                         for name, total in zip(names, totals)}}
+
+
+def try_read_run_info(data_folder_name):
+    """
+    Returns read_run_info of folder, or None if it could not be read
+    """
+    try:
+        return read_run_info(data_folder_name)
+    except Exception:
+        # Incomplete or broken output folders are left out of the catalogue
+        return None
+
+
+def read_sim_header(sim_file):
+    """
+    Reads date, instrument, ncount and seed from the start of mccode.sim
+    """
+    with open(sim_file, "r") as f:
+        header = f.read().split("begin data")[0]
+
+    info = {}
+    for key, pattern in SIM_HEADER_PATTERNS.items():
+        match = pattern.search(header)
+        info[key] = None if match is None else match.group(1)
+
+    return info
+
+
+def read_nexus_header(nexus_file):
+    """
+    Reads instrument, ncount and seed from simulation attributes of mccode.h5
+
+    Attribute names are matched without regard to case, missing
+    information is None.
+    """
+    info = {"date": None, "instrument": None, "ncount": None, "seed": None}
+    with h5py.File(nexus_file, "r", swmr=True) as f:
+        for group_name in ["entry1", "entry1/simulation"]:
+            if group_name not in f:
+                continue
+
+            for name, value in f[group_name].attrs.items():
+                if isinstance(value, bytes):
+                    value = value.decode("utf-8", errors="replace")
+                key = name.lower()
+                if key in ("instrument", "ncount", "seed"):
+                    info[key] = str(value).strip()
+
+    return info
+
+
+def to_timestamp(value):
+    """
+    Returns seconds since epoch for datetime or number
+    """
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+
+    return float(value)
@@ -1,10 +1,16 @@
+import copy
+
+import matplotlib.pyplot as plt
+
 from mcstasscript.helper.mcstas_objects import DeclareVariable
 from mcstasscript.helper.mcstas_objects import Component
 from mcstasscript.instrument_diagnostics.diagnostics_instrument import DiagnosticsInstrument
 from mcstasscript.instrument_diagnostics.view import View
 from mcstasscript.instrument_diagnostics.plot_overview import PlotOverview
 from mcstasscript.instrument_diagnostics import event_plotter
+from mcstasscript.instrument_diagnostics.ray_tracking import RayTable
 from mcstasscript.interface.functions import name_search
+from mcstasscript.helper.plot_helper import _plot_fig_ax
 
 def sanitise_comp_name(comp_name):
     if isinstance(comp_name, Component):
@@ -66,9 +72,36 @@ class DiagnosticsPoint:
         return string
 
 class BeamDiagnostics(DiagnosticsInstrument):
-    def __init__(self, instr):
+    def __init__(self, instr, binary_events=None, preview=None):
+        """
+        Diagnostics of the beam with event monitors at chosen points
+
+        Parameters:
+
+        instr : McStas_instr or McXtrace_instr
+            Instrument to investigate
+
+        binary_events : bool, "float" or None
+            If True event monitors write binary files in double precision,
+            which are much faster to load than text. "float" writes single
+            precision binary files, half the size, but ray numbers above
+            2**24 can then not be told apart, so rays can not be followed
+            between points in large runs. None uses double precision
+            binary files with McStas / McXtrace 3 and text files otherwise.
+
+        preview : int or False
+            Points with more events are plotted from a weight-aware
+            sample of this size, see EventPlotter, False plots all events
+        """
         super().__init__(instr)
 
+        if binary_events not in (None, True, False, "float"):
+            raise ValueError("binary_events should be True, False, \"float\" "
+                             + "or None, got " + str(binary_events) + ".")
+
+        self.binary_events = binary_events
+        self.preview = preview
+
         # points to investigate with options
         self.points = []
         self.ordered_point_list = []
@@ -83,6 +116,7 @@ class BeamDiagnostics(DiagnosticsInstrument):
         self.data = None
 
         self.event_plotters = []
+        self._ray_table = None
 
     def __repr__(self):
         string = f"Instrument diagnostics for: {self.instr.name}\n"
@@ -334,6 +368,14 @@ class BeamDiagnostics(DiagnosticsInstrument):
                 # Monitor_nD in McStas 3.X (and onwards) needs to be a string
                 user_vars[index] = '"' + flag + '"'
 
+        binary_str = ""
+        if self.use_binary_events():
+            if self.binary_events == "float":
+                binary_str = " binary"
+            else:
+                # Monitor_nD writes float32 unless asked for double
+                binary_str = " binary double"
+
         if isinstance(point.rays, (float, int)):
             ray_value = point.rays
             if self.instr.mccode_version == 3:
@@ -344,11 +386,11 @@ class BeamDiagnostics(DiagnosticsInstrument):
 
         if point.before:
             name = "Diag_before_" + point.component
-            options = f'"square boarders n x y z vx vy vz t{flags_str}, list {ray_str}"'
+            options = f'"square boarders n x y z vx vy vz t{flags_str}, list {ray_str}{binary_str}"'
             mon = self.instr.add_component(name, "Monitor_nD", before=point.component)
         else:
             name = "Diag_after_" + point.component
-            options = f'"previous n x y z vx vy vz t{flags_str}, list {ray_str}"'
+            options = f'"previous n x y z vx vy vz t{flags_str}, list {ray_str}{binary_str}"'
             mon = self.instr.add_component(name, "Monitor_nD", after=point.component)
 
         mon.set_parameters(xwidth=100, yheight=100,
@@ -368,6 +410,15 @@ class BeamDiagnostics(DiagnosticsInstrument):
 
         return name
 
+    def use_binary_events(self):
+        """
+        Returns True if the event monitors should write binary files
+        """
+        if self.binary_events is None:
+            return self.instr.mccode_version == 3
+
+        return bool(self.binary_events)
+
     def run(self):
         """
         Runs diagnostics with all included points
@@ -392,6 +443,7 @@ class BeamDiagnostics(DiagnosticsInstrument):
         """
 
         self.event_plotters = []
+        self._ray_table = None
 
         for point in self.ordered_point_list:
             try:
@@ -402,13 +454,119 @@ class BeamDiagnostics(DiagnosticsInstrument):
 
             point.set_recorded_rays(event_data.metadata.total_N)
             plotter = event_plotter.EventPlotter(point.filename, event_data,
-                                                 flag_info=self.flags)
+                                                 flag_info=self.flags,
+                                                 preview=self.preview)
 
             self.event_plotters.append(plotter)
 
-    def plot(self):
+    def histogram(self, name, axis1, axis2=None, bins=100, exact=True):
+        """
+        Returns binned data for the diagnostics point with given name
+
+        Parameters:
+
+        name : str
+            Filename of the diagnostics point, for example "Diag_before_guide"
+
+        axis1: str
+            Name of parameter for first axis
+
+        axis2: str
+            Name of parameter for second axis
+
+        bins : int or list of length 2
+            Number of bins for histogram (can be list of length 2 for 2D)
+
+        exact : bool
+            If True (default) all events are used, otherwise the preview
+            sample for points with many events
+        """
+        for plotter in self.event_plotters:
+            if plotter.name == name:
+                histogram = plotter.make_histogram(View(axis1=axis1, axis2=axis2, bins=bins),
+                                                   exact=exact)
+                # Copy so changes do not reach the plotter cache
+                return copy.deepcopy(histogram)
+
+        raise NameError("No diagnostics data with name '" + str(name) + "', "
+                        + "available: " + str([x.name for x in self.event_plotters]))
+
+    def ray_table(self):
+        """
+        Returns RayTable joining the events of all points on ray number
+
+        The diagnostics monitors record the ray number n, so each ray can
+        be followed through the points, for example
+        table.select(reached="Diag_before_sample").column("Diag_before_guide", "x")
+        gives the positions at the guide entrance of rays reaching the
+        sample. The table is made once per run.
+        """
+        if self._ray_table is None:
+            data = {plotter.name: plotter.data for plotter in self.event_plotters}
+            self._ray_table = RayTable(data, flag_info=self.flags)
+
+        return self._ray_table
+
+    def correlation(self, point1, axis1, point2, axis2, bins=100, weight_point=None):
+        """
+        Returns 2D histogram of rays with axis1 at point1 and axis2 at point2
+
+        Only rays recorded at both points are included, weighted with their
+        weight at weight_point, by default point2.
+
+        Parameters:
+
+        point1 : str
+            Filename of first point, for example "Diag_before_guide"
+
+        axis1: str
+            Name of parameter at first point
+
+        point2 : str
+            Filename of second point
+
+        axis2: str
+            Name of parameter at second point
+
+        bins : int or list of length 2
+            Number of bins for histogram
+
+        weight_point : str
+            Filename of point whose weights are used, default point2
+        """
+        return self.ray_table().correlation(point1, axis1, point2, axis2,
+                                            bins=bins, weight_point=weight_point)
+
+    def plot_correlation(self, point1, axis1, point2, axis2, bins=100,
+                         weight_point=None, figsize=(6, 5), **kwargs):
+        """
+        Plots correlation of rays between two points, see correlation
+
+        Additional keyword arguments are passed as plot options.
+        """
+        data = self.correlation(point1, axis1, point2, axis2, bins=bins,
+                                weight_point=weight_point)
+        data.set_plot_options(**kwargs)
+
+        fig, ax = plt.subplots(1, 1, figsize=figsize)
+        _plot_fig_ax(data, fig, ax)
+        fig.tight_layout()
+
+    def plot(self, exact=False, workers=None):
         """
         Plots the generated data for all points with all views
+
+        Points with many events are plotted from their preview sample
+        unless exact is True.
+
+        Parameters:
+
+        exact : bool
+            If True all events are histogrammed
+
+        workers : int or None
+            Number of threads making histograms of different points, None
+            uses one per point up to the cpu count
         """
 
         if len(self.event_plotters) == 0:
@@ -418,5 +576,5 @@ class BeamDiagnostics(DiagnosticsInstrument):
                 print("No data to plot! Use the run method to generate data.")
 
         overview = PlotOverview(self.event_plotters, self.views)
-        overview.plot_all()
+        overview.plot_all(exact=exact, workers=workers)
 
@@ -1,13 +1,51 @@
+import concurrent.futures
+import copy
+
 import numpy as np
 import matplotlib.pyplot as plt
 
 from mcstasscript.helper.plot_helper import _plot_fig_ax
 
+# Largest number of events used directly for limits and interactive plots
+PREVIEW_EVENTS = 1000000
+
+# Single background thread computing exact histograms, see submit_exact
+_exact_executor = None
+
+
+def _get_exact_executor():
+    global _exact_executor
+
+    if _exact_executor is None:
+        _exact_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    return _exact_executor
+
+
+def _histogram_key(view, exact, flag_info):
+    """
+    Returns cache key of a histogram, plot limits of the view are not
+    included as the histogram always covers the full data range
+    """
+    return (exact, view.axis1, view.axis2, str(view.bins),
+            tuple(flag_info or ()))
+
+
 class EventPlotter:
     """
     Plots event data onto given views
+
+    Data sets with more events than the preview size are represented by a
+    weight-aware random sample, see McStasDataEvent.sample, which is used
+    for limits and plots. Exact histograms of all events are made when
+    asked for with exact=True or in the background with submit_exact, and
+    are then used by plot.
+
+    Histograms are cached on axes, bins and flag_info, so replotting or
+    changing limits and plot options does not bin the events again. The
+    cache is cleared by scale_weights and clear_histograms.
     """
-    def __init__(self, name, data, flag_info=None):
+    def __init__(self, name, data, flag_info=None, preview=None):
         """
         EventPlotter stores name and data, can produce plots given views
 
@@ -21,11 +59,44 @@ class EventPlotter:
 
         flag_info : list of str
             List of flag names in order U1 U2 U3
+
+        preview : int or False
+            Number of events in the preview sample, default PREVIEW_EVENTS,
+            False always uses all events
         """
         self.name = name
         self.data = data
         self.flag_info = flag_info
 
+        if preview is None:
+            preview = PREVIEW_EVENTS
+        self.preview = preview
+
+        self._preview_data = None
+        # Histograms or futures of them, see _histogram_key
+        self._histograms = {}
+
+    @property
+    def uses_preview(self):
+        """
+        True if limits and plots are made from a sample of the events
+        """
+        return self.preview is not False and len(self.data) > self.preview
+
+    def get_plot_data(self):
+        """
+        Returns the event data used for limits and plots
+
+        The preview sample is drawn the first time it is needed.
+        """
+        if not self.uses_preview:
+            return self.data
+
+        if self._preview_data is None:
+            self._preview_data = self.data.sample(self.preview, seed=0)
+
+        return self._preview_data
+
     def scale_weights(self, factor):
         """
         Scales all weights in contained McStasEventData object
@@ -35,8 +106,17 @@ class EventPlotter:
         factor : float
             Scale factor to be applied
         """
-        index = self.data.find_variable_index("p", flag_info=self.flag_info)
-        self.data.Events[:, index] *= factor
+        self.data.scale_weights(factor)
+
+        if self._preview_data is not None:
+            self._preview_data.scale_weights(factor)
+        self.clear_histograms()
+
+    def clear_histograms(self):
+        """
+        Removes cached histograms, needed if the event data is modified
+        """
+        self._histograms = {}
 
     def add_view_limits(self, view):
         """
@@ -46,12 +126,10 @@ class EventPlotter:
         view : View
             View for which limits should be set
         """
-        data = self.data.get_data_column(view.axis1, flag_info=self.flag_info)
-        view.set_axis1_limits(np.min(data), np.max(data))
+        view.set_axis1_limits(*self.get_view_limits_axis1(view))
 
         if view.axis2 is not None:
-            data = self.data.get_data_column(view.axis1, flag_info=self.flag_info)
-            view.set_axis1_limits(np.min(data), np.max(data))
+            view.set_axis2_limits(*self.get_view_limits_axis2(view))
 
     def get_view_limits_axis1(self, view):
         """
@@ -61,8 +139,7 @@ class EventPlotter:
         view : View
             View for which limits should be retrieved
         """
-        data = self.data.get_data_column(view.axis1, flag_info=self.flag_info)
-        return np.min(data), np.max(data)
+        return self.get_plot_data().get_data_range(view.axis1, flag_info=self.flag_info)
 
     def get_view_limits_axis2(self, view):
         """
@@ -74,10 +151,88 @@ class EventPlotter:
         """
         if view.axis2 is None:
             return np.nan, np.nan
-        data = self.data.get_data_column(view.axis2, flag_info=self.flag_info)
-        return np.min(data), np.max(data)
+        return self.get_plot_data().get_data_range(view.axis2, flag_info=self.flag_info)
 
-    def plot(self, view, fig, ax):
+    def _histogram(self, data, view):
+        if view.axis2 is None:
+            return data.make_1d(axis1=view.axis1, n_bins=view.bins, flag_info=self.flag_info)
+        else:
+            return data.make_2d(axis1=view.axis1, axis2=view.axis2, n_bins=view.bins, flag_info=self.flag_info)
+
+    def _cached_histogram(self, key, wait):
+        """
+        Returns cached histogram, None if missing or still being computed
+        """
+        histogram = self._histograms.get(key)
+        if isinstance(histogram, concurrent.futures.Future):
+            if not (wait or histogram.done()):
+                return None
+            histogram = histogram.result()
+            self._histograms[key] = histogram
+
+        return histogram
+
+    def make_histogram(self, view, exact=False):
+        """
+        Returns binned data generated from contained data on axis from view
+
+        The histogram is made in a single pass over the events, see
+        McStasDataEvent.make_1d and make_2d. Without exact the preview
+        sample is used, unless an exact histogram is already available.
+        The returned data is kept in the cache and should be copied
+        before it is modified.
+
+        view : View
+            View defining onto which axis and what bins EventData should be binned
+
+        exact : bool
+            If True all events are histogrammed
+        """
+        exact = exact or not self.uses_preview
+
+        exact_key = _histogram_key(view, True, self.flag_info)
+        histogram = self._cached_histogram(exact_key, wait=exact)
+        if histogram is not None:
+            return histogram
+
+        if exact:
+            histogram = self._histogram(self.data, view)
+            self._histograms[exact_key] = histogram
+            return histogram
+
+        preview_key = _histogram_key(view, False, self.flag_info)
+        histogram = self._cached_histogram(preview_key, wait=True)
+        if histogram is None:
+            histogram = self._histogram(self.get_plot_data(), view)
+            self._histograms[preview_key] = histogram
+
+        return histogram
+
+    def submit_exact(self, view):
+        """
+        Starts exact histogram of all events for view in the background
+
+        Returns a concurrent.futures.Future with the binned data. Once it
+        is done, make_histogram and plot use it instead of the preview.
+
+        view : View
+            View defining onto which axis and what bins EventData should be binned
+        """
+        key = _histogram_key(view, True, self.flag_info)
+        if key in self._histograms:
+            existing = self._histograms[key]
+            if isinstance(existing, concurrent.futures.Future):
+                return existing
+
+            future = concurrent.futures.Future()
+            future.set_result(existing)
+            return future
+
+        future = _get_exact_executor().submit(self._histogram, self.data, view)
+        self._histograms[key] = future
+        return future
+
+    def plot(self, view, fig, ax, exact=False):
         """
         Plots binned data generated from contained data on axis from view
 
@@ -92,17 +247,22 @@ class EventPlotter:
 
         ax : Matplotlib ax
             Axes object for figure
+
+        exact : bool
+            If True all events are histogrammed instead of the preview
         """
+        # Plot options are set on a copy, the cached histogram is shared
+        data = copy.copy(self.make_histogram(view, exact=exact))
+        data.metadata = copy.deepcopy(data.metadata)
+        data.plot_options = copy.deepcopy(data.plot_options)
 
         if view.axis2 is None:
-            data = self.data.make_1d(axis1=view.axis1, n_bins=view.bins, flag_info=self.flag_info)
             data.set_title("")
             if view.axis1_limits is not None:
                 data.set_plot_options(left_lim=view.axis1_limits[0], right_lim=view.axis1_limits[1])
             data.set_plot_options(**view.plot_options)
 
         else:
-            data = self.data.make_2d(axis1=view.axis1, axis2=view.axis2, n_bins=view.bins, flag_info=self.flag_info)
             data.set_plot_options(show_colorbar=False)
             data.set_title("")
             if view.axis1_limits is not None and view.axis2_limits is not None:
@@ -7,6 +7,7 @@ from matplotlib.colors import BoundaryNorm
 from mcstasscript.instrument_diagnostics.diagnostics_instrument import DiagnosticsInstrument
 from mcstasscript.interface.functions import name_search
 from mcstasscript.data.data import McStasDataBinned
+from mcstasscript.data.rebin import regrid_1d
 from mcstasscript.helper.plot_helper import _plot_fig_ax
 
 class IntensityDiagnostics(DiagnosticsInstrument):
@@ -126,14 +127,10 @@ class IntensityDiagnostics(DiagnosticsInstrument):
         n_bins = 300
         axis = np.linspace(min_axis, max_axis, n_bins)
         sep = axis[1] - axis[0]
-        bin_axis = np.append(axis - 0.5 * sep, axis[-1] + sep)
-        intensities = np.zeros((len(data_sets), len(axis)))
-
-        for index, data_set in enumerate(data_sets):
-            new_bins = np.digitize(data_set["axis"], bin_axis)
-            boarder_bins = np.where(new_bins == n_bins)
-            new_bins[boarder_bins] -= 1
-            intensities[index, new_bins] += data_set["I"]
+        bin_axis = np.append(axis - 0.5 * sep, axis[-1] + 0.5 * sep)
+        intensities = regrid_1d([data_set["axis"] for data_set in data_sets],
+                                [data_set["I"] for data_set in data_sets],
+                                bin_axis)
 
         if ax is None:
             fig, ax = plt.subplots(1, 1, figsize=figsize)
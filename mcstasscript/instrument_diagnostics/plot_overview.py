@@ -1,3 +1,6 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -23,7 +26,7 @@ class PlotOverview:
         self.views = view_list
         self.n_plots = len(view_list)
 
-    def plot_all(self, figsize=None, same_scale=True):
+    def plot_all(self, figsize=None, same_scale=True, exact=False, workers=None):
         """
         Plots all views for all guide points
 
@@ -37,10 +40,18 @@ class PlotOverview:
 
         same_scale : bool
             Allow the use of the same scale feature (default)
+
+        exact : bool
+            Histogram all events instead of the preview samples
+
+        workers : int or None
+            Number of threads making histograms, see compute_histograms
         """
         if same_scale:
             self.set_same_scale()
 
+        self.compute_histograms(exact=exact, workers=workers)
+
         if figsize is None:
             # Scale size after number of plots
             figsize = (1 + self.n_plots*3, self.n_points*3)
@@ -51,7 +62,7 @@ class PlotOverview:
         for plotter, ax_row in zip(self.event_plotter_list, axs):
             major_label_set = False
             for view, ax in zip(self.views, ax_row):
-                plotter.plot(view=view, fig=fig, ax=ax)
+                plotter.plot(view=view, fig=fig, ax=ax, exact=exact)
 
                 if not major_label_set:
                     ylabel = ax.get_ylabel()
@@ -63,9 +74,44 @@ class PlotOverview:
 
         fig.tight_layout()
 
+    def compute_histograms(self, exact=False, workers=None):
+        """
+        Makes the histograms of all views for all points
+
+        The histograms are kept by each EventPlotter, so later plots only
+        bin views that are new. Points are independent and are binned in
+        parallel threads.
+
+        Parameters:
+
+        exact : bool
+            Histogram all events instead of the preview samples
+
+        workers : int or None
+            Number of threads, None uses one per point up to the cpu count
+        """
+        def point_histograms(plotter):
+            for view in self.views:
+                plotter.make_histogram(view, exact=exact)
+
+        if workers is None:
+            workers = min(os.cpu_count() or 1, self.n_points)
+
+        if workers <= 1 or self.n_points <= 1:
+            for plotter in self.event_plotter_list:
+                point_histograms(plotter)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list raises exceptions from the threads
+            list(executor.map(point_histograms, self.event_plotter_list))
+
     def set_same_scale(self):
         """
         Uses minimum and maximum of each dataset to find global min/max
+
+        The ranges are cached with the event data, so this only passes
+        over the events the first time.
         """
         for view in self.views:
 
@@ -0,0 +1,290 @@
+import copy
+
+import numpy as np
+
+from mcstasscript.data.data import McStasDataBinned
+from mcstasscript.data.histogram import Histogram
+from mcstasscript.data.histogram import _find_limits
+
+# Event variable with the ray number recorded by the diagnostics monitors
+RAY_ID_AXIS = "n"
+
+
+def ray_ids(event_data, axis=RAY_ID_AXIS):
+    """
+    Returns ray number of each event as int64 array
+
+    Ray numbers stored as floats are only exact up to the precision of
+    the float type, 2**24 for float32 as used by single precision binary
+    Monitor_nD event files and compact dtypes. A ValueError is raised if
+    larger ray numbers are stored with too low precision, as different
+    rays could then get the same number.
+
+    Parameters
+    ----------
+    event_data : McStasDataEvent
+        Events with a ray number column
+
+    axis : str
+        Name of the ray number variable
+    """
+    if axis not in event_data.variables:
+        raise ValueError("Event data " + str(event_data.name) + " has no ray "
+                         + "number variable \"" + axis + "\", variables: "
+                         + " ".join(event_data.variables))
+
+    column = np.asarray(event_data.get_data_column(axis))
+    if np.issubdtype(column.dtype, np.floating) and len(column) > 0:
+        exact_limit = 2 ** (np.finfo(column.dtype).nmant + 1)
+        if np.max(column) >= exact_limit:
+            raise ValueError("Ray numbers of event data "
+                             + str(event_data.name) + " are stored as "
+                             + str(column.dtype) + ", which can not tell "
+                             + "apart ray numbers above " + str(exact_limit)
+                             + ". If the event file itself is single "
+                             + "precision the ray numbers are lost, write "
+                             + "the diagnostics again with double precision "
+                             + "binary or text output (BeamDiagnostics "
+                             + "binary_events True or False), and load them "
+                             + "without a float32 dtype.")
+
+    return column.astype(np.int64)
+
+
+def match_rays(ids, reference):
+    """
+    Returns index into ids of each reference ray, -1 where it is missing
+
+    The ids are sorted once and all reference rays are looked up with a
+    single np.searchsorted. A ray recorded several times, for example
+    after SPLIT, is matched to its first event.
+
+    Parameters
+    ----------
+    ids : numpy array
+        Ray number of each event at a point
+
+    reference : numpy array
+        Ray numbers to look up
+    """
+    if len(ids) == 0:
+        return np.full(len(reference), -1, dtype=np.intp)
+
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+
+    position = np.searchsorted(sorted_ids, reference, side="left")
+    position = np.minimum(position, len(sorted_ids) - 1)
+
+    found = sorted_ids[position] == reference
+    return np.where(found, order[position], -1)
+
+
+class RayTable:
+    """
+    Table with one row per ray and the events of each diagnostics point
+
+    Rows are the ray numbers seen at any of the points, sorted. For each
+    point the index of the event of each ray is stored, -1 if the ray was
+    not recorded there. Columns are gathered from the event data when
+    asked for, with NaN for missing rays, so rays can be followed through
+    the instrument with array operations.
+
+    Attributes
+    ----------
+    ray_id : numpy array
+        Ray number of each row
+
+    points : list of str
+        Names of the diagnostics points in instrument order
+
+    data : dict
+        McStasDataEvent of each point
+
+    index : dict
+        Event index of each row for each point, -1 for missing rays
+
+    flag_info : list of str
+        Names of the user variables, as for McStasDataEvent
+    """
+
+    def __init__(self, data, flag_info=None, axis=RAY_ID_AXIS):
+        """
+        Joins the events of several points on the ray number
+
+        Parameters
+        ----------
+        data : dict
+            Point name and McStasDataEvent in instrument order
+
+        flag_info : list of str
+            Names of the user variables
+
+        axis : str
+            Name of the ray number variable
+        """
+        self.points = list(data)
+        self.data = dict(data)
+        self.flag_info = flag_info
+
+        ids = {name: ray_ids(event_data, axis)
+               for name, event_data in self.data.items()}
+
+        if len(ids) == 0:
+            self.ray_id = np.zeros(0, dtype=np.int64)
+        else:
+            self.ray_id = np.unique(np.concatenate(list(ids.values())))
+
+        self.index = {name: match_rays(point_ids, self.ray_id)
+                      for name, point_ids in ids.items()}
+
+    def __len__(self):
+        return len(self.ray_id)
+
+    def _check_point(self, point):
+        if point not in self.index:
+            raise NameError("No diagnostics point named " + str(point)
+                            + ", available: " + str(self.points))
+
+    def present(self, point):
+        """
+        Returns boolean array, True for rays recorded at point
+
+        Parameters
+        ----------
+        point : str
+            Name of diagnostics point
+        """
+        self._check_point(point)
+        return self.index[point] >= 0
+
+    def column(self, point, axis):
+        """
+        Returns values of axis at point for each ray, NaN for missing rays
+
+        Parameters
+        ----------
+        point : str
+            Name of diagnostics point
+
+        axis : str
+            Event variable or derived axis, for example x, l or dx
+        """
+        self._check_point(point)
+        index = self.index[point]
+        values = np.asarray(self.data[point].get_data_column(
+            axis, flag_info=self.flag_info), dtype=np.float64)
+
+        result = np.full(len(index), np.nan)
+        present = index >= 0
+        result[present] = values[index[present]]
+
+        return result
+
+    def select(self, mask=None, reached=None, missed=None):
+        """
+        Returns table with a subset of the rays
+
+        Parameters
+        ----------
+        mask : boolean numpy array
+            Rows to keep
+
+        reached : str or list of str
+            Keep only rays recorded at all these points
+
+        missed : str or list of str
+            Keep only rays not recorded at any of these points
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+            if mask.shape != keep.shape:
+                raise ValueError("Mask should have one element per ray, got "
+                                 + "shape " + str(mask.shape) + " for "
+                                 + str(len(self)) + " rays.")
+            keep &= mask
+
+        if isinstance(reached, str):
+            reached = [reached]
+        for point in reached or []:
+            keep &= self.present(point)
+
+        if isinstance(missed, str):
+            missed = [missed]
+        for point in missed or []:
+            keep &= ~self.present(point)
+
+        selected = copy.copy(self)
+        selected.ray_id = self.ray_id[keep]
+        selected.index = {name: index[keep]
+                          for name, index in self.index.items()}
+
+        return selected
+
+    def correlation(self, point1, axis1, point2, axis2, bins=100,
+                    weight_point=None):
+        """
+        Returns 2D histogram of axis1 at point1 against axis2 at point2
+
+        Only rays recorded at both points are included. The rays are
+        weighted with their weight at weight_point, by default point2,
+        so for example the origin of the intensity reaching a sample can
+        be shown.
+
+        Parameters
+        ----------
+        point1 : str
+            Point for the first (horizontal) axis
+
+        axis1 : str
+            Event axis at point1
+
+        point2 : str
+            Point for the second (vertical) axis
+
+        axis2 : str
+            Event axis at point2
+
+        bins : int or list of length 2
+            Number of bins along axis1 and axis2
+
+        weight_point : str
+            Point whose weights are used, default point2
+        """
+        if weight_point is None:
+            weight_point = point2
+
+        table = self.select(reached=[point1, point2, weight_point])
+        data1 = table.column(point1, axis1)
+        data2 = table.column(point2, axis2)
+        weights = table.column(weight_point, "p")
+
+        if isinstance(bins, (list, tuple)):
+            bins = list(reversed(bins))
+        histogram = Histogram(bins, [_find_limits(data2),
+                                     _find_limits(data1)])
+        histogram.add(data2, data1, weights=weights)
+
+        centers2, centers1 = histogram.centers
+        metadata = copy.deepcopy(self.data[weight_point].metadata)
+        metadata.component_name = point1 + " vs " + point2
+        metadata.dimension = [len(centers1), len(centers2)]
+        metadata.info["type"] = "array_2d"
+        metadata.limits = [centers1[0], centers1[-1],
+                           centers2[0], centers2[-1]]
+        metadata.total_I = histogram.intensity.sum()
+        metadata.total_E = np.sqrt(histogram.error_squared.sum())
+        metadata.total_N = histogram.ncount.sum()
+
+        binned = McStasDataBinned(metadata, intensity=histogram.intensity,
+                                  error=histogram.error,
+                                  ncount=histogram.ncount)
+
+        label1 = self.data[point1].get_label(axis1, self.flag_info)
+        label2 = self.data[point2].get_label(axis2, self.flag_info)
+        binned.set_title("Rays at " + point1 + " and " + point2)
+        binned.set_xlabel(point1 + ": " + label1)
+        binned.set_ylabel(point2 + ": " + label2)
+
+        return binned
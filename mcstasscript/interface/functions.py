@@ -2,6 +2,8 @@ import yaml
 import os
 
 from mcstasscript.data.data import McStasData
+from mcstasscript.data.data import McStasDataList
+from mcstasscript.data import archive
 import mcstasscript.helper.managed_mcrun as managed_mcrun
 
 
@@ -16,6 +18,9 @@ def name_search(name, data_list):
     additional monitors are added so it is more convenient to access
     the data files using their names.
 
+    A McStasDataList, as returned when loading data, is searched with
+    its index instead of checking every dataset.
+
     Parameters
     ----------
     name : string
@@ -24,7 +29,7 @@ def name_search(name, data_list):
     data_list : List of McStasData instances
         List of datasets to search
     """
-    if type(data_list) is not list:
+    if not isinstance(data_list, list):
         raise RuntimeError(
             "name_search function needs list of McStasData as input.")
 
@@ -35,18 +40,21 @@ def name_search(name, data_list):
         raise RuntimeError(
             "name_search function needs objects of type McStasData as input.")
 
-    # Search by component name
-    list_result = []
-    for check in data_list:
-        if check.name == name:
-            list_result.append(check)
-
-    if len(list_result) == 0:
-        # Search by filename
+    if isinstance(data_list, McStasDataList):
+        list_result = data_list.find(name)
+    else:
+        # Search by component name
+        list_result = []
         for check in data_list:
-            if check.metadata.filename == name:
+            if check.name == name:
                 list_result.append(check)
 
+        if len(list_result) == 0:
+            # Search by filename
+            for check in data_list:
+                if check.metadata.filename == name:
+                    list_result.append(check)
+
     if len(list_result) == 0:
         raise NameError("No dataset with name: \""
                         + name
@@ -85,22 +93,139 @@ def name_plot_options(name, data_list, **kwargs):
         for data_object in object_to_modify:
             data_object.set_plot_options(**kwargs)
 
-def load_data(foldername):
+def load_data(foldername, workers=1, use_processes=False, lazy_events=False,
+              monitors=None, dtypes=None, sparse=None):
     """
     Loads data from a McStas data folder including mccode.sim
 
+    A results archive written with save_data can be given instead of a
+    folder, then only lazy_events is used and the arrays keep the dtypes
+    they were saved with.
+
     Parameters
     ----------
         foldername : string
-            Name of the folder from which to load data
+            Name of the folder or results archive from which to load data
+
+        workers : int or None, default 1
+            Number of workers reading monitor files, None uses cpu count
+
+        use_processes : bool, default False
+            If True a process pool is used instead of a thread pool
+
+        lazy_events : bool, default False
+            If True event data is memory-mapped or read from disk in chunks
+
+        monitors : str, pattern or list of these, default None
+            Monitor names, glob patterns or compiled regular expressions,
+            only matching monitors are loaded, None loads all
+
+        dtypes : str or dict, default None
+            "compact" stores intensities, errors and events as float32 and
+            Ncount as integers, "float64" keeps full precision, a dict can
+            give the dtype per field, None uses set_default_dtypes
+
+        sparse : bool or float, default None
+            True stores 2D monitors with mostly empty bins sparse, a number
+            sets the largest fraction of non-empty bins stored sparse,
+            None uses set_default_sparse
     """
+    if os.path.isfile(foldername):
+        return archive.read_results(foldername, lazy_events=lazy_events)
+
     if not os.path.isdir(foldername):
         raise RuntimeError("Could not find specified foldername for"
                            + "load_data:" + str(foldername))
 
-    return managed_mcrun.load_results(foldername)
+    return managed_mcrun.load_results(foldername, workers=workers,
+                                      use_processes=use_processes,
+                                      lazy_events=lazy_events,
+                                      monitors=monitors, dtypes=dtypes,
+                                      sparse=sparse)
+
+def iter_data(foldername, batch_size=None, lazy_events=False,
+              monitors=None, dtypes=None, sparse=None):
+    """
+    Returns iterator over the data in a McStas data folder
+
+    Yields McStasData objects one at a time, or lists of batch_size
+    objects, as they are read. Only the current monitors are kept in
+    memory, so results can be reduced and discarded while iterating.
+
+    Parameters
+    ----------
+        foldername : string
+            Name of the folder from which to load data
+
+        batch_size : int, default None
+            Number of monitors yielded together, None yields single objects
+
+        lazy_events : bool, default False
+            If True event data is memory-mapped or read from disk in chunks
+
+        monitors : str, pattern or list of these, default None
+            Only matching monitors are loaded, see load_data
+
+        dtypes : str or dict, default None
+            Dtypes of the loaded arrays, see load_data
 
-def load_metadata(data_folder_name):
+        sparse : bool or float, default None
+            Sparse storage of 2D monitors, see load_data
+    """
+    if not os.path.isdir(foldername):
+        raise RuntimeError("Could not find specified foldername for"
+                           + "iter_data:" + str(foldername))
+
+    return managed_mcrun.iter_results(foldername, batch_size=batch_size,
+                                      lazy_events=lazy_events,
+                                      monitors=monitors, dtypes=dtypes,
+                                      sparse=sparse)
+
+def load_totals(foldernames, monitors=None, workers=1):
+    """
+    Loads total I, E and N of each monitor for one or many data folders
+
+    Only the simulation metadata is read, so this is much faster than
+    load_data when just the totals are needed. Returns a TotalsTable with
+    the totals as an array of runs by monitors by (I, E, N) and the
+    instrument parameters of each run.
+
+    Parameters
+    ----------
+        foldernames : string or list of strings
+            Data folders to read
+
+        monitors : str, pattern or list of these, default None
+            Only matching monitors are included, see load_data
+
+        workers : int or None, default 1
+            Number of threads reading folders, None uses cpu count
+    """
+    return managed_mcrun.load_totals(foldernames, monitors=monitors,
+                                     workers=workers)
+
+def save_data(data, filename, compression="gzip"):
+    """
+    Saves list of McStasData objects in a HDF5 results archive
+
+    The archive includes metadata and plot options and is read with
+    load_data, which is much faster than reading the McStas output.
+
+    Parameters
+    ----------
+        data : list of McStasData objects
+            Data to save
+
+        filename : string
+            Name of archive file, an existing file is overwritten
+
+        compression : string or None, default "gzip"
+            Compression of the arrays, "gzip", "lzf" or None. Arrays saved
+            without compression are memory-mapped when loaded.
+    """
+    archive.write_results(data, filename, compression=compression)
+
+def load_metadata(data_folder_name, monitors=None):
     """
     Function that loads metadata from a mcstas simulation
 
@@ -112,10 +237,13 @@ def load_metadata(data_folder_name):
 
     first argument : str
         path to folder from which metadata should be loaded
+
+    monitors : str, pattern or list of these, default None
+        Only metadata for matching monitors is returned, see load_data
     """
-    return managed_mcrun.load_metadata(data_folder_name)
+    return managed_mcrun.load_metadata(data_folder_name, monitors=monitors)
 
-def load_monitor(metadata, data_folder_name):
+def load_monitor(metadata, data_folder_name, dtypes=None):
     """
     Function that loads data given metadata and name of data folder
 
@@ -129,8 +257,12 @@ def load_monitor(metadata, data_folder_name):
 
     data_folder_name : str
         path to folder from which metadata should be loaded
+
+    dtypes : str or dict, default None
+        Dtypes of the loaded arrays, see load_data
     """
-    return managed_mcrun.load_monitor(metadata, data_folder_name)
+    return managed_mcrun.load_monitor(metadata, data_folder_name,
+                                      dtypes=dtypes)
 
 
 class Configurator:
@@ -14,6 +14,8 @@ from libpyvinyl.Parameters.Collections import CalculatorParameters
 
 from mcstasscript.data.pyvinylData import pyvinylMcStasData, pyvinylMCPLData
 from mcstasscript.data.MCPLDataFormat import MCPLDataFormat
+from mcstasscript.data.dtypes import resolve_dtypes
+from mcstasscript.data.sparse import resolve_sparse
 
 from mcstasscript.helper.mcstas_objects import DeclareVariable
 from mcstasscript.helper.mcstas_objects import provide_parameter
@@ -22,6 +24,8 @@ from mcstasscript.helper.mcstas_objects import Component
 
 from mcstasscript.helper.component_reader import ComponentReader
 from mcstasscript.helper.managed_mcrun import ManagedMcrun
+from mcstasscript.helper.managed_mcrun import monitor_matcher
+from mcstasscript.helper.run_catalogue import RunCatalogue
 from mcstasscript.helper.formatting import is_legal_filename
 from mcstasscript.helper.formatting import bcolors
 from mcstasscript.helper.unpickler import CustomMcStasUnpickler, CustomMcXtraceUnpickler
@@ -2347,7 +2351,9 @@ class McCode_instr(BaseCalculator):
                  increment_folder_name=None, custom_flags=None,
                  executable=None, executable_path=None,
                  suppress_output=None, gravity=None, checks=None,
-                 openacc=None, NeXus=None, save_comp_pars=None):
+                 openacc=None, NeXus=None, save_comp_pars=None,
+                 load_workers=None, monitors="not_set", catalogue="not_set",
+                 dtypes=None, sparse=None):
         """
         Sets settings for McStas run performed with backengine
 
@@ -2386,6 +2392,19 @@ class McCode_instr(BaseCalculator):
                 If True, adds --format=NeXus to mcrun call
             save_comp_pars : bool
                 If True, McStas run writes all comp pars to disk
+            load_workers : int
+                Number of workers used to load monitor files, default 1
+            monitors : str, pattern or list of these
+                Only matching monitors are loaded, None loads all (default)
+            catalogue : str
+                Path of RunCatalogue file updated after each run, None to
+                disable (default)
+            dtypes : str or dict
+                Dtypes of loaded data, "float64" or "compact", default
+                set with set_default_dtypes
+            sparse : bool or float
+                True stores mostly empty 2D monitors sparse, a number sets
+                the largest fill fraction stored sparse
         """
 
         settings = {}
@@ -2455,6 +2474,32 @@ class McCode_instr(BaseCalculator):
         if save_comp_pars is not None:
             settings["save_comp_pars"] = bool(save_comp_pars)
 
+        if load_workers is not None:
+            if not isinstance(load_workers, int) or load_workers < 1:
+                raise ValueError("load_workers must be a positive integer.")
+            settings["load_workers"] = load_workers
+
+        if monitors != "not_set":  # None is a legal value for monitors
+            if monitors is not None:
+                # Check the given names and patterns can be used
+                monitor_matcher(monitors)
+            settings["monitors"] = monitors
+
+        if catalogue != "not_set":  # None disables the catalogue
+            if catalogue is not None:
+                catalogue = str(catalogue)
+            settings["catalogue"] = catalogue
+
+        if dtypes is not None:
+            # Check the preset or dict of dtypes can be used
+            resolve_dtypes(dtypes)
+            settings["dtypes"] = dtypes
+
+        if sparse is not None:
+            # Check the fill fraction can be used
+            resolve_sparse(sparse)
+            settings["sparse"] = sparse
+
         self._run_settings.update(settings)
 
     def settings_string(self):
@@ -2538,6 +2583,31 @@ class McCode_instr(BaseCalculator):
             description += "  save_comp_pars:".ljust(variable_space)
             description += str(value) + "\n"
 
+        if "load_workers" in self._run_settings:
+            value = self._run_settings["load_workers"]
+            description += "  load_workers:".ljust(variable_space)
+            description += str(value) + "\n"
+
+        if "monitors" in self._run_settings:
+            value = self._run_settings["monitors"]
+            description += "  monitors:".ljust(variable_space)
+            description += str(value) + "\n"
+
+        if "dtypes" in self._run_settings:
+            value = self._run_settings["dtypes"]
+            description += "  dtypes:".ljust(variable_space)
+            description += str(value) + "\n"
+
+        if "sparse" in self._run_settings:
+            value = self._run_settings["sparse"]
+            description += "  sparse:".ljust(variable_space)
+            description += str(value) + "\n"
+
+        if self._run_settings.get("catalogue") is not None:
+            value = self._run_settings["catalogue"]
+            description += "  catalogue:".ljust(variable_space)
+            description += str(value) + "\n"
+
         return description.strip()
 
     def show_settings(self):
@@ -2546,13 +2616,29 @@ class McCode_instr(BaseCalculator):
         """
         print(self.settings_string())
 
-    def backengine(self):
+    def backengine(self, stream=False, batch_size=None):
         """
         Runs instrument with McStas / McXtrace, saves data in data attribute
 
         This method will write the instrument to disk and then run it using
         the mcrun command of the system. Settings are set using settings
         method.
+
+        With stream the results are not loaded at once, instead an
+        iterator yielding the McStasData objects as they are read is
+        returned, see iter_results. The data is then not stored in the
+        output of the instrument, which is reset. Only the metadata is
+        read before returning, so errors reading the monitor data of a
+        failed simulation are raised while iterating.
+
+        Parameters
+        ----------
+        stream : bool, default False
+            If True an iterator over the results is returned
+
+        batch_size : int, optional
+            With stream, number of monitors yielded together in a
+            McStasDataList, default yields single McStasData objects
         """
 
         self.__add_input_to_mcpl()
@@ -2579,21 +2665,27 @@ class McCode_instr(BaseCalculator):
         # Run the simulation and return data
         simulation.run_simulation()
 
+        if simulation.simulation_wrote_data:
+            self.__add_run_to_catalogue(simulation)
+
         if simulation.simulation_succeeded:
             # Good return code and data generated
-            return self.__handle_simulation_output(simulation)
+            return self.__handle_simulation_output(simulation, stream,
+                                                   batch_size)
         elif simulation.simulation_wrote_data:
             # Something went wrong, in some cases data can still be read
             try:
                 #  Attempt to read the data
-                return self.__handle_simulation_output(simulation)
+                return self.__handle_simulation_output(simulation, stream,
+                                                       batch_size)
             except:
                 # If data could not be read, acknowledge failure (run_simulation will print errors)
                 raise ValueError("Simulation failed and it was not possible to read results")
         else:
             raise ValueError("Simulation failed and no data was written to disk")
 
-    def __handle_simulation_output(self, simulation):
+    def __handle_simulation_output(self, simulation, stream=False,
+                                   batch_size=None):
         """
         Reads simulation data, stores it according to libpyvinyl convention
 
@@ -2601,6 +2693,13 @@ class McCode_instr(BaseCalculator):
         ----------
         output_path : ManagedMcrun object
                 Simulation that has been executed
+
+        stream : bool, default False
+                If True an iterator over the results is returned and the
+                data stored in the output is reset
+
+        batch_size : int, optional
+                Number of monitors in each batch yielded when streaming
         """
 
         if not simulation.simulation_performed:
@@ -2609,13 +2708,19 @@ class McCode_instr(BaseCalculator):
         ## look for MCPL_output components and the defined filenames
         self.__add_mcpl_to_output(simulation)
 
-        # simulation results from .dat files loaded as dict
-        data = simulation.load_results()
-        data_dict = {"data": data}
-        # adding to the libpyvinyl output datacollection with key = sim_data_key
         sim_data_key = self.output_keys[0]
         output_data = self.output[sim_data_key]
-        output_data.set_dict(data_dict)
+        if stream:
+            # Metadata is read here, monitors as the iterator is used
+            results = simulation.iter_results(batch_size=batch_size)
+            # Data of earlier runs should not be mistaken for this run
+            output_data.set_dict({"data": None})
+        else:
+            # simulation results from .dat files loaded as dict
+            data = simulation.load_results()
+            data_dict = {"data": data}
+            # adding to the libpyvinyl output datacollection with key = sim_data_key
+            output_data.set_dict(data_dict)
 
         if self.run_to_ref is not None:
             filename = self.parameters.parameters["run_to_mcpl"].value
@@ -2632,12 +2737,38 @@ class McCode_instr(BaseCalculator):
             if out is None:
                 print("Expected MCPL file was not loaded!")
 
+        if stream:
+            return results
+
         if "data" not in self.output[sim_data_key].get_data():
             print("\n\nNo data returned.")
             return None
         else:
             return self.output[sim_data_key].get_data()["data"]
 
+    def __add_run_to_catalogue(self, simulation):
+        """
+        Adds output folder of simulation to the catalogue if one is set
+
+        Failing to update the catalogue gives a warning, the results of
+        the run are still returned.
+
+        Parameters
+        ----------
+        simulation : ManagedMcrun object
+                Simulation that has been executed
+        """
+        catalogue_path = self._run_settings.get("catalogue")
+        if catalogue_path is None:
+            return
+
+        try:
+            with RunCatalogue(catalogue_path) as catalogue:
+                catalogue.add_run(simulation.data_folder_name)
+        except Exception as error:
+            warnings.warn("Could not add run to catalogue "
+                          + str(catalogue_path) + ": " + str(error))
+
     def __add_input_to_mcpl(self):
         try:
             mcpl_file = self.input["mcpl"].filename
@@ -2115,6 +2115,56 @@ class TestMcStas_instr(unittest.TestCase):
 
 
 
+    def test_settings_monitors(self):
+        """
+        Monitors to load are stored in settings and passed to ManagedMcrun
+        """
+
+        instr = setup_populated_instr_with_dummy_path()
+
+        instr.settings(monitors=["PSD", "L_*"])
+        self.assertEqual(instr._run_settings["monitors"], ["PSD", "L_*"])
+        self.assertIn("monitors:", instr.settings_string())
+
+        # Other settings do not reset monitors
+        instr.settings(ncount=100)
+        self.assertEqual(instr._run_settings["monitors"], ["PSD", "L_*"])
+
+        instr.settings(monitors=None)
+        self.assertIsNone(instr._run_settings["monitors"])
+
+        with self.assertRaises(TypeError):
+            instr.settings(monitors=[5])
+
+    def test_settings_dtypes(self):
+        """
+        Dtypes of loaded data are checked and stored in settings
+        """
+
+        instr = setup_populated_instr_with_dummy_path()
+
+        instr.settings(dtypes="compact")
+        self.assertEqual(instr._run_settings["dtypes"], "compact")
+        self.assertIn("dtypes:", instr.settings_string())
+
+        with self.assertRaises(ValueError):
+            instr.settings(dtypes="tiny")
+
+    def test_settings_catalogue(self):
+        """
+        Catalogue path is stored in settings and can be disabled with None
+        """
+
+        instr = setup_populated_instr_with_dummy_path()
+
+        instr.settings(catalogue="runs.db")
+        self.assertEqual(instr._run_settings["catalogue"], "runs.db")
+        self.assertIn("catalogue:", instr.settings_string())
+
+        instr.settings(catalogue=None)
+        self.assertIsNone(instr._run_settings["catalogue"])
+        self.assertNotIn("catalogue:", instr.settings_string())
+
     @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
     @unittest.mock.patch("subprocess.run")
     def test_run_backengine_basic(self, mock_sub, mock_stdout):
@@ -2163,6 +2213,38 @@ class TestMcStas_instr(unittest.TestCase):
                                     universal_newlines=True,
                                     cwd=run_path)
 
+    @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
+    @unittest.mock.patch("subprocess.run")
+    def test_run_backengine_stream_resets_output(self, mock_sub, mock_stdout):
+        """
+        Test streaming returns the iterator and resets the stored output
+        """
+
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        executable_path = os.path.join(THIS_DIR, "dummy_mcstas")
+
+        with WorkInTestDir() as handler:
+            instr = setup_populated_instr_with_dummy_path()
+
+            instr.set_parameters({"theta": 1})
+            instr.settings(output_path="folder_name_which_is_unused",
+                           increment_folder_name=True,
+                           executable_path=executable_path)
+            with unittest.mock.patch("os.path.isdir", side_effect=mock_isdir):
+                with unittest.mock.patch.object(ManagedMcrun, "load_results",
+                                                return_value=["first run"]):
+                    data = instr.backengine()
+
+                stream = iter(["second run"])
+                with unittest.mock.patch.object(ManagedMcrun, "iter_results",
+                                                return_value=stream):
+                    results = instr.backengine(stream=True)
+
+        self.assertEqual(data, ["first run"])
+        self.assertIs(results, stream)
+        output = instr.output[instr.output_keys[0]]
+        self.assertIsNone(output.get_data()["data"])
+
     @unittest.mock.patch("sys.stdout", new_callable=io.StringIO)
     @unittest.mock.patch("subprocess.run")
     def test_run_backengine_complex_settings(self, mock_sub, mock_stdout):
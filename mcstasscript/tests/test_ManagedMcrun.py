@@ -1,13 +1,71 @@
 import os
+import re
+import shutil
+import tempfile
 import unittest
 import unittest.mock
 
+import h5py
+import numpy as np
+
 from mcstasscript.helper.managed_mcrun import ManagedMcrun
+from mcstasscript.helper.managed_mcrun import iter_results
 from mcstasscript.helper.managed_mcrun import load_results
 from mcstasscript.helper.managed_mcrun import load_metadata
 from mcstasscript.helper.managed_mcrun import load_monitor
+from mcstasscript.helper.managed_mcrun import load_monitors
+from mcstasscript.helper.managed_mcrun import load_results_nexus
+from mcstasscript.helper.managed_mcrun import load_totals
+from mcstasscript.helper.managed_mcrun import load_text_events
+from mcstasscript.helper.managed_mcrun import load_binary_events
+from mcstasscript.helper.managed_mcrun import read_nexus_dataset
+from mcstasscript.data.data import McStasDataEvent
 from mcstasscript.tests.helpers_for_tests import WorkInTestDir
 
+def write_nexus_data_set(data_folder, data_list, copies=1):
+    """
+    Writes mccode.h5 with the given datasets in McStas NeXus layout
+
+    Each dataset is written copies times with a numbered field name
+    """
+    with h5py.File(os.path.join(data_folder, "mccode.h5"), "w") as f:
+        param = f.create_group("entry1/simulation/Param")
+        param.attrs["wavelength"] = "5.0"
+        data_group = f.create_group("entry1/data")
+
+        for copy_index in range(copies):
+            for data in data_list:
+                field = data.name + "_" + str(copy_index)
+                group = data_group.create_group(field)
+                for key, value in data.metadata.info.items():
+                    if isinstance(value, str):
+                        group.attrs[key] = value
+                group.attrs["component"] = field
+
+                if data.data_type == "Events":
+                    group["events"] = data.Events
+                    continue
+
+                transpose = np.transpose if data.Intensity.ndim == 2 else np.asarray
+                group["data"] = transpose(data.Intensity)
+                group["errors"] = transpose(data.Error)
+                group["ncount"] = transpose(data.Ncount)
+                if data.Intensity.ndim == 1:
+                    x_field = re.sub(r'[^a-zA-Z]', "_", data.metadata.xlabel)
+                    group[x_field] = data.xaxis
+
+
+def file_is_closed(filename):
+    """
+    Returns True if the HDF5 file is not open for reading in this process
+    """
+    try:
+        with h5py.File(filename, "r+"):
+            return True
+    except OSError:
+        return False
+
+
 class TestManagedMcrun(unittest.TestCase):
     """
     Testing the ManagedMcrun class that sets up McStas runs, runs the
@@ -884,5 +942,566 @@ class Test_load_functions(unittest.TestCase):
         self.assertEqual(monitor.Intensity[53], 6.990299315e-06)
         self.assertEqual(monitor.Error[53], 6.215308587e-08)
 
+    def test_mcrun_load_data_threads(self):
+        """
+        Loading with a thread pool gives same results in same order
+        """
+
+        with WorkInTestDir() as handler:
+            serial = load_results("test_data_set")
+            threaded = load_results("test_data_set", workers=4)
+
+        self.assertEqual([x.name for x in serial], [x.name for x in threaded])
+        for serial_data, threaded_data in zip(serial[:3], threaded[:3]):
+            self.assertTrue(np.array_equal(serial_data.Intensity,
+                                           threaded_data.Intensity))
+        self.assertTrue(np.array_equal(serial[3].Events, threaded[3].Events))
+        self.assertEqual(threaded[0].get_data_location(), "test_data_set")
+
+    def test_mcrun_load_monitors_processes(self):
+        """
+        Loading with a process pool gives same results in same order
+        """
+
+        with WorkInTestDir() as handler:
+            metadata = load_metadata("test_data_set")
+            monitors = load_monitors(metadata, "test_data_set",
+                                     workers=2, use_processes=True)
+
+        self.assertEqual([x.name for x in monitors],
+                         ["PSD_4PI", "PSD", "L_mon", "monitor"])
+        self.assertEqual(monitors[2].Ncount[53], 37111)
+        self.assertEqual(monitors[0].Intensity[4][1], 1.537334562E-10)
+
+    def test_mcrun_load_data_selected_monitors(self):
+        """
+        Only monitors matching given names or patterns are loaded
+        """
+
+        with WorkInTestDir() as handler:
+            by_name = load_results("test_data_set", monitors=["L_mon", "PSD"])
+            by_glob = load_results("test_data_set", monitors="PSD*")
+            by_regex = load_results("test_data_set",
+                                    monitors=[re.compile(r"L_.*"), "monitor"])
+            by_filename = load_metadata("test_data_set", monitors="PSD.dat")
+            none = load_results("test_data_set", monitors="missing")
+
+        # Order of the metadata is kept
+        self.assertEqual([x.name for x in by_name], ["PSD", "L_mon"])
+        self.assertEqual([x.name for x in by_glob], ["PSD_4PI", "PSD"])
+        self.assertEqual([x.name for x in by_regex], ["L_mon", "monitor"])
+        self.assertEqual([x.component_name for x in by_filename], ["PSD"])
+        self.assertEqual(none, [])
+        self.assertEqual(by_name[1].Ncount[53], 37111)
+
+    def test_mcrun_load_data_selected_monitors_invalid(self):
+        """
+        Monitors given as other types than str or patterns raise TypeError
+        """
+
+        with WorkInTestDir() as handler:
+            with self.assertRaises(TypeError):
+                load_results("test_data_set", monitors=[3])
+
+    def test_ManagedMcrun_load_data_selected_monitors(self):
+        """
+        Monitors given at initialization are used by load_results
+        """
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        executable_path = os.path.join(THIS_DIR, "dummy_mcstas")
+
+        with WorkInTestDir() as handler:
+            mcrun_obj = ManagedMcrun("test.instr",
+                                     output_path="test_data_set",
+                                     executable_path=executable_path,
+                                     executable="mcrun",
+                                     monitors=["PSD_4PI", "monitor"])
+
+            selected = mcrun_obj.load_results()
+            everything = mcrun_obj.load_results(monitors=None)
+            streamed = list(mcrun_obj.iter_results())
+
+        self.assertEqual([x.name for x in selected], ["PSD_4PI", "monitor"])
+        self.assertEqual(len(everything), 4)
+        self.assertEqual([x.name for x in streamed], ["PSD_4PI", "monitor"])
+
+    def test_mcrun_load_data_compact_dtypes(self):
+        """
+        Compact dtypes give float32 arrays and integer Ncount
+        """
+
+        with WorkInTestDir() as handler:
+            full = load_results("test_data_set")
+            compact = load_results("test_data_set", dtypes="compact")
+            threaded = load_results("test_data_set", dtypes="compact",
+                                    workers=2)
+
+        for full_data, compact_data in zip(full[:3], compact[:3]):
+            self.assertEqual(compact_data.Intensity.dtype, np.float32)
+            self.assertEqual(compact_data.Error.dtype, np.float32)
+            self.assertEqual(compact_data.Ncount.dtype.kind, "u")
+            self.assertTrue(np.allclose(compact_data.Intensity,
+                                        full_data.Intensity, rtol=1E-6))
+            self.assertTrue(np.array_equal(compact_data.Ncount,
+                                           full_data.Ncount))
+
+        self.assertEqual(compact[3].Events.dtype, np.float32)
+        self.assertEqual(threaded[3].Events.dtype, np.float32)
+        self.assertEqual(compact[3].metadata.total_I,
+                         full[3].metadata.total_I)
+
+        with WorkInTestDir() as handler:
+            with self.assertRaises(ValueError):
+                load_results("test_data_set", dtypes="tiny")
+
+    def test_mcrun_load_data_lazy_events(self):
+        """
+        Event data is memory-mapped from a binary copy with lazy_events
+        """
+
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data_folder = os.path.join(temp_dir, "test_data_set")
+            shutil.copytree(os.path.join(THIS_DIR, "test_data_set"), data_folder)
+
+            in_memory = load_results(data_folder)[3]
+            lazy = load_results(data_folder, lazy_events=True)[3]
+            self.assertIsInstance(lazy.Events, np.memmap)
+            cache_name = os.path.join(data_folder,
+                                      "event_dat_list.p.x.y.z.vx.vy.vz.t.npy")
+            self.assertTrue(os.path.isfile(cache_name))
+
+            # Second load uses the binary copy
+            reloaded = load_results(data_folder, lazy_events=True)[3]
+            self.assertTrue(np.array_equal(reloaded.Events, in_memory.Events))
+            self.assertEqual(reloaded.metadata.total_N, 12000)
+            del lazy, reloaded
+
+    def test_mcrun_load_monitor_lazy_nexus_closes_file(self):
+        """
+        Lazy NeXus events keep mccode.h5 open only while they are used
+        """
+
+        with WorkInTestDir() as handler:
+            text_data = load_results("test_data_set")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_nexus_data_set(temp_dir, text_data)
+            nexus_file = os.path.join(temp_dir, "mccode.h5")
+            metadata_list = load_metadata(temp_dir)
+
+            binned = load_monitor(metadata_list[0], temp_dir,
+                                  lazy_events=True)
+            self.assertTrue(file_is_closed(nexus_file))
+
+            event_metadata = [metadata for metadata in metadata_list
+                              if metadata.component_name == "monitor_0"][0]
+            lazy = load_monitor(event_metadata, temp_dir, lazy_events=True)
+            self.assertIsInstance(lazy.Events, h5py.Dataset)
+            self.assertFalse(file_is_closed(nexus_file))
+            self.assertTrue(np.array_equal(lazy.Events[:10],
+                                           text_data[3].Events[:10]))
+
+            del lazy
+            self.assertTrue(file_is_closed(nexus_file))
+            del binned
+
+    def test_mcrun_load_lazy_nexus_batch_closes_file(self):
+        """
+        Batch loaders close mccode.h5 unless an event dataset is returned
+        """
+
+        with WorkInTestDir() as handler:
+            text_data = load_results("test_data_set")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_nexus_data_set(temp_dir, text_data)
+            nexus_file = os.path.join(temp_dir, "mccode.h5")
+
+            binned = load_results_nexus(temp_dir, monitors="PSD*",
+                                        lazy_events=True)
+            self.assertEqual(len(binned), 2)
+            self.assertTrue(file_is_closed(nexus_file))
+
+            metadata_list = load_metadata(temp_dir, monitors="L_mon*")
+            binned = load_monitors(metadata_list, temp_dir, lazy_events=True)
+            self.assertEqual(len(binned), 1)
+            self.assertTrue(file_is_closed(nexus_file))
+
+            results = load_results_nexus(temp_dir, lazy_events=True)
+            events = [result.Events for result in results
+                      if result.name == "monitor_0"][0]
+            self.assertIsInstance(events, h5py.Dataset)
+            del results
+            self.assertFalse(file_is_closed(nexus_file))
+            self.assertEqual(events.shape, text_data[3].Events.shape)
+            del events
+            self.assertTrue(file_is_closed(nexus_file))
+
+            results = load_monitors(load_metadata(temp_dir), temp_dir,
+                                    lazy_events=True)
+            self.assertFalse(file_is_closed(nexus_file))
+            del results
+            self.assertTrue(file_is_closed(nexus_file))
+
+    def test_mcrun_load_events_fortran_order(self):
+        """
+        Event loaders fill Fortran-ordered arrays the dataset keeps as is
+        """
+
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        event_name = "event_dat_list.p.x.y.z.vx.vy.vz.t"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data_folder = os.path.join(temp_dir, "test_data_set")
+            shutil.copytree(os.path.join(THIS_DIR, "test_data_set"), data_folder)
+            event_file = os.path.join(data_folder, event_name)
+            expected = np.loadtxt(event_file)
+
+            # Small blocks and a too low event count in the header
+            event_metadata = load_metadata(data_folder)[3]
+            event_metadata.dimension = [8, 5000]
+            with unittest.mock.patch(
+                    "mcstasscript.helper.managed_mcrun.EVENT_BLOCK_ROWS", 700):
+                events = load_text_events(event_file, event_metadata)
+            self.assertTrue(events.flags.f_contiguous)
+            self.assertTrue(np.array_equal(events, expected))
+
+            text_data = load_results(data_folder)
+            self.assertTrue(text_data[3].Events.flags.f_contiguous)
+            self.assertTrue(np.array_equal(text_data[3].Events, expected))
+
+            event_metadata = load_metadata(data_folder)[3]
+            events = load_text_events(event_file, event_metadata)
+            self.assertIs(McStasDataEvent(event_metadata, events).Events,
+                          events)
+
+            write_nexus_data_set(data_folder, text_data)
+            with h5py.File(os.path.join(data_folder, "mccode.h5"), "r") as f:
+                dataset = f["entry1/data/monitor_0/events"]
+                with unittest.mock.patch(
+                        "mcstasscript.helper.managed_mcrun.EVENT_BLOCK_ROWS",
+                        700):
+                    events = read_nexus_dataset(dataset, order="F")
+            self.assertTrue(events.flags.f_contiguous)
+            self.assertTrue(np.array_equal(events, expected))
+            self.assertIs(McStasDataEvent(event_metadata, events).Events,
+                          events)
+            os.remove(os.path.join(data_folder, "mccode.h5"))
+
+            with open(event_file, "rb") as f:
+                header = b"".join(line for line in f if line.startswith(b"#"))
+            with open(event_file, "wb") as f:
+                f.write(header)
+                f.write(expected.tobytes())
+
+            events = load_binary_events(event_file, event_metadata)
+            self.assertTrue(events.flags.f_contiguous)
+            self.assertTrue(np.array_equal(events, expected))
+            self.assertIs(McStasDataEvent(event_metadata, events).Events,
+                          events)
+
+    def test_mcrun_load_data_binary_events(self):
+        """
+        Binary event lists after a text header are read with their layout
+        """
+
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        event_name = "event_dat_list.p.x.y.z.vx.vy.vz.t"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data_folder = os.path.join(temp_dir, "test_data_set")
+            shutil.copytree(os.path.join(THIS_DIR, "test_data_set"), data_folder)
+            text_events = load_results(data_folder)[3].Events
+
+            event_file = os.path.join(data_folder, event_name)
+            with open(event_file, "rb") as f:
+                header = b"".join(line for line in f if line.startswith(b"#"))
+
+            for dtype in [np.float32, np.float64]:
+                with open(event_file, "wb") as f:
+                    f.write(header)
+                    f.write(np.ascontiguousarray(text_events, dtype=dtype).tobytes())
+
+                events = load_results(data_folder)[3]
+                self.assertEqual(events.Events.shape, (12000, 8))
+                self.assertTrue(np.allclose(events.Events, text_events,
+                                            rtol=1E-6))
+                self.assertEqual(events.metadata.total_N, 12000)
+
+                lazy = load_results(data_folder, lazy_events=True)[3]
+                self.assertIsInstance(lazy.Events, np.memmap)
+                self.assertEqual(lazy.Events.dtype, dtype)
+                self.assertFalse(os.path.isfile(event_file + ".npy"))
+                del lazy
+
+    def test_mcrun_load_results_nexus(self):
+        """
+        NeXus data is read into arrays matching the text data
+        """
+
+        with WorkInTestDir() as handler:
+            text_data = load_results("test_data_set")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_nexus_data_set(temp_dir, text_data)
+            results = load_results(temp_dir)
+
+        # Groups are listed alphabetically in the NeXus file
+        results = {x.name: x for x in results}
+        self.assertEqual(sorted(results),
+                         sorted(x.name + "_0" for x in text_data))
+        for text in text_data[:3]:
+            nexus = results[text.name + "_0"]
+            self.assertTrue(np.array_equal(text.Intensity, nexus.Intensity))
+            self.assertTrue(np.array_equal(text.Ncount, nexus.Ncount))
+        self.assertTrue(np.array_equal(text_data[2].xaxis,
+                                       results["L_mon_0"].xaxis))
+        self.assertTrue(np.array_equal(text_data[3].Events,
+                                       results["monitor_0"].Events))
+        nexus = results["PSD_0"]
+        self.assertEqual(nexus.metadata.parameters["wavelength"], 5.0)
+        self.assertEqual(nexus.get_data_location(), temp_dir)
+
+    def test_mcrun_load_results_nexus_selected_monitors(self):
+        """
+        Only selected monitors are loaded from a file with many monitors
+        """
+
+        with WorkInTestDir() as handler:
+            text_data = load_results("test_data_set")[:3]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_nexus_data_set(temp_dir, text_data, copies=200)
+            self.assertEqual(len(load_results(temp_dir)), 600)
+
+            results = load_results_nexus(temp_dir,
+                                         monitors=["L_mon_7", "PSD_150"])
+            pattern = load_results(temp_dir, monitors=["PSD_4PI_1?"])
+            by_filename = load_results(temp_dir, monitors="PSD_4PI.dat")
+
+            metadata = load_metadata(temp_dir)
+            batch = load_monitors(metadata[:6], temp_dir, workers=2,
+                                  use_processes=True)
+
+        self.assertEqual([x.name for x in results], ["L_mon_7", "PSD_150"])
+        self.assertTrue(np.array_equal(results[0].Intensity,
+                                       text_data[2].Intensity))
+        self.assertTrue(np.array_equal(results[1].Intensity,
+                                       text_data[1].Intensity))
+        self.assertEqual(sorted(x.name for x in pattern),
+                         ["PSD_4PI_1" + str(i) for i in range(10)])
+        self.assertEqual([x.name for x in batch],
+                         [x.component_name for x in metadata[:6]])
+
+        # Same selection by filename as for text output
+        self.assertEqual(len(by_filename), 200)
+        self.assertTrue(all(x.metadata.filename == "PSD_4PI.dat"
+                            for x in by_filename))
+
+    def test_mcrun_iter_results(self):
+        """
+        Monitors are yielded one by one or in batches in metadata order
+        """
+
+        with WorkInTestDir() as handler:
+            loaded = load_results("test_data_set")
+            iterator = iter_results("test_data_set")
+            first = next(iterator)
+            rest = list(iterator)
+            batches = list(iter_results("test_data_set", batch_size=3,
+                                        monitors=["PSD*", "L_mon"]))
+
+            with self.assertRaises(NameError):
+                iter_results("missing_folder")
+            with self.assertRaises(ValueError):
+                iter_results("test_data_set", batch_size=0)
+
+        streamed = [first] + rest
+        self.assertEqual([x.name for x in streamed], [x.name for x in loaded])
+        self.assertTrue(np.array_equal(first.Intensity, loaded[0].Intensity))
+        self.assertTrue(np.array_equal(streamed[3].Events, loaded[3].Events))
+        self.assertEqual(first.get_data_location(), "test_data_set")
+
+        self.assertEqual([len(batch) for batch in batches], [3])
+        self.assertEqual(batches[0]["L_mon"].Ncount[53], 37111)
+
+    def test_mcrun_iter_results_nexus(self):
+        """
+        mccode.h5 is kept open while iterating and closed at the end
+        """
+
+        with WorkInTestDir() as handler:
+            text_data = load_results("test_data_set")[:3]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_nexus_data_set(temp_dir, text_data, copies=2)
+            batches = iter_results(temp_dir, batch_size=4)
+            first = next(batches)
+            names = [x.name for x in first]
+            names += [x.name for batch in batches for x in batch]
+
+            # File is closed, so it can be opened for writing
+            with h5py.File(os.path.join(temp_dir, "mccode.h5"), "a"):
+                pass
+
+        self.assertEqual(len(first), 4)
+        self.assertEqual(sorted(names),
+                         sorted(x.name + "_" + str(copy)
+                                for x in text_data for copy in range(2)))
+        self.assertTrue(np.array_equal(first["L_mon_0"].Intensity,
+                                       text_data[2].Intensity))
+
+    def test_mcrun_iter_results_lazy_nexus(self):
+        """
+        Lazy iteration closes mccode.h5 unless event datasets are kept
+        """
+
+        with WorkInTestDir() as handler:
+            text_data = load_results("test_data_set")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_nexus_data_set(temp_dir, text_data)
+            nexus_file = os.path.join(temp_dir, "mccode.h5")
+
+            names = [x.name for x in iter_results(temp_dir, monitors="PSD*",
+                                                  lazy_events=True)]
+            self.assertEqual(names, ["PSD_0", "PSD_4PI_0"])
+            self.assertTrue(file_is_closed(nexus_file))
+
+            events = [x for x in iter_results(temp_dir, lazy_events=True)
+                      if x.data_type == "Events"]
+            self.assertIsInstance(events[0].Events, h5py.Dataset)
+            self.assertFalse(file_is_closed(nexus_file))
+            del events
+            self.assertTrue(file_is_closed(nexus_file))
+
+    def test_mcrun_iter_results_reads_metadata(self):
+        """
+        Metadata is read when the iterator is made, so errors raise there
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, "mccode.h5"), "w") as f:
+                f.write("not a NeXus file")
+
+            with self.assertRaises(OSError):
+                iter_results(temp_dir)
+
+    def test_mcrun_load_totals(self):
+        """
+        Totals are read from mccode.sim without the data files
+        """
+
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        source = os.path.join(THIS_DIR, "test_data_set", "mccode.sim")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folders = []
+            for index in range(6):
+                folder = os.path.join(temp_dir, "run_" + str(index))
+                os.mkdir(folder)
+                with open(source, "r") as f:
+                    sim_text = f.read()
+                sim_text = sim_text.replace("Param: wavelength=1",
+                                            "Param: wavelength=" + str(index))
+                with open(os.path.join(folder, "mccode.sim"), "w") as f:
+                    f.write(sim_text)
+                folders.append(folder)
+
+            totals = load_totals(folders, workers=3)
+            selected = load_totals(folders[0], monitors="PSD*")
+
+        self.assertEqual(totals.folders, folders)
+        self.assertEqual(totals.monitors, ["PSD_4PI", "PSD", "L_mon", "monitor"])
+        self.assertEqual(totals.values.shape, (6, 4, 3))
+        self.assertTrue(np.array_equal(totals.parameters["wavelength"],
+                                       np.arange(6.0)))
+        self.assertTrue(np.all(totals.I[:, 0] == 0.000465664))
+        self.assertTrue(np.all(totals.monitor("L_mon")[:, 2] == 2.23517e+06))
+        self.assertEqual(len(totals.select(totals.parameters["wavelength"] > 3)),
+                         2)
+
+        self.assertEqual(selected.monitors, ["PSD_4PI", "PSD"])
+        self.assertEqual(selected.E[0, 1], 4.37886e-07)
+
+    def test_mcrun_load_totals_repeated_component(self):
+        """
+        Outputs of the same component are kept as columns named by filename
+        """
+
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(THIS_DIR, "test_data_set", "mccode.sim")) as f:
+            sim_text = f.read()
+
+        section = [part for part in sim_text.split("begin data")
+                   if "component: PSD\n" in part][0]
+        section = "begin data" + section
+        section = section.replace("filename: PSD.dat", "filename: PSD_y.dat")
+        section = section.replace("values: 0.000387878", "values: 0.5")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, "mccode.sim"), "w") as f:
+                f.write(sim_text + "\n" + section)
+
+            totals = load_totals(temp_dir)
+            selected = load_totals(temp_dir, monitors="PSD")
+
+        self.assertEqual(totals.monitors, ["PSD_4PI", "PSD.dat", "L_mon",
+                                           "monitor", "PSD_y.dat"])
+        self.assertEqual(totals.monitor("PSD.dat")[0, 0], 0.000387878)
+        self.assertEqual(totals.monitor("PSD_y.dat")[0, 0], 0.5)
+        self.assertEqual(selected.monitors, ["PSD.dat", "PSD_y.dat"])
+
+    def test_mcrun_load_totals_filename(self):
+        """
+        Totals can be selected by filename as in load_metadata
+        """
+
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        text_folder = os.path.join(THIS_DIR, "test_data_set")
+        totals = load_totals(text_folder, monitors="PSD.dat")
+        self.assertEqual(totals.monitors, ["PSD"])
+        self.assertEqual(totals.E[0, 0], 4.37886e-07)
+
+        totals = load_totals(text_folder, monitors=["L_mon", "event_dat_*"])
+        self.assertEqual(totals.monitors, ["L_mon", "monitor"])
+
+        with WorkInTestDir() as handler:
+            text_data = load_results("test_data_set")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_nexus_data_set(temp_dir, text_data[:2])
+            totals = load_totals(temp_dir, monitors="PSD.dat")
+
+        self.assertEqual(totals.monitors, ["PSD_0"])
+        self.assertEqual(totals.I[0, 0], text_data[1].metadata.total_I)
+
+    def test_mcrun_load_totals_nexus_and_missing(self):
+        """
+        Totals are read from NeXus attributes, missing monitors are NaN
+        """
+
+        with WorkInTestDir() as handler:
+            text_data = load_results("test_data_set")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            nexus_folder = os.path.join(temp_dir, "nexus")
+            os.mkdir(nexus_folder)
+            write_nexus_data_set(nexus_folder, text_data[:2])
+
+            THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+            text_folder = os.path.join(THIS_DIR, "test_data_set")
+            totals = load_totals([nexus_folder, text_folder])
+
+            with self.assertRaises(NameError):
+                load_totals(os.path.join(temp_dir, "not_a_folder"))
+
+        # Groups are listed alphabetically in the NeXus file
+        self.assertEqual(totals.monitors[:2], ["PSD_0", "PSD_4PI_0"])
+        self.assertEqual(totals.monitor("PSD_0")[0, 0],
+                         text_data[1].metadata.total_I)
+        self.assertTrue(np.isnan(totals.monitor("PSD_0")[1, 0]))
+        self.assertTrue(np.isnan(totals.monitor("L_mon")[0, 0]))
+        self.assertEqual(totals.parameters["wavelength"][0], 5.0)
+
 if __name__ == '__main__':
     unittest.main()
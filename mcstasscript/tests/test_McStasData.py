@@ -1,10 +1,20 @@
+import os
+import pickle
+import tempfile
 import unittest
+import unittest.mock
 import numpy as np
+import h5py
 
 from mcstasscript.data.data import McStasData
 from mcstasscript.data.data import McStasDataBinned
 from mcstasscript.data.data import McStasDataEvent
+from mcstasscript.data.data import McStasDataList
 from mcstasscript.data.data import McStasMetaData
+from mcstasscript.interface.functions import name_search
+
+PICKLE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "test_pickle_files")
 
 
 def set_dummy_MetaDataBinned_1d():
@@ -222,6 +232,574 @@ class TestMcStasData(unittest.TestCase):
         data.set_plot_options(colormap="hot")
         self.assertIs(data.plot_options.colormap, "hot")
 
+    def test_McStasDataBinned_add_subtract(self):
+        """
+        Adding and subtracting data adds errors in quadrature
+        """
+        data = set_dummy_McStasDataBinned_1d()
+        background = set_dummy_McStasDataBinned_1d()
+        background.Intensity = np.full(20, 2.0)
+        background.Error = np.full(20, 0.5)
+
+        result = data - background
+        self.assertIsInstance(result, McStasDataBinned)
+        self.assertTrue(np.array_equal(result.Intensity, np.arange(20) - 2.0))
+        self.assertTrue(np.allclose(result.Error,
+                                    np.sqrt((0.5 * np.arange(20))**2 + 0.25)))
+        self.assertTrue(np.array_equal(result.Ncount, 4 * np.arange(20)))
+        self.assertTrue(np.array_equal(result.xaxis, data.xaxis))
+        self.assertEqual(result.metadata.total_I, np.sum(np.arange(20) - 2.0))
+
+        # Operands are not changed and metadata is copied
+        self.assertTrue(np.array_equal(data.Intensity, np.arange(20)))
+        self.assertIsNot(result.metadata, data.metadata)
+
+        result = 3.0 + data
+        self.assertTrue(np.array_equal(result.Intensity, np.arange(20) + 3.0))
+        self.assertTrue(np.array_equal(result.Error, data.Error))
+
+        result = 3.0 - data
+        self.assertTrue(np.array_equal(result.Intensity, 3.0 - np.arange(20)))
+        self.assertTrue(np.array_equal(result.Error, data.Error))
+
+    def test_McStasDataBinned_compact_arithmetic(self):
+        """
+        Arithmetic on float32 data is computed in float64
+        """
+        data = set_dummy_McStasDataBinned_1d()
+        data.Intensity = np.full(20, 1E8, dtype=np.float32)
+        data.Error = np.full(20, 1.0, dtype=np.float32)
+        data.Ncount = np.full(20, 2, dtype=np.uint32)
+
+        result = data + 1.0
+        self.assertEqual(result.Intensity.dtype, np.float64)
+        self.assertTrue(np.all(result.Intensity == 1E8 + 1))
+
+        # In-place operations keep the stored dtypes
+        data += data
+        self.assertEqual(data.Intensity.dtype, np.float32)
+        self.assertEqual(data.Ncount.dtype, np.uint32)
+        self.assertTrue(np.all(data.Ncount == 4))
+        self.assertEqual(data.metadata.total_I, 20*2E8)
+
+    def test_McStasDataBinned_multiply_divide(self):
+        """
+        Relative errors are combined for products and ratios
+        """
+        data = set_dummy_McStasDataBinned_2d()
+        data.Intensity = data.Intensity + 1.0
+        other = set_dummy_McStasDataBinned_2d()
+        other.Intensity = np.full((4, 5), 4.0)
+        other.Error = np.full((4, 5), 1.0)
+
+        product = data * other
+        self.assertTrue(np.allclose(product.Intensity, 4 * data.Intensity))
+        self.assertTrue(np.allclose(product.Error,
+                                    np.sqrt((4 * data.Error)**2
+                                            + data.Intensity**2)))
+        self.assertTrue(np.array_equal(product.Ncount, data.Ncount))
+
+        ratio = data / other
+        self.assertTrue(np.allclose(ratio.Intensity, data.Intensity / 4))
+        self.assertTrue(np.allclose(ratio.Error,
+                                    np.sqrt((data.Error / 4)**2
+                                            + (data.Intensity / 16)**2)))
+
+        scaled = -2.0 * data
+        self.assertTrue(np.allclose(scaled.Intensity, -2 * data.Intensity))
+        self.assertTrue(np.allclose(scaled.Error, 2 * data.Error))
+
+        inverse = 1.0 / data
+        self.assertTrue(np.allclose(inverse.Intensity, 1 / data.Intensity))
+        self.assertTrue(np.allclose(inverse.Error,
+                                    data.Error / data.Intensity**2))
+
+        # Arrays broadcast and numpy defers to McStasDataBinned
+        row_scale = np.arange(1.0, 6.0)
+        scaled = row_scale * data
+        self.assertIsInstance(scaled, McStasDataBinned)
+        self.assertTrue(np.allclose(scaled.Intensity,
+                                    data.Intensity * row_scale))
+
+        with self.assertRaises(TypeError):
+            data * "a"
+
+    def test_McStasDataBinned_in_place(self):
+        """
+        In-place operators modify the existing arrays
+        """
+        data = set_dummy_McStasDataBinned_1d()
+        data.Intensity = np.arange(20, dtype=float)
+        data.Error = 0.5 * np.arange(20)
+        data.Ncount = 2.0 * np.arange(20)
+        intensity = data.Intensity
+        metadata = data.metadata
+
+        data *= 2.0
+        data -= data.Intensity[1]
+
+        self.assertIs(data.Intensity, intensity)
+        self.assertIs(data.metadata, metadata)
+        self.assertTrue(np.array_equal(intensity, 2 * np.arange(20) - 2.0))
+        self.assertTrue(np.array_equal(data.Error, np.arange(20.0)))
+        self.assertEqual(data.metadata.total_I, np.sum(intensity))
+
+    def test_McStasDataBinned_pickle(self):
+        """
+        Binned data pickled by this and earlier versions can be loaded
+        """
+        data = set_dummy_McStasDataBinned_2d()
+        loaded = pickle.loads(pickle.dumps(data))
+        self.assertTrue(np.array_equal(loaded.Intensity, data.Intensity))
+
+        # Pickled with plain Intensity, Error and Ncount attributes
+        with open(os.path.join(PICKLE_FOLDER, "baseline_binned.pkl"), "rb") as f:
+            data_2d, data_1d = pickle.load(f)
+
+        self.assertNotIn("Intensity", data_2d.__dict__)
+        self.assertTrue(np.array_equal(data_2d.Intensity,
+                                       np.arange(6.0).reshape(2, 3)))
+        self.assertTrue(np.array_equal(data_2d.Error, np.ones((2, 3))))
+        self.assertEqual(data_1d.Ncount.shape, (4,))
+        self.assertTrue(np.array_equal(data_1d.xaxis, np.arange(4.0)))
+
+        doubled = data_1d * 2.0
+        self.assertTrue(np.array_equal(doubled.Intensity, 2 * np.arange(4.0)))
+        data_2d.to_sparse()
+        self.assertTrue(np.array_equal(data_2d.Intensity,
+                                       np.arange(6.0).reshape(2, 3)))
+
+
+def set_dummy_McStasDataList():
+    """
+    Sets up McStasDataList with three datasets, two with the same name
+    """
+    data_list = McStasDataList()
+    for name, filename in [("first", "first.dat"), ("second", "A.dat"),
+                           ("second", "B.dat")]:
+        data = set_dummy_McStasDataBinned_2d()
+        data.name = name
+        data.metadata.filename = filename
+        data_list.append(data)
+
+    return data_list
+
+
+class TestMcStasDataList(unittest.TestCase):
+    """
+    Tests of the indexed list of datasets
+    """
+
+    def test_McStasDataList_is_list(self):
+        """
+        Normal list behavior is kept, slices keep the index
+        """
+        data_list = set_dummy_McStasDataList()
+
+        self.assertIsInstance(data_list, list)
+        self.assertEqual(len(data_list), 3)
+        self.assertIs(data_list[0], data_list["first"])
+        self.assertEqual(data_list.names(), ["first", "second", "second"])
+        self.assertIsInstance(data_list[1:], McStasDataList)
+        self.assertIn(data_list[0], data_list)
+
+    def test_McStasDataList_lookup(self):
+        """
+        Lookup by name returns all matches, filename used if no name
+        """
+        data_list = set_dummy_McStasDataList()
+
+        self.assertEqual(len(data_list["second"]), 2)
+        self.assertIs(data_list["B.dat"], data_list[2])
+        self.assertIn("A.dat", data_list)
+        self.assertNotIn("third", data_list)
+
+        with self.assertRaises(KeyError):
+            data_list["third"]
+
+    def test_McStasDataList_index_updated(self):
+        """
+        Index follows changes to the list and to dataset names
+        """
+        data_list = set_dummy_McStasDataList()
+        self.assertEqual(len(data_list.find("second")), 2)
+
+        removed = data_list.pop(1)
+        self.assertIs(data_list["second"], data_list[1])
+
+        data_list.insert(0, removed)
+        self.assertEqual(data_list.find("second"), [removed, data_list[2]])
+
+        data_list[0].name = "renamed"
+        self.assertIs(data_list["renamed"], removed)
+        self.assertIs(data_list["second"], data_list[2])
+
+        del data_list[:]
+        self.assertEqual(data_list.find("first"), [])
+
+    def test_McStasDataList_lookup_does_not_scan(self):
+        """
+        Lookups use the index without visiting every dataset, renaming a
+        dataset rebuilds the index once
+        """
+        data_list = McStasDataList()
+        for index in range(50):
+            data = set_dummy_McStasDataBinned_2d()
+            data.name = "monitor_" + str(index)
+            data_list.append(data)
+
+        data_list.find("monitor_0")
+        with unittest.mock.patch.object(McStasDataList, "_index_keys",
+                                        wraps=McStasDataList._index_keys) as keys:
+            for index in range(50):
+                self.assertIs(data_list["monitor_" + str(index)],
+                              data_list[index])
+            self.assertEqual(keys.call_count, 0)
+
+            data_list[3].name = "renamed"
+            self.assertIs(data_list["renamed"], data_list[3])
+            self.assertIs(data_list["monitor_4"], data_list[4])
+            self.assertEqual(keys.call_count, 50)
+
+    def test_McStasDataList_rename_to_existing_name(self):
+        """
+        Renaming a dataset to a name already in the list is seen by lookups
+        """
+        data_list = set_dummy_McStasDataList()
+        self.assertEqual(data_list.find("second"), data_list[1:])
+        self.assertIs(data_list["first"], data_list[0])
+
+        data_list[0].name = "second"
+        self.assertEqual(data_list.find("second"), list(data_list))
+        self.assertNotIn("first", data_list)
+
+        self.assertEqual(len(name_search("second", data_list)), 3)
+
+        data_list[0].metadata.filename = "C.dat"
+        self.assertIs(data_list["C.dat"], data_list[0])
+        self.assertNotIn("first.dat", data_list)
+
+
+def set_dummy_McStasDataEvent(events=None, **kwargs):
+    """
+    Sets up McStasDataEvent object with random events
+    """
+    meta_data = McStasMetaData()
+    meta_data.component_name = "event monitor"
+    meta_data.info["variables"] = "p x y z vx vy vz t"
+
+    if events is None:
+        rng = np.random.default_rng(7)
+        events = rng.random((1000, 8))
+        events[:, 6] += 500.0  # vz
+
+    return McStasDataEvent(meta_data, events, **kwargs)
+
+
+class TestMcStasDataEvent(unittest.TestCase):
+    """
+    Tests of McStasDataEvent with data in memory and on disk
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_McStasDataEvent_iter_chunks(self):
+        """
+        Test that chunks cover all events in order
+        """
+        data = set_dummy_McStasDataEvent()
+        chunks = list(data.iter_chunks(300))
+
+        self.assertEqual([len(x) for x in chunks], [300, 300, 300, 100])
+        self.assertTrue(np.array_equal(np.concatenate(chunks), data.Events))
+        self.assertEqual(len(list(data.iter_chunks())), 1)
+
+    def test_McStasDataEvent_memmap_matches_memory(self):
+        """
+        Test that memory-mapped events give same columns and histograms
+        """
+        data = set_dummy_McStasDataEvent()
+        filename = os.path.join(self.temp_dir.name, "events.npy")
+        np.save(filename, data.Events)
+        mapped = set_dummy_McStasDataEvent(np.load(filename, mmap_mode="r"),
+                                           chunk_size=128)
+
+        self.assertFalse(mapped.in_memory)
+        self.assertAlmostEqual(mapped.metadata.total_I, data.metadata.total_I)
+        self.assertTrue(np.allclose(mapped.get_data_column("l"),
+                                    data.get_data_column("l")))
+
+        binned = data.make_1d("x", n_bins=20)
+        mapped_binned = mapped.make_1d("x", n_bins=20)
+        self.assertTrue(np.allclose(binned.Intensity, mapped_binned.Intensity))
+        self.assertTrue(np.array_equal(binned.Ncount, mapped_binned.Ncount))
+        self.assertTrue(np.allclose(binned.xaxis, mapped_binned.xaxis))
+
+        binned = data.make_2d("x", "e", n_bins=[10, 15])
+        mapped_binned = mapped.make_2d("x", "e", n_bins=[10, 15])
+        self.assertEqual(binned.Intensity.shape, (15, 10))
+        self.assertTrue(np.allclose(binned.Intensity, mapped_binned.Intensity))
+        self.assertTrue(np.allclose(binned.Error, mapped_binned.Error))
+
+    def test_McStasDataEvent_h5py_dataset(self):
+        """
+        Test that events can be read in chunks from h5py dataset
+        """
+        data = set_dummy_McStasDataEvent()
+        filename = os.path.join(self.temp_dir.name, "events.h5")
+        with h5py.File(filename, "w") as f:
+            f["events"] = data.Events
+
+        with h5py.File(filename, "r") as f:
+            on_disk = set_dummy_McStasDataEvent(f["events"], chunk_size=100)
+            self.assertEqual(len(on_disk), 1000)
+            self.assertEqual(on_disk.get_data_range("x"), data.get_data_range("x"))
+            binned = on_disk.make_1d("t", n_bins=10)
+
+        self.assertTrue(np.allclose(binned.Intensity,
+                                    data.make_1d("t", n_bins=10).Intensity))
+
+    def test_McStasDataEvent_scale_weights_read_only(self):
+        """
+        Test that weights of read only events are scaled when read
+        """
+        data = set_dummy_McStasDataEvent()
+        filename = os.path.join(self.temp_dir.name, "events.npy")
+        np.save(filename, data.Events)
+        mapped = set_dummy_McStasDataEvent(np.load(filename, mmap_mode="r"))
+
+        mapped.scale_weights(3.0)
+        data.scale_weights(3.0)
+
+        self.assertTrue(np.allclose(mapped.get_data_column("p"),
+                                    data.get_data_column("p")))
+        self.assertTrue(np.allclose(mapped.make_1d("x").Intensity,
+                                    data.make_1d("x").Intensity))
+
+    def test_McStasDataEvent_columns_contiguous(self):
+        """
+        Test that events in memory are stored with contiguous columns
+        """
+        data = set_dummy_McStasDataEvent()
+
+        self.assertTrue(data.Events.flags.f_contiguous)
+        self.assertTrue(data.get_data_column("x").flags.contiguous)
+
+        data.Events = np.ones((10, 8))
+        self.assertTrue(data.Events.flags.f_contiguous)
+
+    def test_McStasDataEvent_pickle(self):
+        """
+        Event data pickled by this and earlier versions can be loaded
+        """
+        data = set_dummy_McStasDataEvent(chunk_size=100)
+        loaded = pickle.loads(pickle.dumps(data))
+        self.assertTrue(np.array_equal(loaded.Events, data.Events))
+        self.assertEqual(loaded.chunk_size, 100)
+
+        # Pickled with a plain Events attribute
+        with open(os.path.join(PICKLE_FOLDER, "baseline_events.pkl"), "rb") as f:
+            legacy, = pickle.load(f)
+
+        self.assertNotIn("Events", legacy.__dict__)
+        self.assertEqual(len(legacy), 5)
+        self.assertEqual(legacy.Events.shape, (5, 8))
+        self.assertTrue(legacy.Events.flags.f_contiguous)
+        self.assertEqual(len(list(legacy.iter_chunks(2))), 3)
+        self.assertTrue(np.allclose(legacy.get_data_column("speed"),
+                                    np.linalg.norm(legacy.Events[:, 4:7],
+                                                   axis=1)))
+        self.assertEqual(legacy.make_1d("x", n_bins=5).Ncount.sum(), 5)
+
+    def test_McStasDataEvent_c_order_copied(self):
+        """
+        Test that C-ordered events are copied and Fortran-ordered kept
+        """
+        events = np.ones((10, 8))
+        data = set_dummy_McStasDataEvent(events)
+        self.assertIsNot(data.Events, events)
+
+        # Changes to the original array do not reach the copy
+        events[0, 1] = 5.0
+        self.assertEqual(data.Events[0, 1], 1.0)
+
+        fortran_events = np.asfortranarray(np.ones((10, 8)))
+        data.Events = fortran_events
+        self.assertIs(data.Events, fortran_events)
+        fortran_events[0, 1] = 5.0
+        self.assertEqual(data.get_data_column("x")[0], 5.0)
+
+    def test_McStasDataEvent_derived_column_cache(self):
+        """
+        Test that derived columns are calculated once and give same values
+        """
+        data = set_dummy_McStasDataEvent()
+        uncached = set_dummy_McStasDataEvent(cache_columns=False)
+
+        speed = data.get_data_column("speed")
+        self.assertIs(data.get_data_column("speed"), speed)
+        self.assertFalse(speed.flags.writeable)
+        self.assertIs(data.get_data_column("L"), data.get_data_column("l"))
+
+        for axis in ["speed", "l", "e", "dx", "dy"]:
+            self.assertTrue(np.array_equal(data.get_data_column(axis),
+                                           uncached.get_data_column(axis)))
+
+        self.assertEqual(uncached._column_cache, {})
+
+    def test_McStasDataEvent_cache_invalidated(self):
+        """
+        Test that the cache is cleared when weights or events change
+        """
+        data = set_dummy_McStasDataEvent()
+        speed = data.get_data_column("speed")
+
+        data.scale_weights(2.0)
+        self.assertEqual(data._column_cache, {})
+        self.assertIsNot(data.get_data_column("speed"), speed)
+
+        events = np.array(data.Events)
+        events[:, 6] *= 2.0  # vz
+        data.Events = events
+        self.assertTrue(np.all(data.get_data_column("speed") > speed))
+
+    def test_McStasDataEvent_select_range(self):
+        """
+        Test that range selection matches boolean indexing of the events
+        """
+        data = set_dummy_McStasDataEvent(chunk_size=128)
+        x = data.get_data_column("x")
+        keep = (x >= 0.2) & (x <= 0.5)
+
+        selection = data.select(x=(0.2, 0.5))
+
+        self.assertEqual(len(selection), np.count_nonzero(keep))
+        self.assertTrue(np.array_equal(selection.Events, data.Events[keep]))
+        total_I, _, total_N = selection.totals()
+        self.assertAlmostEqual(total_I, data.Events[keep, 0].sum())
+        self.assertEqual(total_N, np.count_nonzero(keep))
+        self.assertEqual(selection.metadata.total_N, total_N)
+
+    def test_McStasDataEvent_select_shares_events(self):
+        """
+        Test that a selection refers to the source events without a copy
+        """
+        data = set_dummy_McStasDataEvent()
+        selection = data.select(t=(None, 0.5)).select(l=(7.9, None))
+
+        self.assertIs(selection.source, data)
+        self.assertEqual(len(selection.ranges), 2)
+        self.assertIsNone(selection.metadata.total_I)
+
+        data.Events[:, 0] = 2.0  # weights modified after selection
+        total_I, _, total_N = selection.totals()
+        self.assertEqual(total_I, 2.0*total_N)
+
+    def test_McStasDataEvent_select_mask_and_histograms(self):
+        """
+        Test that masks combine with ranges and histograms use selection
+        """
+        data = set_dummy_McStasDataEvent(chunk_size=100)
+        l = data.get_data_column("l")
+        mask = np.arange(len(data)) % 2 == 0
+        keep = mask & (l <= 7.9)
+
+        selection = data.select(mask=mask).select(l=(None, 7.9))
+        reference = set_dummy_McStasDataEvent(data.Events[keep])
+
+        binned = selection.make_1d("t", n_bins=10)
+        expected = reference.make_1d("t", n_bins=10)
+        self.assertTrue(np.allclose(binned.Intensity, expected.Intensity))
+        self.assertTrue(np.array_equal(binned.Ncount, expected.Ncount))
+
+        binned = selection.make_2d("x", "e", n_bins=[4, 6])
+        expected = reference.make_2d("x", "e", n_bins=[4, 6])
+        self.assertTrue(np.allclose(binned.Intensity, expected.Intensity))
+
+        # Mask given for events in the selection
+        half = selection.select(mask=np.arange(len(selection)) < 10)
+        self.assertEqual(len(half), 10)
+        self.assertTrue(np.array_equal(half.Events, data.Events[keep][:10]))
+
+    def test_McStasDataEvent_select_scale_weights(self):
+        """
+        Test that scaling a selection does not change the source events
+        """
+        data = set_dummy_McStasDataEvent()
+        original = np.array(data.Events)
+        selection = data.select(x=(0.5, None))
+
+        total_I = selection.totals()[0]
+        selection.scale_weights(2.0)
+
+        self.assertAlmostEqual(selection.totals()[0], 2.0*total_I)
+        self.assertAlmostEqual(selection.select(y=(0, 1)).totals()[0],
+                               2.0*total_I)
+        self.assertTrue(np.array_equal(data.Events, original))
+
+    def test_McStasDataEvent_select_errors(self):
+        """
+        Test that unknown axes and wrong mask shapes raise errors
+        """
+        data = set_dummy_McStasDataEvent()
+
+        with self.assertRaises(ValueError):
+            data.select(q=(0, 1))
+
+        with self.assertRaises(ValueError):
+            data.select(x=(0, 1, 2))
+
+        with self.assertRaises(ValueError):
+            data.select(mask=np.ones(10, dtype=bool))
+
+        with self.assertRaises(RuntimeError):
+            data.select(x=(0, 1)).Events = np.ones((2, 8))
+
+    def test_McStasDataEvent_range_cache(self):
+        """
+        Test that column ranges are cached until the weights are scaled
+        """
+        data = set_dummy_McStasDataEvent()
+        p_range = data.get_data_range("p")
+        self.assertIn(("p", ()), data._range_cache)
+        self.assertEqual(data.get_data_range("p"), p_range)
+
+        data.scale_weights(2.0)
+        self.assertAlmostEqual(data.get_data_range("p")[1], 2.0*p_range[1])
+
+    def test_McStasDataEvent_sample(self):
+        """
+        Test that samples keep the total intensity and follow the weights
+        """
+        events = np.zeros((10000, 8))
+        events[:, 0] = 1.0
+        events[:5000, 1] = 1.0
+        # Events with x=1 carry three times the intensity of x=0
+        events[:5000, 0] = 3.0
+        data = set_dummy_McStasDataEvent(events, chunk_size=700)
+
+        sample = data.sample(1000, seed=1)
+        self.assertEqual(len(sample), 1000)
+        self.assertAlmostEqual(sample.metadata.total_I, data.metadata.total_I)
+
+        fraction = np.mean(sample.get_data_column("x"))
+        self.assertAlmostEqual(fraction, 0.75, delta=0.05)
+
+        self.assertIs(data.sample(20000), data)
+
+        selection = data.select(x=(0.5, 1.5))
+        sample = selection.sample(100, seed=2)
+        self.assertEqual(len(sample), 100)
+        self.assertTrue(np.all(sample.get_data_column("x") == 1.0))
+        self.assertAlmostEqual(sample.metadata.total_I, 15000.0)
+
+        with self.assertRaises(ValueError):
+            data.sample(0)
+
 
 if __name__ == '__main__':
     unittest.main()
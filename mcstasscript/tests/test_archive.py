@@ -0,0 +1,179 @@
+import os
+import tempfile
+import unittest
+
+import h5py
+import numpy as np
+
+from mcstasscript.data.archive import read_results
+from mcstasscript.data.archive import write_results
+from mcstasscript.data.McStasDataFormat import McStasFormat
+from mcstasscript.data.pyvinylData import pyvinylMcStasData
+from mcstasscript.helper.managed_mcrun import load_results
+from mcstasscript.interface.functions import load_data
+from mcstasscript.interface.functions import save_data
+from mcstasscript.tests.helpers_for_tests import WorkInTestDir
+
+
+def load_test_data_set():
+    with WorkInTestDir() as handler:
+        return load_results("test_data_set")
+
+
+class TestResultsArchive(unittest.TestCase):
+    """
+    Tests writing results to a HDF5 archive and reading them back
+    """
+
+    def assert_same_results(self, original, reloaded):
+        self.assertEqual([x.name for x in original],
+                         [x.name for x in reloaded])
+
+        for data, copy in zip(original, reloaded):
+            self.assertEqual(data.data_type, copy.data_type)
+            self.assertEqual(data.metadata.info, copy.metadata.info)
+            self.assertEqual(data.metadata.dimension, copy.metadata.dimension)
+            self.assertEqual(data.metadata.limits, copy.metadata.limits)
+            self.assertEqual(data.metadata.parameters,
+                             copy.metadata.parameters)
+            self.assertEqual(data.metadata.title, copy.metadata.title)
+            self.assertEqual(data.get_data_location(),
+                             copy.get_data_location())
+
+            if data.data_type == "Events":
+                self.assertTrue(np.array_equal(data.Events,
+                                               np.asarray(copy.Events)))
+                self.assertEqual(data.metadata.total_I,
+                                 copy.metadata.total_I)
+                continue
+
+            self.assertTrue(np.array_equal(data.Intensity, copy.Intensity))
+            self.assertTrue(np.array_equal(data.Error, copy.Error))
+            self.assertTrue(np.array_equal(data.Ncount, copy.Ncount))
+            if hasattr(data, "xaxis"):
+                self.assertTrue(np.array_equal(data.xaxis, copy.xaxis))
+
+    def test_write_read_compressed(self):
+        """
+        Results written with compression are read back unchanged
+        """
+        data = load_test_data_set()
+        data[0].set_plot_options(log=True, colormap="Blues")
+        data[1].set_title("Custom title")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "results.h5")
+            write_results(data, filename)
+            reloaded = read_results(filename)
+
+        self.assert_same_results(data, reloaded)
+        self.assertTrue(reloaded[0].plot_options.log)
+        self.assertEqual(reloaded[0].plot_options.colormap, "Blues")
+        self.assertEqual(reloaded[1].metadata.title, "Custom title")
+        self.assertEqual(reloaded[2].metadata.xlabel, data[2].metadata.xlabel)
+
+    def test_write_read_memory_mapped(self):
+        """
+        Uncompressed arrays are memory-mapped when read
+
+        Binned arrays are copy on write, so the file is not changed
+        """
+        data = load_test_data_set()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "results.h5")
+            write_results(data, filename, compression=None)
+            reloaded = read_results(filename, lazy_events=True)
+
+            self.assert_same_results(data, reloaded)
+            self.assertIsInstance(reloaded[0].Intensity, np.memmap)
+            self.assertIsInstance(reloaded[3].Events, np.memmap)
+
+            reloaded[0].Intensity[4][1] = 7.0
+            second = read_results(filename)
+            self.assertEqual(second[0].Intensity[4][1], 1.537334562E-10)
+            del reloaded, second
+
+    def test_write_read_lazy_compressed_events(self):
+        """
+        Compressed events are read from the archive in chunks
+        """
+        data = load_test_data_set()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "results.h5")
+            write_results(data, filename)
+            reloaded = read_results(filename, lazy_events=True)
+
+            self.assertIsInstance(reloaded[3].Events, h5py.Dataset)
+            self.assertFalse(reloaded[3].in_memory)
+            self.assertEqual(reloaded[3].metadata.total_I,
+                             data[3].metadata.total_I)
+            reloaded[3].Events.file.close()
+
+    def test_write_selection(self):
+        """
+        Only selected events are written for a selection
+        """
+        data = load_test_data_set()
+        events = data[3]
+        selection = events.select(x=(0, None))
+        selection.scale_weights(2.0)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "results.h5")
+            write_results([selection], filename)
+            reloaded = read_results(filename)[0]
+
+        x_index = events.find_variable_index("x")
+        expected = events.Events[events.Events[:, x_index] >= 0]
+        expected[:, events.find_variable_index("p")] *= 2.0
+        self.assertTrue(np.array_equal(reloaded.Events, expected))
+
+    def test_read_not_archive(self):
+        """
+        Reading a HDF5 file that is not a results archive fails
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "other.h5")
+            with h5py.File(filename, "w") as f:
+                f.create_group("entry1")
+
+            with self.assertRaises(ValueError):
+                read_results(filename)
+
+    def test_save_data_load_data(self):
+        """
+        save_data writes an archive that load_data reads
+        """
+        data = load_test_data_set()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "results.h5")
+            save_data(data, filename, compression="lzf")
+            reloaded = load_data(filename)
+
+        self.assert_same_results(data, reloaded)
+
+    def test_McStasFormat_write_read(self):
+        """
+        libpyvinyl data can be written to an archive and mapped from it
+        """
+        data = load_test_data_set()
+        pyvinyl_data = pyvinylMcStasData.from_dict({"data": data}, "sim")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "results.h5")
+            written = pyvinyl_data.write(filename, McStasFormat)
+            self.assertEqual(written.key, "sim_to_McStasFormat")
+            reloaded = written.get_data()["data"]
+
+        self.assert_same_results(data, reloaded)
+
+        with WorkInTestDir() as handler:
+            from_folder = McStasFormat.read("test_data_set")["data"]
+        self.assertEqual(len(from_folder), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from mcstasscript.data.arrow import events_to_table
+from mcstasscript.data.arrow import iter_event_batches
+from mcstasscript.data.arrow import results_to_table
+from mcstasscript.data.arrow import to_arrow
+from mcstasscript.data.arrow import write_parquet
+from mcstasscript.data.arrow import write_scan_parquet
+from mcstasscript.data.scan import ScanResult
+from mcstasscript.helper.managed_mcrun import load_results
+from mcstasscript.tests.helpers_for_tests import WorkInTestDir
+from mcstasscript.tests.test_McStasData import set_dummy_McStasDataEvent
+from mcstasscript.tests.test_scan import make_scan_points
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow not installed")
+class TestArrowExport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_events_without_copy(self):
+        """
+        Event columns in memory are wrapped without copying
+        """
+        data = set_dummy_McStasDataEvent()
+        table = events_to_table(data)
+
+        self.assertEqual(table.column_names, data.variables)
+        self.assertEqual(table.num_rows, 1000)
+        column = table.column("x").chunk(0)
+        self.assertEqual(column.buffers()[1].address,
+                         data.Events[:, 1].ctypes.data)
+        self.assertIn(b"info", table.schema.metadata)
+
+        batches = list(iter_event_batches(data, chunk_size=300))
+        self.assertEqual([batch.num_rows for batch in batches],
+                         [300, 300, 300, 100])
+
+    def test_events_weight_scale_and_disk(self):
+        """
+        Pending weight scales are applied and events on disk are chunked
+        """
+        data = set_dummy_McStasDataEvent()
+        filename = os.path.join(self.temp_dir.name, "events.npy")
+        np.save(filename, data.Events)
+        mapped = set_dummy_McStasDataEvent(np.load(filename, mmap_mode="r"),
+                                           chunk_size=400)
+        mapped.scale_weights(2.0)
+
+        table = to_arrow(mapped)
+        self.assertEqual(table.column("p").num_chunks, 3)
+        self.assertTrue(np.allclose(table.column("p").to_numpy(),
+                                    2.0*data.Events[:, 0]))
+
+        parquet_file = os.path.join(self.temp_dir.name, "events.parquet")
+        write_parquet(mapped, parquet_file)
+        read = pyarrow.parquet.read_table(parquet_file)
+        self.assertTrue(np.allclose(read.column("x").to_numpy(),
+                                    data.Events[:, 1]))
+
+    def test_binned_results(self):
+        """
+        Binned monitors are exported with bin centers, events are skipped
+        """
+        with WorkInTestDir() as handler:
+            results = load_results("test_data_set")
+
+        psd = results[1]
+        table = to_arrow(psd)
+        self.assertEqual(table.column_names,
+                         ["x", "y", "Intensity", "Error", "Ncount"])
+        self.assertEqual(table.column("Intensity").chunk(0).buffers()[1].address,
+                         psd.Intensity.ctypes.data)
+
+        table = results_to_table(results)
+        n_bins = sum(data.Intensity.size for data in results
+                     if data.data_type != "Events")
+        self.assertEqual(table.num_rows, n_bins)
+
+        monitors = table.column("monitor").to_pylist()
+        l_mon = results[2]
+        l_rows = [index for index, name in enumerate(monitors)
+                  if name == "L_mon"]
+        self.assertTrue(np.allclose(table.column("x").to_numpy()[l_rows],
+                                    l_mon.xaxis))
+        self.assertTrue(np.all(np.isnan(table.column("y").to_numpy()[l_rows])))
+
+    def test_scan_dataset(self):
+        """
+        Scans are written as dataset partitioned on monitor and parameters
+        """
+        original, points = make_scan_points([1.0, 2.0], [10.0])
+        scan = ScanResult.from_results(points, ["wavelength", "angle"])
+
+        root = os.path.join(self.temp_dir.name, "scan")
+        write_scan_parquet(scan, root)
+        self.assertTrue(os.path.isdir(os.path.join(root, "monitor=L_mon",
+                                                   "wavelength=2")))
+
+        table = pyarrow.parquet.read_table(
+            root, filters=[("monitor", "=", "L_mon"),
+                           ("wavelength", "=", 2.0)])
+        self.assertTrue(np.allclose(table.column("Intensity").to_numpy(),
+                                    original[2].Intensity*20.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
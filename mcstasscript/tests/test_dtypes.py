@@ -0,0 +1,106 @@
+import unittest
+
+import numpy as np
+
+from mcstasscript.data.data import McStasDataBinned
+from mcstasscript.data.data import McStasDataEvent
+from mcstasscript.data.data import McStasMetaData
+from mcstasscript.data.dtypes import apply_dtypes
+from mcstasscript.data.dtypes import convert_array
+from mcstasscript.data.dtypes import get_default_dtypes
+from mcstasscript.data.dtypes import resolve_dtypes
+from mcstasscript.data.dtypes import set_default_dtypes
+
+
+def set_dummy_binned():
+    metadata = McStasMetaData()
+    metadata.component_name = "binned"
+    metadata.dimension = [2, 3]
+
+    intensity = np.arange(6, dtype=float).reshape(2, 3)
+    return McStasDataBinned(metadata, intensity, 0.1*intensity,
+                            2.0*intensity)
+
+
+def set_dummy_events():
+    metadata = McStasMetaData()
+    metadata.component_name = "events"
+    metadata.dimension = [2, 4]
+    metadata.info["variables"] = "p x"
+
+    events = np.array([[1.0, 0.1], [2.0, 0.2], [3.0, 0.3], [4.0, 0.4]])
+    return McStasDataEvent(metadata, events)
+
+
+class TestDtypes(unittest.TestCase):
+    def tearDown(self):
+        set_default_dtypes("float64")
+
+    def test_resolve_dtypes(self):
+        """
+        Presets and dicts are resolved to a dtype per field
+        """
+        self.assertEqual(resolve_dtypes("compact")["Intensity"], np.float32)
+        self.assertEqual(resolve_dtypes(None)["Events"], np.float64)
+
+        resolved = resolve_dtypes({"Events": "float32"})
+        self.assertEqual(resolved["Events"], np.float32)
+        self.assertEqual(resolved["Intensity"], np.float64)
+
+        with self.assertRaises(ValueError):
+            resolve_dtypes("tiny")
+        with self.assertRaises(ValueError):
+            resolve_dtypes({"Weights": np.float32})
+        with self.assertRaises(ValueError):
+            resolve_dtypes({"Intensity": np.int32})
+        with self.assertRaises(TypeError):
+            resolve_dtypes(32)
+
+    def test_convert_array_integer(self):
+        """
+        Integer Ncount uses uint32 when possible, fractions stay float64
+        """
+        self.assertEqual(convert_array(np.array([1.0, 2.0]), "integer").dtype,
+                         np.uint32)
+        self.assertEqual(convert_array(np.array([-1.0, 2E10]), "integer").dtype,
+                         np.int64)
+        self.assertEqual(convert_array(np.array([1.5]), "integer").dtype,
+                         np.float64)
+        self.assertEqual(convert_array(np.array(3.0), "integer").dtype,
+                         np.uint32)
+
+    def test_apply_dtypes(self):
+        """
+        Binned and event data are converted in place
+        """
+        binned = apply_dtypes(set_dummy_binned(), "compact")
+        self.assertEqual(binned.Intensity.dtype, np.float32)
+        self.assertEqual(binned.Ncount.dtype, np.uint32)
+
+        events = apply_dtypes(set_dummy_events(), "compact")
+        self.assertEqual(events.Events.dtype, np.float32)
+        self.assertTrue(events.Events.flags["F_CONTIGUOUS"])
+        self.assertEqual(events.totals(), (10.0, np.sqrt(30.0), 4))
+
+        # Histograms of compact events are accumulated in float64
+        intensity = events.make_1d("x", n_bins=2)
+        self.assertEqual(intensity.Intensity.dtype, np.float64)
+        self.assertEqual(intensity.Intensity.sum(), 10.0)
+
+    def test_default_dtypes(self):
+        """
+        The default is used when no dtypes are given
+        """
+        set_default_dtypes("compact")
+        self.assertEqual(get_default_dtypes(), "compact")
+
+        binned = apply_dtypes(set_dummy_binned())
+        self.assertEqual(binned.Error.dtype, np.float32)
+
+        with self.assertRaises(ValueError):
+            set_default_dtypes("tiny")
+        self.assertEqual(get_default_dtypes(), "compact")
+
+
+if __name__ == '__main__':
+    unittest.main()
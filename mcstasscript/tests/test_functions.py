@@ -11,6 +11,7 @@ from mcstasscript.interface.functions import load_metadata
 from mcstasscript.interface.functions import load_monitor
 from mcstasscript.data.data import McStasDataBinned
 from mcstasscript.data.data import McStasMetaData
+from mcstasscript.data.data import McStasDataList
 
 
 def set_dummy_MetaDataBinned_1d(name):
@@ -246,6 +247,27 @@ class Test_name_search(unittest.TestCase):
             name_search(1, data_list)
 
 
+    def test_name_search_McStasDataList(self):
+        """
+        Same results are found when searching an indexed McStasDataList
+        """
+
+        data_list = McStasDataList(setup_McStasData_array_repeat())
+        hero_object = set_dummy_McStasDataBinned_2d("Big_Hero")
+        hero_object.metadata.dimension = 321
+        data_list.append(hero_object)
+
+        results = name_search("Big_Hero", data_list)
+        self.assertEqual(type(results), list)
+        self.assertEqual([x.metadata.dimension for x in results], [123, 321])
+
+        # Both Big_Hero datasets have the filename Big_Hero.dat
+        results = name_search("Big_Hero.dat", data_list)
+        self.assertEqual([x.metadata.dimension for x in results], [123, 321])
+
+        with self.assertRaises(NameError):
+            name_search("Hero8", data_list)
+
 class Test_name_plot_options(unittest.TestCase):
     """
     Test the utility function called name_plot_options which sends
@@ -308,6 +330,7 @@ class Test_load_data(unittest.TestCase):
         os.chdir(current_work_dir)  # Reset work directory
 
         self.assertEqual(len(results), 4)
+        self.assertIsInstance(results, McStasDataList)
 
         PSD_4PI = results[0]
 
@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+
+from mcstasscript.data.histogram import Histogram
+from mcstasscript.data.histogram import histogram_1d
+from mcstasscript.data.histogram import histogram_2d
+
+
+class TestHistogram(unittest.TestCase):
+    """
+    Tests of the single pass histogram kernel against numpy histograms
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.x = rng.normal(size=5000)
+        self.y = rng.uniform(-2, 3, size=5000)
+        self.weights = rng.random(5000)
+
+    def test_histogram_1d_matches_numpy(self):
+        """
+        Intensity, error and ncount match three numpy histograms
+        """
+        intensity, error, ncount, edges = histogram_1d(self.x, self.weights, bins=37)
+
+        expected_I, expected_edges = np.histogram(self.x, bins=37, weights=self.weights)
+        expected_E2, _ = np.histogram(self.x, bins=37, weights=self.weights**2)
+        expected_N, _ = np.histogram(self.x, bins=37)
+
+        self.assertTrue(np.allclose(edges, expected_edges))
+        self.assertTrue(np.allclose(intensity, expected_I))
+        self.assertTrue(np.allclose(error, np.sqrt(expected_E2)))
+        self.assertTrue(np.array_equal(ncount, expected_N))
+
+    def test_histogram_1d_chunks_and_limits(self):
+        """
+        Chunked accumulation with limits discards events outside limits
+        """
+        intensity, error, ncount, edges = histogram_1d(self.x, self.weights, bins=10,
+                                                       limits=(-1, 1), chunk_size=333)
+
+        expected_I, _ = np.histogram(self.x, bins=10, range=(-1, 1), weights=self.weights)
+        expected_N, _ = np.histogram(self.x, bins=10, range=(-1, 1))
+
+        self.assertTrue(np.allclose(intensity, expected_I))
+        self.assertTrue(np.array_equal(ncount, expected_N))
+
+    def test_histogram_2d_matches_numpy(self):
+        """
+        2D histogram has same shape and content as numpy histogram2d
+        """
+        intensity, error, ncount, edges1, edges2 = histogram_2d(self.x, self.y, self.weights,
+                                                                bins=[12, 7])
+
+        expected_I, _, _ = np.histogram2d(self.x, self.y, bins=[12, 7], weights=self.weights)
+        expected_E2, _, _ = np.histogram2d(self.x, self.y, bins=[12, 7], weights=self.weights**2)
+        expected_N, _, _ = np.histogram2d(self.x, self.y, bins=[12, 7])
+
+        self.assertEqual(intensity.shape, (12, 7))
+        self.assertTrue(np.allclose(intensity, expected_I))
+        self.assertTrue(np.allclose(error**2, expected_E2))
+        self.assertTrue(np.array_equal(ncount, expected_N))
+
+    def test_histogram_single_value(self):
+        """
+        Identical values are binned in a range of width one like numpy
+        """
+        histogram = Histogram(4, (2.0, 2.0))
+        histogram.add(np.full(10, 2.0))
+
+        self.assertEqual(histogram.limits, [(1.5, 2.5)])
+        self.assertEqual(histogram.ncount.sum(), 10)
+
+    def test_histogram_wrong_number_of_axes(self):
+        """
+        Data must be given for all axes
+        """
+        histogram = Histogram([3, 4], [(0, 1), (0, 1)])
+        with self.assertRaises(ValueError):
+            histogram.add(self.x)
+
+
+if __name__ == '__main__':
+    unittest.main()
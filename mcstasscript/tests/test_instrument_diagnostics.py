@@ -22,6 +22,7 @@ from mcstasscript.instrument_diagnostics.intensity_diagnostics import (
 )
 from mcstasscript.instrument_diagnostics.event_plotter import EventPlotter
 from mcstasscript.instrument_diagnostics.plot_overview import PlotOverview
+from mcstasscript.instrument_diagnostics.ray_tracking import RayTable, match_rays
 
 
 def setup_instr_no_path():
@@ -710,6 +711,32 @@ class TestBeamDiagnostics(unittest.TestCase):
         diag.add_monitors()
         self.assertEqual(diag.ordered_point_list[0].filename, "Diag_after_first_component")
 
+    def test_add_monitors_binary_events(self):
+        """
+        Check that event monitors get the binary option when requested
+        """
+        instr = setup_instr_with_dummy_path()
+        diag = BeamDiagnostics(instr, binary_events=True)
+        diag.add_point(before="first_component")
+        diag.add_monitors()
+        monitor = diag.instr.get_component("Diag_before_first_component")
+        self.assertIn("list 50000 binary double", monitor.options)
+
+        diag = BeamDiagnostics(instr, binary_events="float")
+        diag.add_point(before="first_component")
+        diag.add_monitors()
+        monitor = diag.instr.get_component("Diag_before_first_component")
+        self.assertIn("list 50000 binary\"", monitor.options)
+
+        with self.assertRaises(ValueError):
+            BeamDiagnostics(instr, binary_events="half")
+
+        diag = BeamDiagnostics(instr, binary_events=False)
+        diag.add_point(after="first_component")
+        diag.add_monitors()
+        monitor = diag.instr.get_component("Diag_after_first_component")
+        self.assertNotIn("binary", monitor.options)
+
     def test_repr_with_data(self):
         """
         Check that __repr__ reports data present when the data attribute
@@ -856,6 +883,82 @@ class TestEventPlotter(unittest.TestCase):
         self.assertFalse(np.isnan(lim_min))
         self.assertFalse(np.isnan(lim_max))
 
+    def test_make_histogram(self):
+        """
+        Check that make_histogram bins the events with the view bins and
+        does not modify the bins of the view
+        """
+        data = make_dummy_event_data()
+        plotter = EventPlotter("test", data)
+
+        binned = plotter.make_histogram(View(axis1="t", bins=20))
+        self.assertEqual(len(binned.Intensity), 20)
+        self.assertAlmostEqual(binned.Intensity.sum(), data.metadata.total_I)
+        self.assertEqual(binned.Ncount.sum(), 100)
+
+        view = View(axis1="t", axis2="x", bins=[10, 5])
+        binned = plotter.make_histogram(view)
+        self.assertEqual(binned.Intensity.shape, (5, 10))
+        self.assertEqual(view.bins, [10, 5])
+
+    def test_preview(self):
+        """
+        Check that data with more events than the preview size is plotted
+        from a sample and that exact histograms use all events
+        """
+        data = make_dummy_event_data(n_events=1000)
+        plotter = EventPlotter("test", data, preview=100)
+        self.assertTrue(plotter.uses_preview)
+        self.assertEqual(len(plotter.get_plot_data()), 100)
+
+        view = View(axis1="t", bins=10)
+        binned = plotter.make_histogram(view)
+        self.assertEqual(binned.Ncount.sum(), 100)
+        self.assertAlmostEqual(binned.Intensity.sum(), data.metadata.total_I)
+
+        future = plotter.submit_exact(view)
+        exact = future.result()
+        self.assertEqual(exact.Ncount.sum(), 1000)
+        self.assertIs(plotter.make_histogram(view), exact)
+
+        other_view = View(axis1="x", bins=10)
+        binned = plotter.make_histogram(other_view, exact=True)
+        self.assertEqual(binned.Ncount.sum(), 1000)
+
+        total_I = data.metadata.total_I
+        plotter.scale_weights(2.0)
+        binned = plotter.make_histogram(view)
+        self.assertEqual(binned.Ncount.sum(), 100)
+        self.assertAlmostEqual(binned.Intensity.sum(), 2.0*total_I)
+
+        self.assertFalse(EventPlotter("test", data, preview=False).uses_preview)
+
+    def test_histogram_cache(self):
+        """
+        Check that histograms are reused until the weights are scaled and
+        that plotting does not change the cached histogram
+        """
+        data = make_dummy_event_data()
+        plotter = EventPlotter("test", data)
+        view = View(axis1="t", bins=20)
+
+        binned = plotter.make_histogram(view)
+        self.assertIs(plotter.make_histogram(view), binned)
+        self.assertIs(plotter.make_histogram(View(axis1="t", bins=20)), binned)
+        self.assertIsNot(plotter.make_histogram(View(axis1="t", bins=10)), binned)
+
+        view.set_axis1_limits(0.2, 0.4)
+        fig, ax = plt.subplots()
+        plotter.plot(view, fig, ax)
+        plt.close(fig)
+        self.assertIs(plotter.make_histogram(view), binned)
+        self.assertIsNone(binned.plot_options.left_lim)
+
+        plotter.scale_weights(3.0)
+        scaled = plotter.make_histogram(view)
+        self.assertIsNot(scaled, binned)
+        self.assertAlmostEqual(scaled.Intensity.sum(), 3.0*binned.Intensity.sum())
+
 
 class TestPlotOverview(unittest.TestCase):
     """
@@ -910,6 +1013,22 @@ class TestPlotOverview(unittest.TestCase):
         self.assertIsNotNone(view.axis1_limits)
         self.assertIsNotNone(view.axis2_limits)
 
+    def test_compute_histograms(self):
+        """
+        Check that histograms of all points are computed in parallel and
+        kept by the event plotters
+        """
+        plotters = [EventPlotter("test" + str(index), make_dummy_event_data())
+                    for index in range(4)]
+        views = [View(axis1="x"), View(axis1="t", axis2="x", bins=[10, 5])]
+        overview = PlotOverview(plotters, views)
+        overview.compute_histograms(workers=2)
+
+        for plotter in plotters:
+            self.assertEqual(len(plotter._histograms), 2)
+            self.assertEqual(plotter.make_histogram(views[1]).Intensity.shape,
+                             (5, 10))
+
 
 class TestIntensityDiagnostics(unittest.TestCase):
     """
@@ -960,5 +1079,115 @@ class TestIntensityDiagnostics(unittest.TestCase):
             diag.run_general(variable="x", limits=[1.0])
 
 
+def make_ray_event_data(ray_ids, x_values, weights, dtype=np.float64):
+    """
+    Creates McStasDataEvent with ray numbers as recorded by BeamDiagnostics
+    """
+    metadata = McStasMetaData()
+    metadata.component_name = "diag"
+    metadata.info["variables"] = "p n x y z vx vy vz t"
+    events = np.zeros((len(ray_ids), 9), dtype=dtype)
+    events[:, 0] = weights
+    events[:, 1] = ray_ids
+    events[:, 2] = x_values
+    events[:, 7] = 1000.0
+    return McStasDataEvent(metadata, events)
+
+
+class TestRayTable(unittest.TestCase):
+    """
+    Tests joining events of diagnostics points on the ray number
+    """
+
+    def setUp(self):
+        guide = make_ray_event_data([4, 1, 2, 3, 5], [0.4, 0.1, 0.2, 0.3, 0.5],
+                                    [1.0, 1.0, 1.0, 1.0, 1.0])
+        sample = make_ray_event_data([5, 2, 7], [5.0, 2.0, 7.0],
+                                     [0.5, 0.2, 0.7])
+        self.table = RayTable({"guide": guide, "sample": sample})
+
+    def test_match_rays(self):
+        """
+        Check that each reference ray gets the index of its event or -1
+        """
+        index = match_rays(np.array([7, 3, 5]), np.array([3, 4, 5, 7]))
+        self.assertTrue(np.array_equal(index, [1, -1, 2, 0]))
+        self.assertTrue(np.array_equal(match_rays(np.zeros(0, dtype=int),
+                                                  np.array([1])), [-1]))
+
+    def test_large_ray_ids(self):
+        """
+        Check ray numbers above 2**24 are exact in float64 and rejected
+        when stored as float32, which can not tell them apart
+        """
+        large_ids = [2**24 + 1, 2**24 + 2, 2**30 + 3]
+        data = make_ray_event_data(large_ids, [0.1, 0.2, 0.3],
+                                   [1.0, 1.0, 1.0])
+        table = RayTable({"guide": data})
+        self.assertTrue(np.array_equal(table.ray_id, large_ids))
+
+        data = make_ray_event_data(large_ids, [0.1, 0.2, 0.3],
+                                   [1.0, 1.0, 1.0], dtype=np.float32)
+        with self.assertRaises(ValueError):
+            RayTable({"guide": data})
+
+        small_ids = make_ray_event_data([1, 2**24 - 1], [0.1, 0.2],
+                                        [1.0, 1.0], dtype=np.float32)
+        table = RayTable({"guide": small_ids})
+        self.assertTrue(np.array_equal(table.ray_id, [1, 2**24 - 1]))
+
+    def test_join(self):
+        """
+        Check that rows cover all rays and columns are NaN for missing rays
+        """
+        table = self.table
+        self.assertTrue(np.array_equal(table.ray_id, [1, 2, 3, 4, 5, 7]))
+        self.assertTrue(np.array_equal(table.present("sample"),
+                                       [False, True, False, False, True, True]))
+
+        x_guide = table.column("guide", "x")
+        self.assertTrue(np.allclose(x_guide[:5], [0.1, 0.2, 0.3, 0.4, 0.5]))
+        self.assertTrue(np.isnan(x_guide[5]))
+
+        with self.assertRaises(NameError):
+            table.column("monochromator", "x")
+
+    def test_select_reached(self):
+        """
+        Check rays reaching the sample can be followed back to the guide
+        """
+        reached = self.table.select(reached=["guide", "sample"])
+        self.assertTrue(np.array_equal(reached.ray_id, [2, 5]))
+        self.assertTrue(np.allclose(reached.column("guide", "x"), [0.2, 0.5]))
+        self.assertTrue(np.allclose(reached.column("sample", "x"), [2.0, 5.0]))
+
+        lost = self.table.select(reached="guide", missed="sample")
+        self.assertTrue(np.array_equal(lost.ray_id, [1, 3, 4]))
+
+    def test_correlation(self):
+        """
+        Check correlation histogram uses rays at both points with the
+        weights at the second point
+        """
+        binned = self.table.correlation("guide", "x", "sample", "x", bins=[4, 3])
+        self.assertEqual(binned.Intensity.shape, (3, 4))
+        self.assertAlmostEqual(binned.metadata.total_I, 0.7)
+        self.assertEqual(binned.Ncount.sum(), 2)
+
+    def test_beam_diagnostics_ray_table(self):
+        """
+        Check BeamDiagnostics joins the data of its event plotters
+        """
+        diag = BeamDiagnostics(setup_populated_instr())
+        diag.event_plotters = [EventPlotter(name, data) for name, data
+                               in self.table.data.items()]
+
+        table = diag.ray_table()
+        self.assertEqual(table.points, ["guide", "sample"])
+        self.assertIs(diag.ray_table(), table)
+        self.assertEqual(diag.correlation("guide", "x", "sample", "x",
+                                          bins=5).Ncount.sum(), 2)
+
+
 if __name__ == "__main__":
     unittest.main()
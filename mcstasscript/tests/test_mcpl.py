@@ -0,0 +1,156 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from mcstasscript.data.mcpl import iter_mcpl
+from mcstasscript.data.mcpl import load_mcpl
+from mcstasscript.data.mcpl import mcpl_cache_name
+from mcstasscript.data.mcpl import read_mcpl
+from mcstasscript.data.mcpl import read_mcpl_header
+from mcstasscript.data.pyvinylData import pyvinylMCPLData
+from mcstasscript.helper.beam_dump_database import BeamDump
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+MCPL_FOLDER = os.path.join(THIS_DIR, "test_mcpl_files")
+
+
+def expected_direction(index):
+    """
+    Direction of the particles written to the test files
+    """
+    a = 0.7 * index
+    b = 1.3 * index + 0.2
+    direction = np.array([np.sin(a) * np.cos(b), np.sin(a) * np.sin(b),
+                          np.cos(a)])
+    return direction / np.linalg.norm(direction)
+
+
+class TestMCPLReader(unittest.TestCase):
+    """
+    The test files were written with the MCPL C library, particle i has
+    position (i, -i/2, 2i) cm, energy i+1 meV, time i/10 ms and weight
+    (i+1)/2, every third particle is a photon
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(MCPL_FOLDER, "particles.mcpl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_header(self):
+        header = read_mcpl_header(self.filename)
+
+        self.assertEqual(header.version, 3)
+        self.assertEqual(header.n_particles, 25)
+        self.assertEqual(header.source_name, "McStasScript test")
+        self.assertEqual(header.comments, ["Test particles"])
+        self.assertEqual(header.blobs, {"info": b"hello"})
+        self.assertTrue(header.userflags)
+        self.assertTrue(header.single_precision)
+        self.assertEqual(header.particle_size, 40)
+        self.assertEqual(header.header_size, 104)
+
+    def test_particles(self):
+        particles = read_mcpl(self.filename, chunk_size=7)
+        index = np.arange(25)
+
+        self.assertEqual(particles["x"].dtype, np.float32)
+        self.assertTrue(np.allclose(particles["y"], -0.5 * index))
+        self.assertTrue(np.allclose(particles["ekin"], 1E-9 * (index + 1)))
+        self.assertTrue(np.allclose(particles["t"], 0.1 * index))
+        self.assertTrue(np.allclose(particles["weight"], 0.5 * (index + 1)))
+        self.assertTrue(np.array_equal(particles["userflags"], 7 * index))
+        self.assertTrue(np.array_equal(particles["pdgcode"],
+                                       np.where(index % 3, 2112, 22)))
+
+        directions = np.array([expected_direction(i) for i in index])
+        unpacked = np.stack([particles["ux"], particles["uy"],
+                             particles["uz"]], axis=1)
+        self.assertTrue(np.allclose(unpacked, directions, atol=1E-6))
+
+        # 2 meV neutron and 1 meV photon
+        self.assertAlmostEqual(particles["wavelength"][1], 6.39547, places=4)
+        self.assertAlmostEqual(particles["wavelength"][0] / 1E7, 1.23984,
+                               places=4)
+
+    def test_chunks_and_gzip(self):
+        gz_filename = os.path.join(self.temp_dir.name, "particles.mcpl.gz")
+        with open(self.filename, "rb") as source:
+            with gzip.open(gz_filename, "wb") as target:
+                shutil.copyfileobj(source, target)
+
+        chunks = list(iter_mcpl(gz_filename, chunk_size=10))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        self.assertTrue(np.array_equal(np.concatenate(chunks),
+                                       read_mcpl(self.filename)))
+
+        with self.assertRaises(ValueError):
+            list(iter_mcpl(gz_filename, chunk_size=0))
+
+    def test_universal_and_polarisation(self):
+        particles = read_mcpl(os.path.join(MCPL_FOLDER, "polarised.mcpl"))
+
+        self.assertEqual(len(particles), 7)
+        self.assertEqual(particles["x"].dtype, np.float64)
+        self.assertTrue(np.all(particles["weight"] == 2.5))
+        self.assertTrue(np.all(particles["pdgcode"] == 2112))
+        self.assertTrue(np.array_equal(particles["poly"],
+                                       [-1, 1, -1, 1, -1, 1, -1]))
+        self.assertNotIn("userflags", particles.dtype.names)
+        self.assertTrue(np.allclose(particles["uz"][3],
+                                    expected_direction(3)[2]))
+
+    def test_truncated_and_invalid(self):
+        truncated = os.path.join(self.temp_dir.name, "truncated.mcpl")
+        with open(self.filename, "rb") as f:
+            data = f.read()
+        with open(truncated, "wb") as f:
+            f.write(data[:-20])
+
+        with self.assertRaises(ValueError):
+            read_mcpl(truncated)
+
+        with open(truncated, "wb") as f:
+            f.write(b"MCPX" + data[4:])
+        with self.assertRaises(ValueError):
+            read_mcpl_header(truncated)
+
+    def test_sidecar(self):
+        """
+        The .npy copy is memory-mapped on later loads
+        """
+        filename = os.path.join(self.temp_dir.name, "particles.mcpl")
+        shutil.copy(self.filename, filename)
+
+        in_memory = load_mcpl(filename)
+        self.assertFalse(isinstance(in_memory, np.memmap))
+        self.assertFalse(os.path.isfile(mcpl_cache_name(filename)))
+
+        written = load_mcpl(filename, sidecar=True)
+        self.assertIsInstance(written, np.memmap)
+        self.assertTrue(np.array_equal(written, in_memory))
+
+        mapped = load_mcpl(filename)
+        self.assertIsInstance(mapped, np.memmap)
+        self.assertTrue(np.array_equal(mapped["ux"], in_memory["ux"]))
+
+    def test_pyvinyl_and_beam_dump(self):
+        data = pyvinylMCPLData.from_file(self.filename).get_data()
+        self.assertEqual(data["header"].n_particles, 25)
+        self.assertEqual(len(data["particles"]), 25)
+
+        dump = BeamDump(data_path="particles.mcpl", parameters={},
+                        dump_point="guide", run_name="run")
+        particles = dump.read_particles(MCPL_FOLDER)
+        self.assertTrue(np.array_equal(particles, data["particles"]))
+        self.assertEqual(len(next(dump.iter_particles(MCPL_FOLDER, 20))), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
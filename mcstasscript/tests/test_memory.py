@@ -0,0 +1,154 @@
+import copy
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from mcstasscript.data.memory import SpilledArray
+from mcstasscript.data.memory import get_memory_budget
+from mcstasscript.data.memory import memory_footprint
+from mcstasscript.data.memory import memory_usage
+from mcstasscript.data.memory import parse_bytes
+from mcstasscript.data.memory import set_memory_budget
+from mcstasscript.tests.test_McStasData import set_dummy_McStasDataEvent
+from mcstasscript.tests.test_rebin import set_dummy_data_2d
+
+
+def set_large_data_2d(value=1.0):
+    """
+    Returns 2D binned data with arrays of 8000 bytes each
+    """
+    data = set_dummy_data_2d()
+    data.Intensity = np.full((10, 100), value)
+    data.Error = np.full((10, 100), value)
+    data.Ncount = np.full((10, 100), value)
+    return data
+
+
+class TestMemoryBudget(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        set_memory_budget("20 KB", cache_dir=self.temp_dir.name)
+
+    def tearDown(self):
+        set_memory_budget(None)
+        self.temp_dir.cleanup()
+
+    def test_parse_bytes(self):
+        self.assertEqual(parse_bytes(1000), 1000)
+        self.assertEqual(parse_bytes("2GB"), 2*10**9)
+        self.assertEqual(parse_bytes("1.5 MiB"), 3*2**19)
+        self.assertEqual(get_memory_budget(), 20000)
+
+        with self.assertRaises(ValueError):
+            parse_bytes("2 parsecs")
+
+    def test_spill_least_recently_used(self):
+        """
+        Arrays over the budget are spilled and read back on access
+        """
+        first = set_large_data_2d(1.0)
+        second = set_large_data_2d(2.0)
+
+        # 48000 bytes with a 20000 byte budget, the oldest are spilled,
+        # arrays of the object in use are kept
+        self.assertIsInstance(first._Intensity, SpilledArray)
+        self.assertIsInstance(first._Ncount, SpilledArray)
+        self.assertIsInstance(second._Intensity, np.ndarray)
+        self.assertEqual(memory_usage()["resident"], 24000)
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 3)
+
+        footprint = first.memory_footprint()
+        self.assertEqual(footprint["spilled"], 24000)
+
+        # Reading spills the arrays of second instead
+        self.assertTrue(np.array_equal(first.Intensity, np.ones((10, 100))))
+        self.assertTrue(np.array_equal(first.Error, np.ones((10, 100))))
+        self.assertIsInstance(first._Intensity, np.ndarray)
+        self.assertIsInstance(first._Ncount, SpilledArray)
+        self.assertIsInstance(second._Intensity, SpilledArray)
+        self.assertEqual(memory_usage()["resident"], 16000)
+
+        second.Intensity *= 3
+        self.assertTrue(np.all(second.Intensity == 6.0))
+
+        del first, second
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+        self.assertEqual(memory_usage()["resident"], 0)
+
+    def test_spilled_copies_and_pickle(self):
+        """
+        Copies share the cache file, pickles hold the array
+        """
+        data = set_large_data_2d(4.0)
+        set_large_data_2d()
+        self.assertIsInstance(data._Intensity, SpilledArray)
+
+        copied = copy.deepcopy(data)
+        pickled = pickle.loads(pickle.dumps(data))
+        self.assertIsInstance(pickled._Intensity, np.ndarray)
+
+        del data
+        self.assertTrue(np.all(copied.Intensity == 4.0))
+        self.assertTrue(np.all(pickled.Intensity == 4.0))
+
+    def test_sparse_and_events(self):
+        """
+        Sparse data is not tracked, in-memory events are
+        """
+        data = set_large_data_2d(0.0).to_sparse()
+        self.assertEqual(memory_usage()["arrays"], 0)
+        self.assertTrue(data.is_sparse)
+
+        events = set_dummy_McStasDataEvent()
+        self.assertEqual(memory_usage()["arrays"], 1)
+        self.assertEqual(memory_usage()["resident"], events.Events.nbytes)
+
+        set_memory_budget(1000)
+        self.assertIsInstance(events._events, SpilledArray)
+        self.assertEqual(len(events), 1000)
+        self.assertEqual(events.get_data_column("x").shape, (1000,))
+
+    def test_budget_removed(self):
+        """
+        Spilled arrays are read back after the budget is removed
+        """
+        data = set_large_data_2d(5.0)
+        set_large_data_2d()
+        set_memory_budget(None)
+
+        self.assertIsInstance(data._Intensity, SpilledArray)
+        self.assertTrue(np.all(data.Intensity == 5.0))
+        self.assertIsInstance(data._Intensity, np.ndarray)
+        self.assertEqual(memory_usage()["arrays"], 0)
+
+
+class TestMemoryFootprint(unittest.TestCase):
+    def test_footprint_by_monitor_and_run(self):
+        first = set_large_data_2d()
+        first.set_data_location("run_0")
+        second = set_large_data_2d()
+        second.set_data_location("run_1")
+        events = set_dummy_McStasDataEvent()
+        events.set_data_location("run_1")
+
+        by_monitor = memory_footprint([[first], [second, events]])
+        self.assertEqual(by_monitor["monitor_2d"],
+                         {"resident": 48000, "spilled": 0})
+        self.assertEqual(by_monitor[events.name]["resident"],
+                         events.Events.nbytes)
+
+        by_run = memory_footprint({"a": [first], "b": [second, events]},
+                                  by="run")
+        self.assertEqual(by_run["run_0"]["resident"], 24000)
+        self.assertEqual(by_run["run_1"]["resident"],
+                         24000 + events.Events.nbytes)
+
+        with self.assertRaises(ValueError):
+            memory_footprint(first, by="folder")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import unittest
+
+import numpy as np
+
+from mcstasscript.data.data import McStasDataBinned
+from mcstasscript.data.data import McStasMetaData
+from mcstasscript.data.rebin import integrate_roi
+from mcstasscript.data.rebin import rebin
+from mcstasscript.data.rebin import regrid_1d
+from mcstasscript.data.rebin import sum_ranges
+from mcstasscript.data.scan import ScanResult
+from mcstasscript.tests.test_scan import make_scan_points
+
+
+def set_dummy_data_1d():
+    """
+    Returns 1D binned data with 6 bins of width 1 from 0 to 6
+    """
+    metadata = McStasMetaData()
+    metadata.component_name = "monitor_1d"
+    metadata.dimension = 6
+    metadata.limits = [0, 6]
+
+    intensity = np.arange(1.0, 7.0)
+    error = np.full(6, 2.0)
+    ncount = np.arange(6)*10
+
+    return McStasDataBinned(metadata, intensity, error, ncount,
+                            xaxis=np.arange(6) + 0.5)
+
+
+def set_dummy_data_2d():
+    """
+    Returns 2D binned data with 4 x bins from 0 to 4 and 2 y bins from 0 to 1
+    """
+    metadata = McStasMetaData()
+    metadata.component_name = "monitor_2d"
+    metadata.dimension = [4, 2]
+    metadata.limits = [0, 4, 0, 1]
+
+    intensity = np.arange(8.0).reshape(2, 4)
+    return McStasDataBinned(metadata, intensity, np.ones((2, 4)),
+                            np.ones((2, 4)))
+
+
+class TestSumRanges(unittest.TestCase):
+    def test_sum_ranges(self):
+        """
+        Ranges are summed along the axis, empty ranges are zero
+        """
+        array = np.arange(10.0).reshape(2, 5)
+        summed = sum_ranges(array, [1, 3, 3, 4], axis=1)
+
+        self.assertTrue(np.array_equal(summed, [[3, 0, 3], [13, 0, 8]]))
+
+        summed = sum_ranges(array, [0, 5, 5], axis=1)
+        self.assertTrue(np.array_equal(summed, [[10, 0], [35, 0]]))
+
+    def test_regrid_1d(self):
+        """
+        Data sets are summed onto common bins, values in one bin are added
+        """
+        axes = [np.array([0.5, 0.6, 2.5]), np.array([1.5, 3.0, 7.0])]
+        intensities = [np.array([1.0, 2.0, 3.0]), np.array([4.0, 5.0, 6.0])]
+
+        regridded = regrid_1d(axes, intensities, [0, 1, 2, 3])
+        self.assertTrue(np.array_equal(regridded, [[3, 0, 3], [0, 4, 5]]))
+
+
+class TestRebin(unittest.TestCase):
+    def test_rebin_factor_1d(self):
+        """
+        Neighbouring bins are combined with errors added in quadrature
+        """
+        data = set_dummy_data_1d()
+        rebinned = data.rebin(2)
+
+        self.assertTrue(np.array_equal(rebinned.Intensity, [3, 7, 11]))
+        self.assertTrue(np.allclose(rebinned.Error, np.sqrt(8)))
+        self.assertTrue(np.array_equal(rebinned.Ncount, [10, 50, 90]))
+        self.assertTrue(np.array_equal(rebinned.xaxis, [1, 3, 5]))
+        self.assertEqual(rebinned.metadata.dimension, 3)
+        self.assertEqual(rebinned.metadata.total_I, 21.0)
+
+        # Original is unchanged
+        self.assertEqual(data.metadata.dimension, 6)
+        self.assertEqual(len(data.Intensity), 6)
+
+        with self.assertRaises(ValueError):
+            data.rebin(4)
+
+    def test_rebin_edges_1d(self):
+        """
+        Bins go to the new bin holding their center
+        """
+        rebinned = set_dummy_data_1d().rebin([1, 2, 2.5, 5])
+
+        self.assertTrue(np.array_equal(rebinned.Intensity, [2, 0, 12]))
+        self.assertTrue(np.allclose(rebinned.Error, [2, 0, np.sqrt(12)]))
+        self.assertEqual(rebinned.metadata.limits, [1, 5])
+        self.assertTrue(np.array_equal(rebinned.xaxis, [1.5, 2.25, 3.75]))
+
+    def test_rebin_2d(self):
+        """
+        2D data takes one factor or bins for x and y
+        """
+        data = set_dummy_data_2d()
+
+        rebinned = data.rebin(2)
+        self.assertTrue(np.array_equal(rebinned.Intensity, [[10, 18]]))
+        self.assertTrue(np.array_equal(rebinned.Error, [[2, 2]]))
+        self.assertEqual(rebinned.metadata.dimension, [2, 1])
+        self.assertEqual(rebinned.metadata.limits, [0, 4, 0, 1])
+
+        rebinned = data.rebin((None, 2))
+        self.assertTrue(np.array_equal(rebinned.Intensity, [[4, 6, 8, 10]]))
+
+        rebinned = data.rebin(([0, 1, 4], None))
+        self.assertTrue(np.array_equal(rebinned.Intensity, [[0, 6], [4, 18]]))
+        self.assertEqual(rebinned.metadata.dimension, [2, 2])
+
+    def test_rebin_sparse(self):
+        """
+        Rebinned sparse data is stored sparse again
+        """
+        data = set_dummy_data_2d().to_sparse()
+        rebinned = data.rebin(2)
+
+        self.assertTrue(rebinned.is_sparse)
+        self.assertTrue(np.array_equal(rebinned.Intensity, [[10, 18]]))
+
+    def test_rebin_list(self):
+        rebinned = rebin([set_dummy_data_1d(), set_dummy_data_1d()], 3)
+        self.assertEqual(len(rebinned), 2)
+        self.assertTrue(np.array_equal(rebinned[1].Intensity, [6, 15]))
+
+
+class TestIntegrateRoi(unittest.TestCase):
+    def test_integrate_roi_1d(self):
+        """
+        Bins with centers within the limits are summed
+        """
+        data = set_dummy_data_1d()
+
+        intensity, error, ncount = data.integrate_roi((1, 3))
+        self.assertEqual(intensity, 5.0)
+        self.assertAlmostEqual(error, np.sqrt(8))
+        self.assertEqual(ncount, 30)
+
+        intensity, error, ncount = data.integrate_roi([(None, 2), (4, None)])
+        self.assertTrue(np.array_equal(intensity, [3, 11]))
+
+    def test_integrate_roi_2d(self):
+        data = set_dummy_data_2d()
+
+        intensity, error, ncount = data.integrate_roi([(1, 3, 0, 1),
+                                                       (0, 4, 0.6, 1)])
+        self.assertTrue(np.array_equal(intensity, [1 + 2 + 5 + 6, 22]))
+        self.assertTrue(np.array_equal(ncount, [4, 4]))
+
+        with self.assertRaises(ValueError):
+            data.integrate_roi((0, 1))
+
+    def test_integrate_roi_list(self):
+        """
+        Sums of a list of data are stacked along a first dimension
+        """
+        data = [set_dummy_data_1d(), 2*set_dummy_data_1d()]
+        intensity, error, ncount = integrate_roi(data, [(0, 1), (0, 2)])
+
+        self.assertTrue(np.array_equal(intensity, [[1, 3], [2, 6]]))
+
+
+class TestCubeRebin(unittest.TestCase):
+    def test_cube_rebin_and_roi(self):
+        """
+        Monitor cubes are rebinned and integrated at all scan points at once
+        """
+        original, points = make_scan_points([1.0, 2.0], [10.0])
+        scan = ScanResult.from_results(points, ["wavelength", "angle"])
+
+        cube = scan["PSD"]
+        factor_x = 2 if cube.metadata.dimension[0] % 2 == 0 else 1
+        rebinned = cube.rebin((factor_x, None))
+        expected = original[1].rebin((factor_x, None))
+
+        self.assertEqual(rebinned.Intensity.shape,
+                         (2, 1) + expected.Intensity.shape)
+        self.assertTrue(np.allclose(rebinned.Intensity[1, 0],
+                                    expected.Intensity * 20.0))
+        self.assertEqual(rebinned.metadata.dimension,
+                         expected.metadata.dimension)
+        self.assertEqual(cube.metadata.dimension,
+                         original[1].metadata.dimension)
+
+        l_mon = scan["L_mon"]
+        limits = l_mon.metadata.limits
+        intensity, error, ncount = l_mon.integrate_roi(tuple(limits))
+        self.assertEqual(intensity.shape, (2, 1))
+        self.assertTrue(np.allclose(intensity[:, 0],
+                                    np.array([10.0, 20.0])
+                                    * original[2].metadata.total_I,
+                                    rtol=1E-4))
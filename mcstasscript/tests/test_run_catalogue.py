@@ -0,0 +1,170 @@
+import os
+import shutil
+import tempfile
+import unittest
+import datetime
+
+from mcstasscript.helper.run_catalogue import RunCatalogue
+from mcstasscript.helper.run_catalogue import read_run_info
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+SIM_FILE = os.path.join(THIS_DIR, "test_data_set", "mccode.sim")
+
+
+def write_run(folder, wavelength, instrument="jupyter_demo"):
+    """
+    Writes mccode.sim of the test data set with other parameter values
+    """
+    with open(SIM_FILE, "r") as f:
+        text = f.read()
+
+    text = text.replace("Param: wavelength=1",
+                        "Param: wavelength=" + str(wavelength))
+    text = text.replace("begin instrument: jupyter_demo",
+                        "begin instrument: " + instrument)
+
+    os.makedirs(folder)
+    with open(os.path.join(folder, "mccode.sim"), "w") as f:
+        f.write(text)
+
+    return folder
+
+
+class TestRunCatalogue(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.runs = os.path.join(self.directory, "runs")
+        for index, wavelength in enumerate([1.0, 2.5, 3.5, 5.0]):
+            write_run(os.path.join(self.runs, "run_" + str(index)),
+                      wavelength)
+        write_run(os.path.join(self.runs, "other", "run_0"), 3.0,
+                  instrument="other_instrument")
+
+        self.catalogue = RunCatalogue(os.path.join(self.directory, "runs.db"))
+
+    def tearDown(self):
+        self.catalogue.close()
+        shutil.rmtree(self.directory)
+
+    def test_read_run_info(self):
+        """
+        Header information, parameters and totals are read from mccode.sim
+        """
+        info = read_run_info(SIM_FILE.replace("mccode.sim", ""))
+
+        self.assertEqual(info["instrument"], "jupyter_demo")
+        self.assertEqual(info["ncount"], 2E7)
+        self.assertEqual(info["seed"], "1557975068")
+        self.assertEqual(info["date"], "Wed May 15 08:19:52 2019")
+        self.assertEqual(info["format"], "text")
+        self.assertEqual(info["parameters"], {"wavelength": 1.0})
+        self.assertIn("PSD_4PI", info["monitors"])
+        self.assertEqual(info["monitors"]["PSD_4PI"],
+                         (0.000465664, 4.478e-07, 4.36906e+06))
+
+    def test_scan(self):
+        """
+        Scan finds all output folders in the tree
+        """
+        self.assertEqual(self.catalogue.scan(self.runs, workers=2), 5)
+        self.assertEqual(len(self.catalogue), 5)
+
+        # Unchanged folders are not read again
+        self.assertEqual(self.catalogue.scan(self.runs), 0)
+        self.assertEqual(len(self.catalogue), 5)
+
+    def test_find_parameter_range(self):
+        """
+        Runs of an instrument within a parameter range are found
+        """
+        self.catalogue.scan(self.runs)
+
+        runs = self.catalogue.find(instrument="jupyter_demo",
+                                   wavelength=(2, 4))
+        wavelengths = sorted(run["parameters"]["wavelength"] for run in runs)
+        self.assertEqual(wavelengths, [2.5, 3.5])
+
+        runs = self.catalogue.find(wavelength=(3, None))
+        self.assertEqual(len(runs), 3)
+
+        runs = self.catalogue.find(wavelength=5)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(runs[0]["path"], os.path.join(self.runs, "run_3"))
+
+        runs = self.catalogue.find(instrument="other_instrument")
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(runs[0]["parameters"], {"wavelength": 3.0})
+
+        self.assertEqual(self.catalogue.find(not_a_parameter=1), [])
+
+        with self.assertRaises(ValueError):
+            self.catalogue.find(wavelength=(1, 2, 3))
+
+    def test_find_monitor_and_time(self):
+        """
+        Runs can be selected on monitor name and start time
+        """
+        self.catalogue.scan(self.runs)
+
+        runs = self.catalogue.find(monitor="PSD")
+        self.assertEqual(len(runs), 5)
+        self.assertEqual(len(runs[0]["monitors"]["PSD"]), 3)
+
+        self.assertEqual(self.catalogue.find(monitor="not_a_monitor"), [])
+
+        after = datetime.datetime(2019, 5, 14)
+        before = datetime.datetime(2019, 5, 16)
+        self.assertEqual(len(self.catalogue.find(after=after,
+                                                 before=before)), 5)
+        self.assertEqual(len(self.catalogue.find(after=before)), 0)
+
+    def test_add_run_updates(self):
+        """
+        A changed folder replaces its earlier entry
+        """
+        folder = os.path.join(self.runs, "run_0")
+        self.assertTrue(self.catalogue.add_run(folder))
+        self.assertFalse(self.catalogue.add_run(folder))
+
+        shutil.rmtree(folder)
+        write_run(folder, 7.0)
+        sim_file = os.path.join(folder, "mccode.sim")
+        modified = os.path.getmtime(sim_file) + 10
+        os.utime(sim_file, (modified, modified))
+
+        self.assertTrue(self.catalogue.add_run(folder))
+        self.assertEqual(len(self.catalogue), 1)
+        runs = self.catalogue.find()
+        self.assertEqual(runs[0]["parameters"], {"wavelength": 7.0})
+
+        with self.assertRaises(NameError):
+            self.catalogue.add_run(os.path.join(self.directory, "missing"))
+
+    def test_prune_and_rebuild(self):
+        """
+        Removed folders are pruned and rebuild starts from an empty table
+        """
+        self.catalogue.scan(self.runs)
+        shutil.rmtree(os.path.join(self.runs, "other"))
+
+        self.assertEqual(self.catalogue.prune(), 1)
+        self.assertEqual(len(self.catalogue), 4)
+
+        self.assertEqual(self.catalogue.rebuild(self.runs), 4)
+        self.assertEqual(len(self.catalogue), 4)
+
+    def test_catalogue_persists(self):
+        """
+        The catalogue is kept in the SQLite file
+        """
+        self.catalogue.scan(self.runs)
+        self.catalogue.close()
+
+        with RunCatalogue(os.path.join(self.directory, "runs.db")) as reopened:
+            self.assertEqual(len(reopened), 5)
+
+        self.catalogue = RunCatalogue(os.path.join(self.directory, "runs.db"))
+
+
+if __name__ == '__main__':
+    unittest.main()
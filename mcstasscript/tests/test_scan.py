@@ -0,0 +1,262 @@
+import copy
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from mcstasscript.data.scan import ScanResult
+from mcstasscript.helper.managed_mcrun import load_results
+from mcstasscript.tests.helpers_for_tests import WorkInTestDir
+
+
+def make_scan_points(wavelengths, angles):
+    """
+    Returns result lists for a scan over wavelength and angle
+
+    Each point is a copy of test_data_set with the parameters set and the
+    intensity and error scaled by wavelength * angle.
+    """
+    with WorkInTestDir() as handler:
+        original = load_results("test_data_set")
+
+    points = []
+    for wavelength in wavelengths:
+        for angle in angles:
+            point = copy.deepcopy(original)
+            for data in point:
+                data.metadata.parameters = {"wavelength": wavelength,
+                                            "angle": angle}
+                if data.data_type != "Events":
+                    data.Intensity = data.Intensity * wavelength * angle
+                    data.Error = data.Error * wavelength * angle
+            points.append(point)
+
+    return original, points
+
+
+class TestScanResult(unittest.TestCase):
+    """
+    Tests stacking results of a parameter scan into monitor cubes
+    """
+
+    def test_from_results_axes_dict(self):
+        """
+        Results given in C order are stacked with scan dimensions first
+        """
+        original, points = make_scan_points([1.0, 2.0, 3.0], [10.0, 20.0])
+        scan = ScanResult.from_results(points, {"wavelength": [1.0, 2.0, 3.0],
+                                                "angle": [10.0, 20.0]})
+
+        self.assertEqual(scan.shape, (3, 2))
+        self.assertEqual(sorted(m.name for m in scan),
+                         ["L_mon", "PSD", "PSD_4PI"])
+
+        psd = scan["PSD"]
+        self.assertEqual(psd.Intensity.shape, (3, 2) + original[1].Intensity.shape)
+        self.assertTrue(np.allclose(psd.Intensity[2, 1],
+                                    original[1].Intensity * 60.0))
+        self.assertTrue(np.array_equal(psd.Ncount[0, 0], original[1].Ncount))
+        self.assertTrue(np.array_equal(scan["L_mon"].xaxis, original[2].xaxis))
+
+    def test_from_results_parameter_names(self):
+        """
+        Grid is found from metadata parameters, order of points is free
+        """
+        original, points = make_scan_points([2.0, 1.0], [20.0, 10.0])
+        scan = ScanResult.from_results(points, ["wavelength", "angle"])
+
+        self.assertTrue(np.array_equal(scan.axes["wavelength"], [1.0, 2.0]))
+        self.assertTrue(np.array_equal(scan.axes["angle"], [10.0, 20.0]))
+        self.assertTrue(np.allclose(scan["L_mon"].Intensity[0, 1],
+                                    original[2].Intensity * 20.0))
+
+    def test_missing_points(self):
+        """
+        Scan points that are not added are NaN with zero Ncount
+        """
+        original, points = make_scan_points([1.0], [10.0])
+        scan = ScanResult({"wavelength": [1.0, 2.0]})
+        scan.add_point(0, points[0])
+
+        self.assertTrue(np.all(np.isnan(scan["PSD"].Intensity[1])))
+        self.assertTrue(np.all(scan["PSD"].Ncount[1] == 0))
+
+    def test_slicing(self):
+        """
+        isel and sel select along named scan axes
+        """
+        original, points = make_scan_points([1.0, 2.0, 3.0], [10.0, 20.0])
+        scan = ScanResult.from_results(points, ["wavelength", "angle"])
+
+        cube = scan["PSD"].isel(wavelength=slice(1, 3))
+        self.assertEqual(cube.scan_shape, (2, 2))
+        self.assertTrue(np.array_equal(cube.axes["wavelength"], [2.0, 3.0]))
+
+        cube = scan["PSD"].isel(angle=1)
+        self.assertEqual(list(cube.axes), ["wavelength"])
+        self.assertTrue(np.allclose(cube.Intensity[0],
+                                    original[1].Intensity * 20.0))
+
+        cube = scan["PSD"].sel(wavelength=[3.0, 1.0], angle=10.0)
+        self.assertEqual(cube.scan_shape, (2,))
+        self.assertTrue(np.allclose(cube.Intensity[0],
+                                    original[1].Intensity * 30.0))
+
+        selected = scan.sel(angle=20.0)
+        self.assertEqual(selected.shape, (3,))
+        self.assertEqual(selected["L_mon"].scan_shape, (3,))
+
+        with self.assertRaises(ValueError):
+            scan["PSD"].sel(wavelength=7.0)
+
+        with self.assertRaises(KeyError):
+            scan["PSD"].isel(temperature=0)
+
+    def test_reductions(self):
+        """
+        Sums add errors in quadrature and integrals use the coordinates
+        """
+        original, points = make_scan_points([1.0, 2.0, 3.0], [10.0, 20.0])
+        scan = ScanResult.from_results(points, ["wavelength", "angle"])
+        psd = scan["PSD"]
+
+        total = psd.sum("angle")
+        self.assertEqual(list(total.axes), ["wavelength"])
+        self.assertTrue(np.allclose(total.Intensity[0],
+                                    original[1].Intensity * 30.0))
+        self.assertTrue(np.allclose(total.Error[0],
+                                    original[1].Error * np.sqrt(500.0)))
+        self.assertTrue(np.array_equal(total.Ncount[0],
+                                       original[1].Ncount * 2))
+
+        mean = psd.mean()
+        self.assertEqual(mean.scan_shape, ())
+        self.assertTrue(np.allclose(mean.Intensity,
+                                    original[1].Intensity * 30.0))
+
+        # Integral of wavelength * 10 from 1 to 3
+        integral = psd.isel(angle=0).integrate("wavelength")
+        self.assertTrue(np.allclose(integral.Intensity,
+                                    original[1].Intensity * 40.0))
+        self.assertTrue(np.allclose(integral.Error,
+                                    original[1].Error * np.sqrt(650.0)))
+
+        intensity, error, ncount = psd.totals()
+        self.assertEqual(intensity.shape, (3, 2))
+        self.assertAlmostEqual(intensity[1, 0],
+                               original[1].Intensity.sum() * 20.0)
+
+    def test_arithmetic(self):
+        """
+        Cubes combine with binned data, arrays per scan point and cubes
+        """
+        original, points = make_scan_points([1.0, 2.0, 3.0], [10.0, 20.0])
+        scan = ScanResult.from_results(points, ["wavelength", "angle"])
+        psd = scan["PSD"]
+        background = original[1]
+
+        subtracted = psd - background
+        self.assertEqual(subtracted.Intensity.shape, psd.Intensity.shape)
+        self.assertTrue(np.allclose(subtracted.Intensity[1, 0],
+                                    background.Intensity * 19.0))
+        self.assertTrue(np.allclose(subtracted.Error[1, 0],
+                                    background.Error * np.sqrt(401.0)))
+
+        reflected = background - psd
+        self.assertTrue(np.allclose(reflected.Intensity,
+                                    -subtracted.Intensity))
+
+        # One normalisation value per scan point
+        norm = psd.totals()[0]
+        normalised = psd / norm
+        self.assertTrue(np.allclose(normalised.totals()[0], 1.0))
+
+        doubled = psd + scan["PSD"]
+        self.assertTrue(np.allclose(doubled.Intensity, 2 * psd.Intensity))
+        self.assertTrue(np.allclose(doubled.Error, np.sqrt(2) * psd.Error))
+        self.assertTrue(np.array_equal(doubled.Ncount, 2 * psd.Ncount))
+
+        with self.assertRaises(ValueError):
+            psd + psd.isel(wavelength=slice(0, 2))
+
+    def test_point(self):
+        """
+        A single scan point is returned as McStasDataBinned
+        """
+        original, points = make_scan_points([1.0, 2.0], [10.0])
+        scan = ScanResult.from_results(points, ["wavelength", "angle"])
+
+        data = scan["L_mon"].point(wavelength=1)
+        self.assertEqual(data.name, "L_mon")
+        self.assertEqual(data.data_type, "Binned 1D")
+        self.assertEqual(data.metadata.parameters["wavelength"], 2.0)
+        self.assertTrue(np.allclose(data.Intensity,
+                                    original[2].Intensity * 20.0))
+
+        with self.assertRaises(ValueError):
+            ScanResult.from_results(points, ["angle"])
+
+    def test_directory_storage(self):
+        """
+        Arrays stored in a directory are memory-mapped and can be opened
+        """
+        original, points = make_scan_points([1.0, 2.0], [10.0, 20.0])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            directory = os.path.join(temp_dir, "scan")
+            scan = ScanResult.from_results(points, ["wavelength", "angle"],
+                                           directory=directory)
+            self.assertIsInstance(scan["PSD"].Intensity, np.memmap)
+            scan.flush()
+            del scan
+
+            opened = ScanResult.open(directory)
+            self.assertEqual(list(opened.axes), ["wavelength", "angle"])
+            self.assertIsInstance(opened["PSD"].Intensity, np.memmap)
+            self.assertTrue(np.allclose(opened["PSD"].Intensity[1, 1],
+                                        original[1].Intensity * 40.0))
+            self.assertEqual(opened["PSD"].metadata.xlabel,
+                             original[1].metadata.xlabel)
+            self.assertTrue(np.array_equal(opened["L_mon"].xaxis,
+                                           original[2].xaxis))
+            del opened
+
+    def test_from_folders(self):
+        """
+        Output folders are loaded one by one with a monitor selection
+        """
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        folder = os.path.join(THIS_DIR, "test_data_set")
+
+        scan = ScanResult.from_folders([folder, folder], {"repeat": [0, 1]},
+                                       monitors=["PSD", "L_mon"])
+
+        self.assertEqual(sorted(scan.monitors), ["L_mon", "PSD"])
+        self.assertTrue(np.array_equal(scan["L_mon"].Intensity[0],
+                                       scan["L_mon"].Intensity[1]))
+        self.assertEqual(scan["L_mon"].Ncount[1, 53], 37111)
+
+    def test_from_folders_compact_dtypes(self):
+        """
+        Scan arrays keep compact dtypes and reductions use float64
+        """
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        folder = os.path.join(THIS_DIR, "test_data_set")
+
+        scan = ScanResult.from_folders([folder, folder], {"repeat": [0, 1]},
+                                       monitors="L_mon", dtypes="compact")
+
+        cube = scan["L_mon"]
+        self.assertEqual(cube.Intensity.dtype, np.float32)
+        self.assertEqual(cube.Ncount.dtype.kind, "u")
+
+        total = cube.sum()
+        self.assertEqual(total.Intensity.dtype, np.float64)
+        self.assertTrue(np.allclose(total.Intensity,
+                                    2*cube.Intensity[0].astype(np.float64)))
+        self.assertEqual(total.Ncount[53], 2*37111)
+
+
+if __name__ == '__main__':
+    unittest.main()
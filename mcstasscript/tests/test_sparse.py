@@ -0,0 +1,167 @@
+import unittest
+
+import numpy as np
+
+from mcstasscript.data.data import McStasDataBinned
+from mcstasscript.data.data import McStasMetaData
+from mcstasscript.data.sparse import SparseBins
+from mcstasscript.data.sparse import apply_sparse
+from mcstasscript.data.sparse import resolve_sparse
+from mcstasscript.data.sparse import set_default_sparse
+from mcstasscript.data.dtypes import apply_dtypes
+from mcstasscript.helper.managed_mcrun import load_results
+from mcstasscript.helper.plot_helper import _find_min_max_I
+from mcstasscript.tests.helpers_for_tests import WorkInTestDir
+
+
+def set_dummy_sparse_data(shape=(100, 100)):
+    """
+    Returns 2D binned data with up to three non-empty bins
+    """
+    metadata = McStasMetaData()
+    metadata.component_name = "detector"
+    metadata.dimension = list(shape)
+    metadata.limits = [0, 1, 0, 1]
+
+    intensity = np.zeros(shape)
+    error = np.zeros(shape)
+    ncount = np.zeros(shape)
+    bins = [(1, 1), (shape[0]//2, shape[1]//2), (shape[0] - 1, 0)]
+    for index, value in zip(bins, [1.0, 2.0, 3.0]):
+        intensity[index] = value
+        error[index] = 0.1*value
+        ncount[index] = 10*value
+
+    return McStasDataBinned(metadata, intensity, error, ncount)
+
+
+class TestSparseBins(unittest.TestCase):
+    def test_from_dense(self):
+        """
+        Only bins with intensity, error or ncount are stored
+        """
+        intensity = np.array([[0.0, 1.0], [0.0, 0.0]])
+        ncount = np.array([[0.0, 2.0], [3.0, 0.0]])
+        sparse = SparseBins.from_dense(intensity, np.zeros((2, 2)), ncount)
+
+        self.assertEqual(sparse.shape, (2, 2))
+        self.assertTrue(np.array_equal(sparse.indices, [1, 2]))
+        self.assertEqual(sparse.fill_fraction, 0.5)
+        self.assertTrue(np.array_equal(sparse.dense("Ncount"), ncount))
+        self.assertEqual(sparse.totals(), (1.0, 0.0, 5.0))
+
+        with self.assertRaises(ValueError):
+            sparse.dense("Intensity")[0, 0] = 5
+
+    def test_resolve_sparse(self):
+        self.assertIsNone(resolve_sparse(False))
+        self.assertEqual(resolve_sparse(True), 0.1)
+        self.assertEqual(resolve_sparse(0.5), 0.5)
+        with self.assertRaises(ValueError):
+            resolve_sparse(2)
+
+
+class TestSparseData(unittest.TestCase):
+    def tearDown(self):
+        set_default_sparse(False)
+
+    def test_to_sparse_and_dense(self):
+        """
+        Sparse data gives the same arrays and totals as dense data
+        """
+        data = set_dummy_sparse_data()
+        dense_intensity = data.Intensity.copy()
+
+        data.to_sparse()
+        self.assertTrue(data.is_sparse)
+        self.assertEqual(data._sparse.nbytes, 3*4 + 3*3*8)
+        self.assertTrue(np.array_equal(data.Intensity, dense_intensity))
+        self.assertFalse(data.Intensity.flags.writeable)
+
+        data._arrays_changed()
+        self.assertEqual(data.metadata.total_I, 6.0)
+        self.assertEqual(data.metadata.total_N, 60.0)
+
+        data.to_dense()
+        self.assertFalse(data.is_sparse)
+        data.Intensity[0, 0] = 1.0
+        self.assertEqual(data.Intensity[0, 0], 1.0)
+
+    def test_to_sparse_limit(self):
+        """
+        Data is kept dense when more bins are filled than the limit
+        """
+        data = set_dummy_sparse_data(shape=(2, 2))
+        data.to_sparse(limit=0.4)
+        self.assertFalse(data.is_sparse)
+
+    def test_assign_makes_dense(self):
+        """
+        Assigning an array stores all arrays dense again
+        """
+        data = set_dummy_sparse_data().to_sparse()
+        data.Intensity = 2*data.Intensity
+
+        self.assertFalse(data.is_sparse)
+        self.assertEqual(data.Intensity[50, 50], 4.0)
+        self.assertEqual(data.Ncount[50, 50], 20.0)
+
+    def test_arithmetic(self):
+        """
+        Results of arithmetic on sparse data are sparse
+        """
+        data = set_dummy_sparse_data().to_sparse()
+
+        result = data + data
+        self.assertTrue(result.is_sparse)
+        self.assertEqual(result.Intensity[99, 0], 6.0)
+        self.assertEqual(result.metadata.total_I, 12.0)
+        self.assertTrue(data.is_sparse)
+
+        data *= 2.0
+        self.assertFalse(data.is_sparse)
+        self.assertEqual(data.Intensity[99, 0], 6.0)
+
+    def test_dtypes_and_plot_limits(self):
+        """
+        Sparse data can be converted and its plot limits found
+        """
+        data = set_dummy_sparse_data().to_sparse()
+        apply_dtypes(data, "compact")
+        self.assertTrue(data.is_sparse)
+        self.assertEqual(data.Intensity.dtype, np.float32)
+        self.assertEqual(data.Ncount.dtype, np.uint32)
+
+        self.assertEqual(_find_min_max_I(data), (0.0, 3.0))
+
+    def test_apply_sparse(self):
+        """
+        Only large 2D monitors below the fill fraction are stored sparse
+        """
+        data = apply_sparse(set_dummy_sparse_data(), True)
+        self.assertTrue(data.is_sparse)
+
+        small = apply_sparse(set_dummy_sparse_data(shape=(10, 10)), True)
+        self.assertFalse(small.is_sparse)
+
+        set_default_sparse(True)
+        self.assertTrue(apply_sparse(set_dummy_sparse_data()).is_sparse)
+
+    def test_load_results_sparse(self):
+        """
+        Loaders store 2D monitors sparse below the given fill fraction
+        """
+        with WorkInTestDir() as handler:
+            dense = load_results("test_data_set")
+            results = load_results("test_data_set", sparse=0.9)
+
+        # PSD_4PI has 98% of its bins filled, PSD 73%
+        self.assertFalse(results[0].is_sparse)
+        self.assertTrue(results[1].is_sparse)
+        self.assertFalse(results[2].is_sparse)
+        self.assertTrue(np.array_equal(results[1].Intensity,
+                                       dense[1].Intensity))
+
+
+if __name__ == '__main__':
+    unittest.main()
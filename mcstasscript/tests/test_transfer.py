@@ -0,0 +1,99 @@
+import gc
+import os
+import pickle
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mcstasscript.data.transfer import SharedArray
+from mcstasscript.data.transfer import release_results
+from mcstasscript.data.transfer import restore_results
+from mcstasscript.data.transfer import share_results
+from mcstasscript.helper.managed_mcrun import load_results
+from mcstasscript.tests.helpers_for_tests import WorkInTestDir
+from mcstasscript.tests.test_McStasData import set_dummy_McStasDataEvent
+from mcstasscript.tests.test_rebin import set_dummy_data_2d
+
+
+def share_dummy_results(folder):
+    """
+    Worker function returning shared event and binned data
+    """
+    return share_results([set_dummy_McStasDataEvent(), set_dummy_data_2d()],
+                         folder=folder, min_bytes=0)
+
+
+class TestSharedTransfer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_share_and_restore(self):
+        """
+        Large arrays are replaced by small handles and mapped when restored
+        """
+        with WorkInTestDir() as handler:
+            results = load_results("test_data_set")
+
+        shared = share_results(results, folder=self.temp_dir.name,
+                               min_bytes=10000)
+        self.assertIsInstance(shared[0].__dict__["_Intensity"], SharedArray)
+        # Small arrays are pickled with the data
+        self.assertIsInstance(shared[2].__dict__["_Intensity"], np.ndarray)
+        self.assertIsInstance(shared[3].__dict__["_events"], SharedArray)
+        self.assertLess(len(pickle.dumps(shared)),
+                        results[0].Intensity.nbytes)
+
+        restored = restore_results(pickle.loads(pickle.dumps(shared)))
+        self.assertEqual(restored.names(), results.names())
+        self.assertTrue(np.array_equal(restored["PSD_4PI"].Intensity,
+                                       results[0].Intensity))
+        self.assertIsInstance(restored[0].Intensity.base, np.memmap)
+        self.assertTrue(np.array_equal(restored[3].Events, results[3].Events))
+        self.assertTrue(restored[3].in_memory)
+        self.assertEqual(restored[3].get_data_location(), "test_data_set")
+
+        # Files are kept while mapped and removed when the data is released
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 7)
+        intensity = restored[0].Intensity[1:]
+        del restored
+        gc.collect()
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 1)
+        del intensity
+        gc.collect()
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_release(self):
+        shared = share_results([set_dummy_data_2d()],
+                               folder=self.temp_dir.name, min_bytes=0)
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 3)
+
+        release_results(shared)
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_from_worker_process(self):
+        """
+        Results made in a worker process are rebuilt in the parent
+        """
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            shared = executor.submit(share_dummy_results,
+                                     self.temp_dir.name).result()
+
+        events, binned = restore_results(shared)
+        expected = set_dummy_McStasDataEvent()
+        self.assertTrue(np.array_equal(events.Events, expected.Events))
+        self.assertTrue(events.Events.flags.f_contiguous)
+        self.assertTrue(np.array_equal(binned.Intensity,
+                                       set_dummy_data_2d().Intensity))
+
+        # Restored arrays can be modified
+        binned *= 2.0
+        self.assertEqual(binned.Intensity[1, 3], 14.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
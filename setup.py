@@ -27,6 +27,7 @@ setup(
      install_requires=['numpy', 'matplotlib', 'PyYAML', 'ipywidgets', 'libpyvinyl'],
      extras_require={
          "geometry-viewer": ['pythreejs', 'ipympl'],
+         "arrow": ['pyarrow'],
      },
      packages=find_packages(),
      classifiers=[